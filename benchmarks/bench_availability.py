@@ -0,0 +1,329 @@
+"""
+Micro-benchmarks de la generación de horarios disponibles.
+
+Ejecuta AvailabilityService contra un Mongo en memoria con configuraciones y
+citas sintéticas, variando la duración de la sesión, la cantidad de rangos
+bloqueados, `dia_disponibles` y las citas por día. Reporta operaciones por
+segundo y las compara con una línea base guardada.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_availability                  # compara con la línea base
+    python -m benchmarks.bench_availability --save-baseline  # guarda una nueva línea base
+    python -m benchmarks.bench_availability -k get_available_days --tolerance 0.10
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+from zoneinfo import ZoneInfo
+
+from benchmarks.memory_mongo import MemoryMongoClient
+from services.availability_service import AvailabilityService
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+TIME_ZONE = "America/Guayaquil"
+COMPANY = "bench-company"
+USER_ID = "bench-user"
+WORKING_DAYS = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado"]
+WORKING_HOURS = ["08:00-12:00", "13:00-19:00"]
+
+
+class Scenario:
+    def __init__(
+        self,
+        session: int = 30,
+        blocked: int = 4,
+        dias: int = 5,
+        bookings: int = 8,
+    ):
+        self.session = session
+        self.blocked = blocked
+        self.dias = dias
+        self.bookings = bookings
+
+    @property
+    def name(self) -> str:
+        return (
+            f"session={self.session},blocked={self.blocked},"
+            f"dias={self.dias},bookings={self.bookings}"
+        )
+
+
+DEFAULT_SCENARIO = Scenario()
+
+# Se varía una dimensión a la vez alrededor del escenario por defecto
+SCENARIOS = [
+    DEFAULT_SCENARIO,
+    Scenario(session=15),
+    Scenario(session=60),
+    Scenario(blocked=0),
+    Scenario(blocked=16),
+    Scenario(dias=30),
+    Scenario(bookings=0),
+    Scenario(bookings=20),
+]
+
+
+def _minutes_to_str(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _blocked_ranges(count: int) -> List[str]:
+    if count == 0:
+        return []
+    day_start, day_end = 8 * 60, 19 * 60
+    step = (day_end - day_start) // count
+    return [
+        f"{_minutes_to_str(day_start + i * step)}-"
+        f"{_minutes_to_str(day_start + i * step + 15)}"
+        for i in range(count)
+    ]
+
+
+def _slot_starts(session: int) -> List[int]:
+    starts = []
+    for hour_range in WORKING_HOURS:
+        start_str, end_str = hour_range.split("-")
+        start_h, start_m = map(int, start_str.split(":"))
+        end_h, end_m = map(int, end_str.split(":"))
+        current, end = start_h * 60 + start_m, end_h * 60 + end_m
+        while current + session <= end:
+            starts.append(current)
+            current += session
+    return starts
+
+
+def build_service(scenario: Scenario) -> AvailabilityService:
+    """
+    Crea un AvailabilityService sobre un Mongo en memoria con los datos del escenario.
+    """
+    client = MemoryMongoClient()
+    db = client["calendar_app"]
+    db["credentials"].insert_one(
+        {
+            "name_company": COMPANY,
+            "user_id": USER_ID,
+            "access_token": "bench-token",
+            "refresh_token": "bench-refresh",
+            "scope": "https://www.googleapis.com/auth/calendar",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+        }
+    )
+    db["configuracion_calendar"].insert_one(
+        {
+            "user_id": USER_ID,
+            "hora_inicio": "08:00",
+            "hora_fin": "19:00",
+            "tiempoSesion": scenario.session,
+            "dia_disponibles": scenario.dias,
+            "hora_bloqueada_list": _blocked_ranges(scenario.blocked),
+            "all_day": False,
+            "days": {day: WORKING_HOURS for day in WORKING_DAYS},
+            "time_global": False,
+            "titulo_evento": "Benchmark",
+            "calendar_id": "primary",
+            "description_event": "",
+        }
+    )
+
+    # Citas para todos los días que get_available_days puede llegar a revisar
+    rng = random.Random(42)
+    tz = ZoneInfo(TIME_ZONE)
+    today = datetime.now(timezone.utc).astimezone(tz).date()
+    slot_starts = _slot_starts(scenario.session)
+    horizon = scenario.dias * 2 + 7
+    citas = []
+    for offset in range(1, horizon + 1):
+        day = today + timedelta(days=offset)
+        for minutes in rng.sample(
+            slot_starts, min(scenario.bookings, len(slot_starts))
+        ):
+            local = datetime(
+                day.year, day.month, day.day, minutes // 60, minutes % 60, tzinfo=tz
+            )
+            citas.append(
+                {
+                    "usuario": "000000000",
+                    "email": "bench@example.com",
+                    "nombre": "Bench",
+                    "tipo_cita": "Benchmark",
+                    "fecha": local.astimezone(timezone.utc),
+                    "user_id": USER_ID,
+                }
+            )
+    db["citas"].insert_many(citas)
+    return AvailabilityService(client=client)
+
+
+def _next_working_day():
+    today = datetime.now(timezone.utc).astimezone(ZoneInfo(TIME_ZONE)).date()
+    day = today + timedelta(days=1)
+    while day.weekday() == 6:  # Domingo no está en WORKING_DAYS
+        day += timedelta(days=1)
+    return day
+
+
+def cases_for(scenario: Scenario) -> Dict[str, Callable[[], object]]:
+    service = build_service(scenario)
+    day = _next_working_day()
+    date_select = day.isoformat()
+    blocked = _blocked_ranges(scenario.blocked)
+    rng = random.Random(7)
+    slot_starts = _slot_starts(scenario.session)
+    used_hours = [
+        f"{_minutes_to_str(m)}:00"
+        for m in rng.sample(slot_starts, min(scenario.bookings, len(slot_starts)))
+    ]
+
+    return {
+        f"get_available_hours_day[{scenario.name}]": lambda: service.get_available_hours_day(
+            day, WORKING_HOURS, scenario.session, blocked, used_hours, TIME_ZONE
+        ),
+        f"get_available_hours[{scenario.name}]": lambda: service.get_available_hours(
+            COMPANY, date_select, TIME_ZONE
+        ),
+        f"get_available_days[{scenario.name}]": lambda: service.get_available_days(
+            COMPANY, TIME_ZONE
+        ),
+    }
+
+
+def all_cases() -> Dict[str, Callable[[], object]]:
+    cases = {
+        "convert_to_12_hour_format": lambda: AvailabilityService.convert_to_12_hour_format(
+            "14:30:00"
+        )
+    }
+    for scenario in SCENARIOS:
+        cases.update(cases_for(scenario))
+    return cases
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> float:
+    """
+    Devuelve operaciones por segundo usando la mejor de `repeat` mediciones.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number / best
+
+
+def run(pattern: str, repeat: int, min_time: float) -> Dict[str, float]:
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        for name, func in all_cases().items():
+            if pattern and pattern not in name:
+                continue
+            # Los servicios imprimen trazas; no se muestran durante la medición
+            with contextlib.redirect_stdout(devnull):
+                ops = measure(func, repeat, min_time)
+            results[name] = ops
+            print(f"{name:<90} {ops:>12.1f} ops/s", flush=True)
+    return results
+
+
+def git_commit() -> str:
+    """
+    Commit sobre el que se mide, para saber si la línea base quedó vieja.
+    """
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+    return output.stdout.strip()
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float):
+    """
+    Imprime la variación contra la línea base y devuelve los casos que empeoraron.
+    """
+    regressions = []
+    print()
+    print(f"{'caso':<90} {'base':>12} {'actual':>12} {'cambio':>8}")
+    for name, ops in results.items():
+        if name not in baseline:
+            print(f"{name:<90} {'-':>12} {ops:>12.1f} {'nuevo':>8}")
+            continue
+        change = (ops - baseline[name]) / baseline[name]
+        print(f"{name:<90} {baseline[name]:>12.1f} {ops:>12.1f} {change:>+8.1%}")
+        if change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-k", "--filter", default="", help="Solo casos que contengan este texto"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time", type=float, default=0.1, help="Segundos mínimos por medición"
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Caída relativa de ops/s considerada regresión (0.15 = 15%%)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.repeat, args.min_time)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+        print(f"\nLínea base guardada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo existe línea base en {args.baseline}; use --save-baseline.")
+        return 0
+
+    with open(args.baseline) as f:
+        saved = json.load(f)
+    print(f"\nLínea base medida en el commit {saved.get('commit', 'desconocido')}")
+    baseline = saved["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} caso(s) por debajo de la tolerancia:")
+        for name in regressions:
+            print(f"  - {name}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
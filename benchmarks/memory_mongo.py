@@ -0,0 +1,94 @@
+"""
+Sustituto en memoria de MongoClient para los benchmarks.
+
+Implementa solo la parte de la API de pymongo que usan los servicios:
+find_one/find con igualdad y los operadores $gt, $gte, $lt, $lte, $in y $ne,
+e insert_one/insert_many. No pretende ser un mongo completo; la idea es medir
+el código de la aplicación sin ruido de red ni de un servidor real.
+"""
+
+import copy
+import itertools
+from typing import Dict, Iterable, List, Optional
+
+_OPERATORS = {
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$in": lambda value, arg: value in arg,
+    "$ne": lambda value, arg: value != arg,
+}
+
+_ids = itertools.count(1)
+
+
+def _matches(doc: Dict, query: Dict) -> bool:
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict) and condition.keys() <= _OPERATORS.keys():
+            for op, arg in condition.items():
+                if not _OPERATORS[op](value, arg):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: List[Dict] = []
+
+    def find_one(self, query: Optional[Dict] = None) -> Optional[Dict]:
+        for doc in self.documents:
+            if _matches(doc, query or {}):
+                return copy.copy(doc)
+        return None
+
+    def find(self, query: Optional[Dict] = None, projection=None) -> Iterable[Dict]:
+        return iter(
+            [copy.copy(doc) for doc in self.documents if _matches(doc, query or {})]
+        )
+
+    def insert_one(self, document: Dict) -> InsertOneResult:
+        document.setdefault("_id", next(_ids))
+        self.documents.append(copy.copy(document))
+        return InsertOneResult(document["_id"])
+
+    def insert_many(self, documents: Iterable[Dict]) -> InsertManyResult:
+        return InsertManyResult([self.insert_one(doc).inserted_id for doc in documents])
+
+    def delete_many(self, query: Dict):
+        self.documents = [doc for doc in self.documents if not _matches(doc, query)]
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+
+class MemoryMongoClient:
+    def __init__(self, *args, **kwargs):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
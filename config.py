@@ -7,3 +7,107 @@ CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 REDIRECT_URI = os.getenv("REDIRECT_URI")
 MONGO_URI = os.getenv("MONGO_URI")
+# Conexiones que el pool de Mongo abre (en segundo plano) al crear el cliente
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+# Tiempo máximo del ping de /readyz (el cliente espera hasta 30 s a Mongo)
+MONGO_PING_TIMEOUT_SECONDS = float(os.getenv("MONGO_PING_TIMEOUT_SECONDS", "2"))
+
+# Token para operaciones administrativas (perfilado, endpoints /admin)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# URLs de Google configurables para apuntar a un servidor falso (loadtest/)
+GOOGLE_CALENDAR_BASE_URL = os.getenv(
+    "GOOGLE_CALENDAR_BASE_URL", "https://www.googleapis.com/calendar/v3"
+)
+GOOGLE_TOKEN_URL = os.getenv("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
+
+# Límite de llamadas salientes a Google (peticiones por segundo y ráfaga)
+GOOGLE_GLOBAL_QPS = float(os.getenv("GOOGLE_GLOBAL_QPS", "20"))
+GOOGLE_GLOBAL_BURST = float(os.getenv("GOOGLE_GLOBAL_BURST", "40"))
+GOOGLE_COMPANY_QPS = float(os.getenv("GOOGLE_COMPANY_QPS", "5"))
+GOOGLE_COMPANY_BURST = float(os.getenv("GOOGLE_COMPANY_BURST", "10"))
+GOOGLE_MAX_QUEUE = int(os.getenv("GOOGLE_MAX_QUEUE", "200"))
+GOOGLE_MAX_QUEUE_PER_COMPANY = int(os.getenv("GOOGLE_MAX_QUEUE_PER_COMPANY", "20"))
+GOOGLE_MAX_WAIT_SECONDS = float(os.getenv("GOOGLE_MAX_WAIT_SECONDS", "5"))
+
+# Timeout de las llamadas a Google y circuit breaker del transporte
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", "10"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "5"))
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "3"))
+GOOGLE_STALE_CACHE_SIZE = int(os.getenv("GOOGLE_STALE_CACHE_SIZE", "1000"))
+GOOGLE_EVENT_CACHE_SIZE = int(os.getenv("GOOGLE_EVENT_CACHE_SIZE", "5000"))
+
+# Tamaño mínimo (bytes) de respuesta para comprimir con brotli/gzip
+# (brotli es opcional: sin el paquete se usa solo gzip)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Disponibilidad en bloque: empresas por consulta $in e hilos de cálculo
+AVAILABILITY_BULK_BATCH_SIZE = int(os.getenv("AVAILABILITY_BULK_BATCH_SIZE", "100"))
+AVAILABILITY_BULK_WORKERS = int(os.getenv("AVAILABILITY_BULK_WORKERS", "8"))
+
+# Reservas asíncronas (POST /events?mode=async)
+BOOKING_WORKERS = int(os.getenv("BOOKING_WORKERS", "4"))
+BOOKING_POLL_SECONDS = float(os.getenv("BOOKING_POLL_SECONDS", "1"))
+BOOKING_LEASE_SECONDS = float(os.getenv("BOOKING_LEASE_SECONDS", "120"))
+BOOKING_MAX_ATTEMPTS = int(os.getenv("BOOKING_MAX_ATTEMPTS", "3"))
+
+# Archivo de citas pasadas en colecciones mensuales (citas_archive_AAAA_MM)
+CITAS_ARCHIVE_ENABLED = os.getenv("CITAS_ARCHIVE_ENABLED", "false").lower() == "true"
+CITAS_ARCHIVE_AFTER_DAYS = int(os.getenv("CITAS_ARCHIVE_AFTER_DAYS", "7"))
+CITAS_ARCHIVE_BATCH_SIZE = int(os.getenv("CITAS_ARCHIVE_BATCH_SIZE", "1000"))
+CITAS_ARCHIVE_INTERVAL_SECONDS = float(
+    os.getenv("CITAS_ARCHIVE_INTERVAL_SECONDS", "3600")
+)
+
+# Notificaciones push de Google Calendar (canales events.watch). La URL debe
+# ser HTTPS y pública, p. ej. https://api.example.com/webhooks/google/calendar
+GOOGLE_WEBHOOK_URL = os.getenv("GOOGLE_WEBHOOK_URL", "")
+GOOGLE_WATCH_TTL_SECONDS = int(os.getenv("GOOGLE_WATCH_TTL_SECONDS", "604800"))
+GOOGLE_WATCH_RENEW_BEFORE_SECONDS = int(
+    os.getenv("GOOGLE_WATCH_RENEW_BEFORE_SECONDS", "86400")
+)
+GOOGLE_WATCH_RENEW_INTERVAL_SECONDS = float(
+    os.getenv("GOOGLE_WATCH_RENEW_INTERVAL_SECONDS", "3600")
+)
+CALENDAR_SYNC_WORKERS = int(os.getenv("CALENDAR_SYNC_WORKERS", "4"))
+
+# Cache de credenciales, configuraciones y disponibilidad calculada.
+# CACHE_BACKEND: local (LRU por proceso), redis o mongo (compartidas).
+# CACHE_INVALIDATION: none, redis (pub/sub) o mongo (colección capped) para
+# avisar a los demás workers que descarten su copia local.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+CACHE_INVALIDATION = os.getenv("CACHE_INVALIDATION", "none")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_LOCAL_SIZE = int(os.getenv("CACHE_LOCAL_SIZE", "10000"))
+CACHE_NEAR_TTL_SECONDS = float(os.getenv("CACHE_NEAR_TTL_SECONDS", "5"))
+CACHE_CREDENTIALS_TTL_SECONDS = float(os.getenv("CACHE_CREDENTIALS_TTL_SECONDS", "300"))
+CACHE_CONFIG_TTL_SECONDS = float(os.getenv("CACHE_CONFIG_TTL_SECONDS", "300"))
+# La disponibilidad cambia con cada cita: con cache local y sin bus de
+# invalidación los demás workers seguirían ofreciendo horarios ya reservados,
+# así que en ese caso no se guarda salvo que se pida explícitamente.
+CACHE_AVAILABILITY_SHARED = CACHE_BACKEND != "local" or CACHE_INVALIDATION != "none"
+CACHE_AVAILABILITY_TTL_SECONDS = float(
+    os.getenv(
+        "CACHE_AVAILABILITY_TTL_SECONDS", "30" if CACHE_AVAILABILITY_SHARED else "0"
+    )
+)
+
+# Precarga al arrancar: credenciales y configuraciones de hasta
+# WARMUP_MAX_TENANTS empresas y tablas de zonas horarias para WARMUP_DAYS días.
+# /readyz responde 503 hasta que termina.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_MAX_TENANTS = int(os.getenv("WARMUP_MAX_TENANTS", "1000"))
+WARMUP_DAYS = int(os.getenv("WARMUP_DAYS", "62"))
+WARMUP_TIME_ZONES = [
+    zone.strip()
+    for zone in os.getenv(
+        "WARMUP_TIME_ZONES", "America/Guayaquil,America/Bogota,America/Caracas"
+    ).split(",")
+    if zone.strip()
+]
@@ -0,0 +1,456 @@
+"""
+Servidor local que imita Google Calendar API v3 y el endpoint de token OAuth.
+
+Permite hacer pruebas de carga sin llamar a Google. Implementa insert, list
+(con paginación, `fields` y syncToken), get (con `fields` e If-None-Match/304),
+patch, update (PUT) y delete de eventos, más `POST /token`. La latencia y los
+errores 401/429 se inyectan con variables de entorno o en caliente con
+`POST /_control`.
+
+También simula las notificaciones push: `events/watch` registra un canal y
+`channels/stop` lo detiene. Cada cambio en un calendario envía un POST con las
+cabeceras X-Goog-* a la dirección de sus canales; `POST /_control/notify/{id}`
+envía un aviso sin cambiar nada y `POST /_control/sync-tokens/expire` hace que
+los syncToken existentes respondan 410.
+
+    uvicorn loadtest.fake_google:app --port 9000
+
+    export GOOGLE_CALENDAR_BASE_URL=http://localhost:9000/calendar/v3
+    export GOOGLE_TOKEN_URL=http://localhost:9000/token
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import formatdate
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import requests
+
+from fastapi import Body, FastAPI, Header, Query, Request, Response
+from fastapi.responses import JSONResponse
+
+from utils.field_mask import apply_field_mask, parse_field_mask
+
+app = FastAPI(title="Fake Google Calendar")
+
+
+class FaultSettings:
+    def __init__(self):
+        self.latency_ms = float(os.getenv("FAKE_GOOGLE_LATENCY_MS", "0"))
+        self.latency_jitter_ms = float(os.getenv("FAKE_GOOGLE_LATENCY_JITTER_MS", "0"))
+        self.error_rate_401 = float(os.getenv("FAKE_GOOGLE_ERROR_RATE_401", "0"))
+        self.error_rate_429 = float(os.getenv("FAKE_GOOGLE_ERROR_RATE_429", "0"))
+        self.page_size = int(os.getenv("FAKE_GOOGLE_PAGE_SIZE", "250"))
+
+    def as_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+faults = FaultSettings()
+
+# calendar_id -> {event_id: evento}; los dict conservan el orden de inserción
+calendars: Dict[str, Dict[str, Dict]] = {}
+
+# Historial para la sincronización incremental: cada alta, cambio o borrado
+# recibe un número de secuencia y el syncToken es la secuencia ya entregada
+sequence = 0
+changes: Dict[str, Dict[str, int]] = {}  # calendar_id -> {event_id: secuencia}
+tombstones: Dict[str, Dict[str, Dict]] = {}  # eventos borrados ("cancelled")
+sync_floor = 0  # los syncToken anteriores responden 410
+
+# Canales de notificaciones por id
+channels: Dict[str, Dict] = {}
+
+
+def _now() -> str:
+    return (
+        datetime.now(timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+def _etag(event: Dict) -> str:
+    digest = hashlib.md5(repr(sorted(event.items())).encode()).hexdigest()
+    return f'"{int(digest[:12], 16)}"'
+
+
+def _error(status_code: int, reason: str, message: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "error": {
+                "code": status_code,
+                "message": message,
+                "errors": [{"domain": "global", "reason": reason, "message": message}],
+            }
+        },
+    )
+
+
+async def _simulate(authorization: Optional[str]) -> Optional[JSONResponse]:
+    """
+    Aplica la latencia configurada y devuelve un error inyectado, si corresponde.
+    """
+    delay = faults.latency_ms + random.uniform(0, faults.latency_jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    if not authorization or not authorization.startswith("Bearer "):
+        return _error(401, "authError", "Invalid Credentials")
+    if random.random() < faults.error_rate_401:
+        return _error(401, "authError", "Invalid Credentials")
+    if random.random() < faults.error_rate_429:
+        return _error(429, "rateLimitExceeded", "Rate Limit Exceeded")
+    return None
+
+
+def _store(event: Dict) -> Dict:
+    event["updated"] = _now()
+    event["etag"] = _etag({k: v for k, v in event.items() if k != "etag"})
+    return event
+
+
+def _changed(calendar_id: str, event_id: str):
+    global sequence
+    sequence += 1
+    changes.setdefault(calendar_id, {}).pop(event_id, None)
+    changes[calendar_id][event_id] = sequence
+    _notify(calendar_id, "exists")
+
+
+def _resource_id(calendar_id: str) -> str:
+    return hashlib.md5(calendar_id.encode()).hexdigest()[:20]
+
+
+def _deliver(channel: Dict, state: str):
+    channel["message_number"] += 1
+    headers = {
+        "X-Goog-Channel-ID": channel["id"],
+        "X-Goog-Channel-Expiration": formatdate(
+            channel["expiration"] / 1000, usegmt=True
+        ),
+        "X-Goog-Resource-ID": channel["resourceId"],
+        "X-Goog-Resource-URI": channel["resourceUri"],
+        "X-Goog-Resource-State": state,
+        "X-Goog-Message-Number": str(channel["message_number"]),
+    }
+    if channel.get("token"):
+        headers["X-Goog-Channel-Token"] = channel["token"]
+    try:
+        response = requests.post(channel["address"], headers=headers, timeout=5)
+        channel["last_delivery"] = {"state": state, "status_code": response.status_code}
+    except requests.RequestException as e:
+        channel["last_delivery"] = {"state": state, "error": str(e)}
+
+
+def _notify(calendar_id: str, state: str) -> int:
+    """
+    Envía el aviso en segundo plano a los canales vigentes del calendario.
+    """
+    now_ms = time.time() * 1000
+    targets = []
+    for channel_id, channel in list(channels.items()):
+        if channel["expiration"] < now_ms:
+            channels.pop(channel_id, None)
+        elif channel["calendar_id"] == calendar_id:
+            targets.append(channel)
+    loop = asyncio.get_running_loop()
+    for channel in targets:
+        loop.run_in_executor(None, _deliver, channel, state)
+    return len(targets)
+
+
+@app.post("/_control")
+def update_faults(settings: Dict = Body(...)):
+    for key, value in settings.items():
+        if hasattr(faults, key):
+            setattr(faults, key, type(getattr(faults, key))(value))
+    return faults.as_dict()
+
+
+@app.delete("/_control/events")
+def reset_events():
+    global sync_floor
+    calendars.clear()
+    changes.clear()
+    tombstones.clear()
+    sync_floor = sequence + 1
+    return {"status": "reset"}
+
+
+@app.post("/_control/sync-tokens/expire")
+def expire_sync_tokens():
+    global sync_floor
+    sync_floor = sequence + 1
+    return {"sync_floor": sync_floor}
+
+
+@app.get("/_control/channels")
+def list_channels():
+    return list(channels.values())
+
+
+@app.post("/_control/notify/{calendar_id}")
+async def notify(calendar_id: str, state: str = Query("exists")):
+    return {"notified": _notify(calendar_id, state)}
+
+
+@app.post("/token")
+async def token(request: Request):
+    form = parse_qs((await request.body()).decode())
+    if form.get("grant_type") != ["refresh_token"] or not form.get("refresh_token"):
+        return JSONResponse(status_code=400, content={"error": "invalid_grant"})
+
+    error = await _simulate("Bearer token-endpoint")
+    if error:
+        return error
+    return {
+        "access_token": f"fake-{uuid.uuid4().hex}",
+        "expires_in": 3599,
+        "scope": "https://www.googleapis.com/auth/calendar",
+        "token_type": "Bearer",
+    }
+
+
+def _changes_since(calendar_id: str, sync_token: str) -> Optional[List[Dict]]:
+    try:
+        since = int(sync_token.rsplit("-", 1)[-1])
+    except ValueError:
+        return None
+    if since < sync_floor:
+        return None
+    events = calendars.get(calendar_id, {})
+    deleted = tombstones.get(calendar_id, {})
+    return [
+        events.get(event_id) or deleted[event_id]
+        for event_id, seq in sorted(
+            changes.get(calendar_id, {}).items(), key=lambda item: item[1]
+        )
+        if seq > since
+    ]
+
+
+@app.get("/calendar/v3/calendars/{calendar_id}/events")
+async def list_events(
+    calendar_id: str,
+    timeMin: Optional[str] = None,
+    maxResults: Optional[int] = None,
+    pageToken: Optional[str] = None,
+    syncToken: Optional[str] = None,
+    fields: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+):
+    error = await _simulate(authorization)
+    if error:
+        return error
+
+    if syncToken:
+        if timeMin:
+            return _error(400, "invalid", "syncToken no admite timeMin")
+        items = _changes_since(calendar_id, syncToken)
+        if items is None:
+            return _error(410, "fullSyncRequired", "Sync token is no longer valid")
+    else:
+        items = list(calendars.get(calendar_id, {}).values())
+    if timeMin:
+        items = [e for e in items if e["start"].get("dateTime", "") >= timeMin]
+
+    page_size = min(maxResults or faults.page_size, faults.page_size)
+    offset = int(pageToken or 0)
+    page = items[offset : offset + page_size]
+    body = {
+        "kind": "calendar#events",
+        "summary": calendar_id,
+        "updated": _now(),
+        "items": page,
+    }
+    if offset + page_size < len(items):
+        body["nextPageToken"] = str(offset + page_size)
+    else:
+        body["nextSyncToken"] = f"sync-{sequence}"
+    return apply_field_mask(body, parse_field_mask(fields)) if fields else body
+
+
+@app.post("/calendar/v3/calendars/{calendar_id}/events")
+async def insert_event(
+    calendar_id: str,
+    event: Dict = Body(...),
+    conferenceDataVersion: int = Query(0),
+    authorization: Optional[str] = Header(None),
+):
+    error = await _simulate(authorization)
+    if error:
+        return error
+
+    # Como Google, acepta un id elegido por el cliente y responde 409 si ya
+    # existe (aunque se haya borrado)
+    event_id = event.get("id") or uuid.uuid4().hex
+    if event_id in calendars.get(calendar_id, {}) or event_id in tombstones.get(
+        calendar_id, {}
+    ):
+        return _error(409, "duplicate", "The requested identifier already exists.")
+    event = {
+        **event,
+        "kind": "calendar#event",
+        "id": event_id,
+        "status": "confirmed",
+        "htmlLink": f"https://www.google.com/calendar/event?eid={event_id}",
+        "created": _now(),
+    }
+    create_request = event.get("conferenceData", {}).get("createRequest")
+    if conferenceDataVersion and create_request:
+        event["conferenceData"] = {
+            "entryPoints": [
+                {
+                    "entryPointType": "video",
+                    "uri": f"https://meet.google.com/{event_id[:3]}-{event_id[3:7]}",
+                }
+            ],
+            "conferenceSolution": {"key": create_request["conferenceSolutionKey"]},
+        }
+    else:
+        event.pop("conferenceData", None)
+    calendars.setdefault(calendar_id, {})[event_id] = _store(event)
+    _changed(calendar_id, event_id)
+    return event
+
+
+@app.post("/calendar/v3/calendars/{calendar_id}/events/watch")
+async def watch_events(
+    calendar_id: str,
+    channel: Dict = Body(...),
+    authorization: Optional[str] = Header(None),
+):
+    error = await _simulate(authorization)
+    if error:
+        return error
+
+    if channel.get("type") != "web_hook" or not channel.get("address"):
+        return _error(400, "invalid", "Se requiere type=web_hook y address")
+    if not channel.get("id") or channel["id"] in channels:
+        return _error(400, "channelIdNotUnique", "Channel id not unique")
+    ttl = int(channel.get("params", {}).get("ttl", 604800))
+    registered = {
+        "id": channel["id"],
+        "calendar_id": calendar_id,
+        "address": channel["address"],
+        "token": channel.get("token"),
+        "resourceId": _resource_id(calendar_id),
+        "resourceUri": f"/calendar/v3/calendars/{calendar_id}/events?alt=json",
+        "expiration": int((time.time() + ttl) * 1000),
+        "message_number": 0,
+        "last_delivery": None,
+    }
+    channels[channel["id"]] = registered
+    # Google envía un aviso "sync" al crear el canal
+    asyncio.get_running_loop().run_in_executor(None, _deliver, registered, "sync")
+    return {
+        "kind": "api#channel",
+        "id": registered["id"],
+        "resourceId": registered["resourceId"],
+        "resourceUri": registered["resourceUri"],
+        "token": registered["token"],
+        "expiration": str(registered["expiration"]),
+    }
+
+
+@app.post("/calendar/v3/channels/stop")
+async def stop_channel(
+    channel: Dict = Body(...), authorization: Optional[str] = Header(None)
+):
+    error = await _simulate(authorization)
+    if error:
+        return error
+
+    registered = channels.get(channel.get("id"))
+    if registered is None or registered["resourceId"] != channel.get("resourceId"):
+        return _error(404, "notFound", "Channel not found")
+    channels.pop(registered["id"])
+    return Response(status_code=204)
+
+
+@app.get("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+async def get_event(
+    calendar_id: str,
+    event_id: str,
+    fields: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    error = await _simulate(authorization)
+    if error:
+        return error
+
+    event = calendars.get(calendar_id, {}).get(event_id)
+    if event is None:
+        return _error(404, "notFound", "Not Found")
+    if if_none_match and if_none_match == event["etag"]:
+        return Response(status_code=304)
+    return apply_field_mask(event, parse_field_mask(fields)) if fields else event
+
+
+@app.patch("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+async def patch_event(
+    calendar_id: str,
+    event_id: str,
+    changes: Dict = Body(...),
+    authorization: Optional[str] = Header(None),
+):
+    error = await _simulate(authorization)
+    if error:
+        return error
+
+    event = calendars.get(calendar_id, {}).get(event_id)
+    if event is None:
+        return _error(404, "notFound", "Not Found")
+    event.update(changes)
+    _store(event)
+    _changed(calendar_id, event_id)
+    return event
+
+
+@app.put("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+async def update_event(
+    calendar_id: str,
+    event_id: str,
+    event: Dict = Body(...),
+    authorization: Optional[str] = Header(None),
+):
+    error = await _simulate(authorization)
+    if error:
+        return error
+
+    stored = calendars.get(calendar_id, {}).get(event_id)
+    if stored is None:
+        return _error(404, "notFound", "Not Found")
+    event = {**event, "kind": "calendar#event", "id": event_id}
+    event["created"] = stored["created"]
+    calendars[calendar_id][event_id] = _store(event)
+    _changed(calendar_id, event_id)
+    return event
+
+
+@app.delete("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+async def delete_event(
+    calendar_id: str, event_id: str, authorization: Optional[str] = Header(None)
+):
+    error = await _simulate(authorization)
+    if error:
+        return error
+
+    if calendars.get(calendar_id, {}).pop(event_id, None) is None:
+        return _error(410, "deleted", "Resource has been deleted")
+    tombstones.setdefault(calendar_id, {})[event_id] = {
+        "kind": "calendar#event",
+        "id": event_id,
+        "status": "cancelled",
+    }
+    _changed(calendar_id, event_id)
+    return Response(status_code=204)
@@ -0,0 +1,245 @@
+"""
+Generador de carga para la API.
+
+Envía peticiones a un ritmo objetivo (modelo de lazo abierto: las peticiones
+se programan por tiempo, no esperan a que termine la anterior) repartidas
+según una mezcla de rutas, y reporta throughput y latencias p50/p95/p99 por
+ruta.
+
+    python -m loadtest.load --base-url http://localhost:8000 --company loadtest \\
+        --rps 50 --duration 60 --mix list_events=4,get_event=2,create_event=1,days=2,hours=2
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+DEFAULT_MIX = "list_events=4,get_event=2,create_event=1,days=2,hours=2"
+
+
+class LoadContext:
+    def __init__(self, base_url: str, company: str, time_zone: str):
+        self.base_url = base_url.rstrip("/")
+        self.company = company
+        self.time_zone = time_zone
+        self.event_ids: List[str] = []
+        self.lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def remember_event(self, event_id: str):
+        with self.lock:
+            self.event_ids.append(event_id)
+            if len(self.event_ids) > 1000:
+                del self.event_ids[:500]
+
+    def random_event_id(self) -> Optional[str]:
+        with self.lock:
+            return random.choice(self.event_ids) if self.event_ids else None
+
+
+def _list_events(ctx: LoadContext) -> int:
+    response = ctx.session.get(
+        f"{ctx.base_url}/events", params={"name_company": ctx.company}
+    )
+    if response.ok:
+        for item in response.json().get("items", [])[:20]:
+            ctx.remember_event(item["id"])
+    return response.status_code
+
+
+def _get_event(ctx: LoadContext) -> Optional[int]:
+    event_id = ctx.random_event_id()
+    if event_id is None:
+        return None  # Todavía no hay eventos conocidos
+    response = ctx.session.get(
+        f"{ctx.base_url}/events/{event_id}", params={"name_company": ctx.company}
+    )
+    return response.status_code
+
+
+def _create_event(ctx: LoadContext) -> int:
+    day = datetime.now() + timedelta(days=random.randint(1, 60))
+    start = day.replace(
+        hour=random.randint(8, 17), minute=random.choice([0, 30]), second=0
+    )
+    response = ctx.session.post(
+        f"{ctx.base_url}/events",
+        params={"name_company": ctx.company},
+        json={
+            "start_time": start.strftime("%Y-%m-%dT%H:%M:00-05:00"),
+            "assistant_email": "loadtest@example.com",
+            "usuario": "000000000",
+            "nombre": "Load Test",
+        },
+    )
+    if response.ok and "id" in response.json():
+        ctx.remember_event(response.json()["id"])
+    return response.status_code
+
+
+def _days(ctx: LoadContext) -> int:
+    response = ctx.session.get(
+        f"{ctx.base_url}/availability/days", params={"name_company": ctx.company}
+    )
+    return response.status_code
+
+
+def _hours(ctx: LoadContext) -> int:
+    day = (datetime.now() + timedelta(days=random.randint(1, 14))).date()
+    response = ctx.session.get(
+        f"{ctx.base_url}/availability/hours",
+        params={
+            "name_company": ctx.company,
+            "date_select": day.isoformat(),
+            "time_zone": ctx.time_zone,
+        },
+    )
+    return response.status_code
+
+
+ROUTES: Dict[str, Callable[[LoadContext], Optional[int]]] = {
+    "list_events": _list_events,
+    "get_event": _get_event,
+    "create_event": _create_event,
+    "days": _days,
+    "hours": _hours,
+}
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ROUTES:
+            raise ValueError(f"Ruta desconocida en --mix: {name}")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.dropped = 0
+
+    def record(self, route: str, latency: float, status: str):
+        with self.lock:
+            self.latencies[route].append(latency)
+            self.statuses[route][status] += 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _execute(ctx: LoadContext, recorder: Recorder, route: str):
+    started = time.perf_counter()
+    try:
+        status = ROUTES[route](ctx)
+    except requests.RequestException as e:
+        status = type(e).__name__
+    if status is None:
+        return
+    recorder.record(route, time.perf_counter() - started, str(status))
+
+
+def run(
+    ctx: LoadContext,
+    mix: List[Tuple[str, float]],
+    rps: float,
+    duration: float,
+    workers: int,
+) -> Tuple[Recorder, float]:
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    recorder = Recorder()
+    interval = 1.0 / rps
+    in_flight = threading.BoundedSemaphore(workers)
+
+    def task(route: str):
+        try:
+            _execute(ctx, recorder, route)
+        finally:
+            in_flight.release()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        next_at = started
+        while next_at - started < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # Si todos los workers están ocupados la petición se descarta en
+            # lugar de retrasar el calendario (evita la omisión coordinada)
+            if in_flight.acquire(blocking=False):
+                pool.submit(task, random.choices(names, weights)[0])
+            else:
+                recorder.dropped += 1
+            next_at += interval
+    return recorder, time.perf_counter() - started
+
+
+def report(recorder: Recorder, elapsed: float):
+    header = f"{'ruta':<14}{'reqs':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  estados"
+    print(header)
+    print("-" * len(header))
+    total = 0
+    for route in sorted(recorder.latencies):
+        values = recorder.latencies[route]
+        total += len(values)
+        statuses = ", ".join(
+            f"{status}={count}"
+            for status, count in sorted(recorder.statuses[route].items())
+        )
+        print(
+            f"{route:<14}{len(values):>8}{len(values) / elapsed:>9.1f}"
+            f"{percentile(values, 50) * 1000:>10.1f}"
+            f"{percentile(values, 95) * 1000:>10.1f}"
+            f"{percentile(values, 99) * 1000:>10.1f}  {statuses}"
+        )
+    print("-" * len(header))
+    print(f"total: {total} peticiones en {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+    if recorder.dropped:
+        print(f"descartadas por falta de workers: {recorder.dropped}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generador de carga para la API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--time-zone", default="America/Guayaquil")
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Segundos")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="ruta=peso,...")
+    args = parser.parse_args(argv)
+
+    ctx = LoadContext(args.base_url, args.company, args.time_zone)
+    recorder, elapsed = run(
+        ctx, parse_mix(args.mix), args.rps, args.duration, args.workers
+    )
+    report(recorder, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Crea (o reinicia) una empresa de prueba en Mongo para las pruebas de carga.
+
+    MONGO_URI=mongodb://localhost:27017 python -m loadtest.seed --company loadtest
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+from config import MONGO_URI
+
+
+def seed(client: MongoClient, company: str, session: int, reset_citas: bool):
+    db = client["calendar_app"]
+    user_id = f"{company}-user"
+    db["credentials"].update_one(
+        {"name_company": company},
+        {
+            "$set": {
+                "user_id": user_id,
+                "access_token": "fake-access-token",
+                "refresh_token": "fake-refresh-token",
+                "scope": "https://www.googleapis.com/auth/calendar",
+                "token_type": "Bearer",
+                "expiry_time": datetime.utcnow() + timedelta(hours=1),
+            }
+        },
+        upsert=True,
+    )
+    db["configuracion_calendar"].update_one(
+        {"user_id": user_id},
+        {
+            "$set": {
+                "hora_inicio": "08:00",
+                "hora_fin": "18:00",
+                "tiempoSesion": session,
+                "dia_disponibles": 10,
+                "hora_bloqueada_list": ["12:00-13:00"],
+                "all_day": False,
+                "days": {
+                    day: ["08:00-12:00", "13:00-18:00"]
+                    for day in ["lunes", "martes", "miercoles", "jueves", "viernes"]
+                },
+                "time_global": False,
+                "titulo_evento": "Load test",
+                # Mismo calendario que usan list_events/get_event por defecto
+                "calendar_id": "primary",
+                "description_event": "Evento generado por loadtest",
+            }
+        },
+        upsert=True,
+    )
+    if reset_citas:
+        db["citas"].delete_many({"user_id": user_id})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Crea una empresa de prueba")
+    parser.add_argument("--company", default="loadtest")
+    parser.add_argument("--session", type=int, default=30)
+    parser.add_argument("--reset-citas", action="store_true")
+    args = parser.parse_args(argv)
+
+    seed(MongoClient(MONGO_URI), args.company, args.session, args.reset_citas)
+    print(f"Empresa '{args.company}' lista.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,281 @@
 # main.py
 
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, MONGO_URI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from config import (
+    CLIENT_ID,
+    CLIENT_SECRET,
+    REDIRECT_URI,
+    ADMIN_TOKEN,
+    PROFILE_DIR,
+    GOOGLE_GLOBAL_QPS,
+    GOOGLE_GLOBAL_BURST,
+    GOOGLE_COMPANY_QPS,
+    GOOGLE_COMPANY_BURST,
+    GOOGLE_MAX_QUEUE,
+    GOOGLE_MAX_QUEUE_PER_COMPANY,
+    GOOGLE_MAX_WAIT_SECONDS,
+    GOOGLE_HTTP_TIMEOUT,
+    CIRCUIT_FAILURE_RATE,
+    CIRCUIT_SLOW_CALL_RATE,
+    CIRCUIT_SLOW_CALL_SECONDS,
+    CIRCUIT_WINDOW_SIZE,
+    CIRCUIT_MIN_CALLS,
+    CIRCUIT_OPEN_SECONDS,
+    CIRCUIT_HALF_OPEN_CALLS,
+    GOOGLE_STALE_CACHE_SIZE,
+    GOOGLE_EVENT_CACHE_SIZE,
+    COMPRESSION_MIN_SIZE,
+    BOOKING_WORKERS,
+    BOOKING_POLL_SECONDS,
+    BOOKING_LEASE_SECONDS,
+    BOOKING_MAX_ATTEMPTS,
+    CITAS_ARCHIVE_ENABLED,
+    CITAS_ARCHIVE_AFTER_DAYS,
+    CITAS_ARCHIVE_BATCH_SIZE,
+    CITAS_ARCHIVE_INTERVAL_SECONDS,
+    GOOGLE_WEBHOOK_URL,
+    GOOGLE_WATCH_TTL_SECONDS,
+    GOOGLE_WATCH_RENEW_BEFORE_SECONDS,
+    GOOGLE_WATCH_RENEW_INTERVAL_SECONDS,
+    CALENDAR_SYNC_WORKERS,
+    CACHE_BACKEND,
+    CACHE_INVALIDATION,
+    CACHE_REDIS_URL,
+    CACHE_LOCAL_SIZE,
+    CACHE_NEAR_TTL_SECONDS,
+    CACHE_CREDENTIALS_TTL_SECONDS,
+    CACHE_CONFIG_TTL_SECONDS,
+    CACHE_AVAILABILITY_TTL_SECONDS,
+    WARMUP_ENABLED,
+    WARMUP_MAX_TENANTS,
+    WARMUP_DAYS,
+    WARMUP_TIME_ZONES,
+)
 from models.data_classes import OAuthCredentials
+from services import mongo
 from services.token_storage import MongoTokenStorage
 from services.oauth_service import GoogleOAuthService
 from services.availability_service import AvailabilityService
 from services.calendar_service import GoogleCalendarService
+from services.rate_limiter import FairRateLimiter
+from services.circuit_breaker import CircuitBreaker
+from services.booking_jobs import BookingJobQueue
+from services.reservations import SlotReservations
+from services.bulk_service import BulkDataService
+from services.analytics_service import AnalyticsService
+from services.archive_service import CitasArchiveService
+from services.watch_service import CalendarWatchService
+from services.cache import create_cache_service
+from services.warmup import WarmUpService
+from utils.profiling import ProfilingMiddleware
+from utils.compression import CompressionMiddleware
 from routers import (
     events,
     availability,
+    admin,
+    analytics,
+    webhooks,
+    health,
 )  # Asegúrate de importar el router de availability
 
-app = FastAPI()
 
-# Inicializar dependencias
-credentials = OAuthCredentials(CLIENT_ID, CLIENT_SECRET, REDIRECT_URI)
-token_storage = MongoTokenStorage(MONGO_URI)
-oauth_service = GoogleOAuthService(credentials, token_storage)
-availability_service = AvailabilityService(mongo_uri=MONGO_URI)
-calendar_service = GoogleCalendarService(
-    oauth_service, token_storage, availability_service
-)
+class AppServices:
+    """
+    Dependencias de la aplicación, todas sobre un único cliente de Mongo
+    (services.mongo). Se crean en el arranque (lifespan) y no al importar
+    main, así importar la app no abre conexiones ni hilos.
+    """
+
+    def __init__(self, mongo_client):
+        db = mongo_client[mongo.DB_NAME]
+        credentials = OAuthCredentials(CLIENT_ID, CLIENT_SECRET, REDIRECT_URI)
+        self.token_storage = MongoTokenStorage(client=mongo_client)
+        self.oauth_service = GoogleOAuthService(credentials, self.token_storage)
+        self.cache_service = create_cache_service(
+            CACHE_BACKEND,
+            db,
+            redis_url=CACHE_REDIS_URL,
+            invalidation=CACHE_INVALIDATION,
+            local_size=CACHE_LOCAL_SIZE,
+            near_ttl=CACHE_NEAR_TTL_SECONDS,
+        )
+        self.availability_service = AvailabilityService(
+            client=mongo_client,
+            cache=self.cache_service,
+            credentials_ttl=CACHE_CREDENTIALS_TTL_SECONDS,
+            config_ttl=CACHE_CONFIG_TTL_SECONDS,
+            availability_ttl=CACHE_AVAILABILITY_TTL_SECONDS,
+        )
+        self.rate_limiter = FairRateLimiter(
+            global_rate=GOOGLE_GLOBAL_QPS,
+            global_burst=GOOGLE_GLOBAL_BURST,
+            company_rate=GOOGLE_COMPANY_QPS,
+            company_burst=GOOGLE_COMPANY_BURST,
+            max_queue=GOOGLE_MAX_QUEUE,
+            max_queue_per_company=GOOGLE_MAX_QUEUE_PER_COMPANY,
+            max_wait=GOOGLE_MAX_WAIT_SECONDS,
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_rate_threshold=CIRCUIT_FAILURE_RATE,
+            slow_call_rate_threshold=CIRCUIT_SLOW_CALL_RATE,
+            slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+            window_size=CIRCUIT_WINDOW_SIZE,
+            min_calls=CIRCUIT_MIN_CALLS,
+            open_seconds=CIRCUIT_OPEN_SECONDS,
+            half_open_max_calls=CIRCUIT_HALF_OPEN_CALLS,
+        )
+        self.reservations = SlotReservations(db)
+        self.calendar_service = GoogleCalendarService(
+            self.oauth_service,
+            self.token_storage,
+            self.availability_service,
+            rate_limiter=self.rate_limiter,
+            circuit_breaker=self.circuit_breaker,
+            timeout=GOOGLE_HTTP_TIMEOUT,
+            stale_cache_size=GOOGLE_STALE_CACHE_SIZE,
+            event_cache_size=GOOGLE_EVENT_CACHE_SIZE,
+            reservations=self.reservations,
+        )
+        self.booking_queue = BookingJobQueue(
+            self.calendar_service,
+            db,
+            workers=BOOKING_WORKERS,
+            poll_interval=BOOKING_POLL_SECONDS,
+            lease_seconds=BOOKING_LEASE_SECONDS,
+            max_attempts=BOOKING_MAX_ATTEMPTS,
+        )
+        self.bulk_service = BulkDataService(db)
+        self.archive_service = CitasArchiveService(
+            db,
+            archive_after_days=CITAS_ARCHIVE_AFTER_DAYS,
+            batch_size=CITAS_ARCHIVE_BATCH_SIZE,
+            interval_seconds=CITAS_ARCHIVE_INTERVAL_SECONDS,
+        )
+        self.analytics_service = AnalyticsService(
+            self.availability_service, self.archive_service
+        )
+        self.watch_service = CalendarWatchService(
+            self.calendar_service,
+            db,
+            webhook_url=GOOGLE_WEBHOOK_URL,
+            channel_ttl_seconds=GOOGLE_WATCH_TTL_SECONDS,
+            renew_before_seconds=GOOGLE_WATCH_RENEW_BEFORE_SECONDS,
+            renew_interval_seconds=GOOGLE_WATCH_RENEW_INTERVAL_SECONDS,
+            sync_workers=CALENDAR_SYNC_WORKERS,
+        )
+        self.warmup_service = WarmUpService(
+            self.availability_service,
+            WARMUP_TIME_ZONES,
+            max_tenants=WARMUP_MAX_TENANTS,
+            days=WARMUP_DAYS,
+        )
+
+    def inject(self):
+        """
+        Entrega las instancias a los routers (variables de módulo).
+        """
+        events.calendar_service = self.calendar_service
+        events.booking_queue = self.booking_queue
+        events.watch_service = self.watch_service
+
+        availability.availability_service = self.availability_service
+
+        admin.rate_limiter = self.rate_limiter
+        admin.circuit_breaker = self.circuit_breaker
+        admin.bulk_service = self.bulk_service
+        admin.archive_service = self.archive_service
+        admin.watch_service = self.watch_service
+        admin.availability_service = self.availability_service
+        admin.cache_service = self.cache_service
+
+        analytics.analytics_service = self.analytics_service
+
+        webhooks.watch_service = self.watch_service
+
+    def start(self):
+        self.reservations.ensure_indexes()
+        self.booking_queue.start()
+        self.analytics_service.ensure_indexes()
+        self.watch_service.ensure_indexes()
+        self.cache_service.ensure_indexes()
+        self.cache_service.start()
+        if CITAS_ARCHIVE_ENABLED:
+            self.archive_service.start()
+        if GOOGLE_WEBHOOK_URL:
+            self.watch_service.start()
+
+    def stop(self):
+        self.booking_queue.stop()
+        self.archive_service.stop()
+        self.watch_service.stop()
+        self.cache_service.stop()
+
+    def warm_up(self):
+        try:
+            health.warmup_report = self.warmup_service.run()
+            print(f"Precarga completa: {health.warmup_report}")
+        except Exception as e:
+            # La precarga es una optimización: si falla, el worker atiende en frío
+            health.warmup_report = {"error": str(e)}
+            print(f"Error en la precarga: {e}")
+        finally:
+            health.warming_up = False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services = await run_in_threadpool(AppServices, mongo.get_client())
+    services.inject()
+    await run_in_threadpool(services.start)
+    app.state.services = services
+
+    health.stopping = False
+    health.warmup_report = None
+    if WARMUP_ENABLED:
+        # En segundo plano: /healthz responde de inmediato y /readyz da 503
+        # hasta que termina
+        health.warming_up = True
+        threading.Thread(target=services.warm_up, name="warm-up", daemon=True).start()
+    health.started = True
+    try:
+        yield
+    finally:
+        # /readyz pasa a 503 para que el balanceador deje de enviar tráfico
+        health.stopping = True
+        health.started = False
+        await run_in_threadpool(services.stop)
+        mongo.close_client()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+    # Perfilado bajo demanda (solo con la cabecera X-Profile=<ADMIN_TOKEN>)
+    app.add_middleware(ProfilingMiddleware, token=ADMIN_TOKEN, output_dir=PROFILE_DIR)
+    # Compresión brotli/gzip negociada para respuestas grandes
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+    # Sondas de liveness (/healthz) y readiness (/readyz)
+    app.include_router(health.router)
+
+    app.include_router(events.router)
+
+    # Incluir el router de availability
+    app.include_router(availability.router)
+
+    # Endpoints administrativos (requieren X-Admin-Token)
+    app.include_router(admin.router)
+
+    # Reportes de ocupación (requieren X-Admin-Token)
+    app.include_router(analytics.router)
+
+    # Notificaciones push de Google Calendar
+    app.include_router(webhooks.router)
+    return app
 
-# Inyectar la instancia en el router de events
-events.calendar_service = calendar_service
-app.include_router(events.router)
 
-# Incluir el router de availability
-app.include_router(availability.router)
+app = create_app()
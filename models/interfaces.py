@@ -1,4 +1,4 @@
-from typing import Optional, Dict, List
+from typing import Any, Callable, Iterable, Optional, Dict, List
 from models.data_classes import UserTokenData, ConfiguracionCalendar, Cita
 
 
@@ -13,6 +13,40 @@ class ITokenStorage:
         raise NotImplementedError
 
 
+class ICacheBackend:
+    """
+    Almacén clave -> valor con TTL. `get` devuelve `default` si la clave no
+    existe o venció.
+    """
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, keys: Iterable[str]):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str):
+        raise NotImplementedError
+
+
+class IInvalidationBus:
+    """
+    Canal de mensajes de invalidación entre procesos.
+    """
+
+    def publish(self, message: Dict):
+        raise NotImplementedError
+
+    def start(self, callback: Callable[[Dict], None]):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
 class IOAuthService:
     def refresh_access_token(self, name_company: str) -> UserTokenData:
         raise NotImplementedError
@@ -24,11 +58,16 @@ class ICalendarService:
         name_company: str,
         time_min: Optional[str] = None,
         calendar_id: str = "primary",
+        fields: Optional[str] = None,
     ) -> Dict:
         raise NotImplementedError
 
     def get_event(
-        self, name_company: str, event_id: str, calendar_id: str = "primary"
+        self,
+        name_company: str,
+        event_id: str,
+        calendar_id: Optional[str] = None,
+        fields: Optional[str] = None,
     ) -> Dict:
         raise NotImplementedError
 
@@ -42,12 +81,12 @@ class ICalendarService:
         name_company: str,
         event_id: str,
         event: Dict,
-        calendar_id: str = "primary",
+        calendar_id: Optional[str] = None,
     ) -> Dict:
         raise NotImplementedError
 
     def delete_event(
-        self, name_company: str, event_id: str, calendar_id: str = "primary"
+        self, name_company: str, event_id: str, calendar_id: Optional[str] = None
     ) -> Dict:
         raise NotImplementedError
 
@@ -61,6 +100,56 @@ class IDaysAvailableService:
 class IHoursAvailableService:
 
     def get_available_hours(
-        self, name_company: str, date_select: str, time_zone: str
+        self, name_company: str, date_select: str, time_zone: str, compact: bool = False
+    ) -> List:
+        raise NotImplementedError
+
+
+class IAvailabilityGridService:
+
+    def get_available_grid(
+        self,
+        name_company: str,
+        start_date: Optional[str] = None,
+        num_days: int = 14,
+        time_zone: str = "America/Guayaquil",
+        compact: bool = False,
+    ) -> Dict[str, List]:
+        raise NotImplementedError
+
+
+class INextSlotsService:
+
+    def get_next_available_slots(
+        self,
+        name_company: str,
+        count: int = 3,
+        time_zone: str = "America/Guayaquil",
+        horizon_days: int = 30,
     ) -> List[Dict]:
         raise NotImplementedError
+
+
+class ICommonAvailabilityService:
+
+    def get_common_availability(
+        self,
+        name_companies: List[str],
+        start_date: Optional[str] = None,
+        num_days: int = 7,
+        time_zone: str = "America/Guayaquil",
+        duration: Optional[int] = None,
+        compact: bool = False,
+    ) -> Dict[str, List]:
+        raise NotImplementedError
+
+
+class IBulkAvailabilityService:
+
+    def get_available_days_bulk(
+        self,
+        name_companies: List[str],
+        time_zone: str = "America/Guayaquil",
+        horizon_days: int = 60,
+    ) -> Dict[str, Dict]:
+        raise NotImplementedError
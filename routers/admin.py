@@ -0,0 +1,229 @@
+import csv
+import hmac
+import io
+import tempfile
+import requests
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime, timezone
+from typing import Dict, Optional
+from config import ADMIN_TOKEN
+from services.availability_service import AvailabilityService
+from services.bulk_service import BulkDataError, BulkDataService
+from services.cache import CacheService
+from services.archive_service import CitasArchiveService
+from services.watch_service import CalendarWatchService
+from services.rate_limiter import FairRateLimiter
+from services.circuit_breaker import CircuitBreaker
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or not x_admin_token:
+        raise HTTPException(status_code=401, detail="Admin token requerido.")
+    if not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token inválido.")
+
+
+router = APIRouter(
+    prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)]
+)
+
+
+rate_limiter: FairRateLimiter = None
+circuit_breaker: CircuitBreaker = None
+bulk_service: BulkDataService = None
+archive_service: CitasArchiveService = None
+watch_service: CalendarWatchService = None
+availability_service: AvailabilityService = None
+cache_service: CacheService = None
+
+# El cuerpo de una importación se guarda en memoria hasta este tamaño y luego
+# pasa a un archivo temporal
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@router.get("/rate-limiter")
+def get_rate_limiter_metrics() -> Dict:
+    """
+    Métricas del limitador de llamadas a Google: tokens disponibles, peticiones
+    en cola, esperas promedio/máximas y rechazos por empresa.
+    """
+    if rate_limiter is None:
+        raise HTTPException(status_code=404, detail="Rate limiter deshabilitado.")
+    return rate_limiter.snapshot()
+
+
+@router.get("/circuit-breaker")
+def get_circuit_breaker_state() -> Dict:
+    """
+    Estado del circuit breaker de Google Calendar y tasas de error/lentitud.
+    """
+    if circuit_breaker is None:
+        raise HTTPException(status_code=404, detail="Circuit breaker deshabilitado.")
+    return circuit_breaker.snapshot()
+
+
+@router.get("/export/{collection}")
+def export_collection(
+    collection: str = Path(..., pattern="^(citas|configuracion_calendar|credentials)$"),
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    user_id: Optional[str] = Query(None, description="Exportar solo este usuario"),
+    batch_size: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Exporta una colección en streaming (NDJSON o CSV) recorriendo un cursor.
+    """
+    query = {"user_id": user_id} if user_id else None
+    lines = bulk_service.export_lines(collection, file_format, query, batch_size)
+    return StreamingResponse(
+        lines,
+        media_type=_MEDIA_TYPES[file_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{collection}.{file_format}"'
+        },
+    )
+
+
+@router.post("/import/{collection}")
+async def import_collection(
+    request: Request,
+    collection: str = Path(..., pattern="^(citas|configuracion_calendar|credentials)$"),
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(1000, ge=1, le=10000),
+    ordered: bool = Query(
+        False, description="Detenerse en el primer error (bulk_write ordenado)"
+    ),
+) -> Dict:
+    """
+    Importa NDJSON o CSV del cuerpo de la petición con bulk_write por lotes.
+    configuracion_calendar y credentials se reemplazan por user_id y
+    name_company; las citas se insertan.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        source = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            stats = await run_in_threadpool(
+                bulk_service.import_file,
+                collection,
+                source,
+                file_format,
+                batch_size,
+                ordered,
+            )
+        except (BulkDataError, UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            source.detach()
+    # Credenciales, configuraciones y disponibilidad en cache quedaron viejas
+    await run_in_threadpool(availability_service.invalidate_collection, collection)
+    return stats
+
+
+@router.post("/archive/citas")
+def archive_citas(
+    before: Optional[date] = Query(
+        None,
+        description="Archivar citas anteriores a esta fecha (UTC); por defecto, "
+        "hoy menos CITAS_ARCHIVE_AFTER_DAYS",
+    ),
+) -> Dict:
+    """
+    Mueve las citas pasadas a las colecciones mensuales citas_archive_AAAA_MM.
+    `before` debe ser anterior a hoy (UTC).
+    """
+    if before is not None and before >= datetime.now(timezone.utc).date():
+        raise HTTPException(
+            status_code=400, detail="before debe ser anterior a hoy (UTC)."
+        )
+    cutoff = datetime(before.year, before.month, before.day) if before else None
+    try:
+        return archive_service.archive_before(cutoff)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/cache")
+def get_cache_stats() -> Dict:
+    """
+    Backend de la cache, aciertos/fallos y mensajes de invalidación recibidos
+    de otros workers.
+    """
+    return cache_service.snapshot()
+
+
+@router.post("/cache/invalidate")
+def invalidate_cache(
+    prefix: str = Query(
+        ...,
+        min_length=1,
+        description="Prefijo de las claves, p. ej. 'config:' o 'availability:acme:'",
+    ),
+) -> Dict:
+    """
+    Invalida en todos los workers las claves que empiezan con `prefix`.
+    """
+    cache_service.invalidate_prefix(prefix)
+    return {"invalidated": prefix}
+
+
+@router.get("/watch")
+def list_watch_channels() -> Dict:
+    """
+    Canales de notificaciones de Google Calendar registrados y su expiración.
+    """
+    return {"channels": watch_service.list_channels()}
+
+
+@router.post("/watch/renew")
+def renew_watch_channels() -> Dict:
+    """
+    Renueva ahora los canales próximos a vencer (lo mismo que hace el hilo de
+    renovación).
+    """
+    return watch_service.renew_expiring()
+
+
+@router.post("/watch/{name_company}")
+def watch_calendar(
+    name_company: str = Path(..., description="Nombre de la empresa"),
+    calendar_id: Optional[str] = Query(
+        None, description="Por defecto, el calendario de la empresa"
+    ),
+) -> Dict:
+    """
+    Registra (o reemplaza) el canal de notificaciones de un calendario.
+    """
+    return watch_service.watch(name_company, calendar_id)
+
+
+@router.delete("/watch/{name_company}")
+def unwatch_calendar(
+    name_company: str = Path(..., description="Nombre de la empresa"),
+    calendar_id: Optional[str] = Query(
+        None, description="Por defecto, el calendario de la empresa"
+    ),
+) -> Dict:
+    return {"stopped": watch_service.unwatch(name_company, calendar_id)}
+
+
+@router.post("/watch/{name_company}/sync")
+def sync_calendar(
+    name_company: str = Path(..., description="Nombre de la empresa"),
+    calendar_id: Optional[str] = Query(
+        None, description="Por defecto, el calendario de la empresa"
+    ),
+) -> Dict:
+    """
+    Sincroniza ya la copia local del calendario (incremental si hay
+    syncToken).
+    """
+    try:
+        return watch_service.sync(name_company, calendar_id)
+    except requests.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"HTTP Error: {e}")
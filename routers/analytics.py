@@ -0,0 +1,48 @@
+from datetime import date
+from typing import Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from routers.admin import require_admin
+from services.analytics_service import AnalyticsService
+
+router = APIRouter(
+    prefix="/analytics", tags=["Analytics"], dependencies=[Depends(require_admin)]
+)
+
+MAX_ANALYTICS_DAYS = 366
+MAX_ANALYTICS_COMPANIES = 100
+
+analytics_service: AnalyticsService = None
+
+
+@router.get("/utilization", response_model=List[Dict])
+def get_utilization(
+    name_company: List[str] = Query(..., description="Empresas (se repite)"),
+    start_date: date = Query(..., description="Primer día YYYY-MM-DD"),
+    end_date: date = Query(..., description="Último día YYYY-MM-DD (incluido)"),
+    granularity: str = Query("day", pattern="^(day|week)$"),
+    time_zone: str = Query(
+        "America/Guayaquil", description="Zona horaria ,ejemplo America/Bogota"
+    ),
+):
+    """
+    Sesiones reservadas vs. ofrecidas por empresa y día o semana, calculadas
+    con un pipeline de agregación sobre citas.
+    """
+    if (end_date - start_date).days >= MAX_ANALYTICS_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El rango admite como máximo {MAX_ANALYTICS_DAYS} días.",
+        )
+    if len(set(name_company)) > MAX_ANALYTICS_COMPANIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se admiten como máximo {MAX_ANALYTICS_COMPANIES} empresas.",
+        )
+    try:
+        return analytics_service.get_utilization(
+            name_company, start_date, end_date, granularity, time_zone
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Dict
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from typing import List, Dict, Optional, Union
 from services.availability_service import AvailabilityService
-from config import MONGO_URI
+from config import AVAILABILITY_BULK_BATCH_SIZE, AVAILABILITY_BULK_WORKERS
 from models.interfaces import IDaysAvailableService, IHoursAvailableService
 
-
 router = APIRouter(prefix="/availability", tags=["Availability"])
 
+MAX_COMMON_COMPANIES = 20
+MAX_BULK_COMPANIES = 1000
+
 
 @router.get("/test", response_model=str)
 def test_endpoint():
     return "Availability Router is working!"
 
 
+availability_service: AvailabilityService = None
+
+
 def get_availability_service() -> AvailabilityService:
-    return AvailabilityService(mongo_uri=MONGO_URI)
+    # Instancia compartida (inyectada al arrancar en main.py): reutiliza el
+    # cliente de Mongo y conserva la cache entre peticiones
+    return availability_service
 
 
 @router.get("/days", response_model=List[str])
@@ -31,21 +38,163 @@ def get_available_days(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/hours", response_model=List[Dict])
+@router.get("/hours", response_model=Union[List[Dict], List[str]])
 def get_available_hours(
     name_company: str = Query(..., description="Nombre de la empresa"),
     date_select: str = Query(
         ..., description="Fecha seleccionada en formato YYYY-MM-DD"
     ),
     time_zone: str = Query(..., description="Zona horaria ,ejemplo America/Bogota"),
+    response_format: str = Query(
+        "full",
+        alias="format",
+        pattern="^(full|compact)$",
+        description="'compact' devuelve solo las horas ['08:00:00', ...]",
+    ),
     service: IHoursAvailableService = Depends(get_availability_service),
 ):
     try:
         available_hours = service.get_available_hours(
-            name_company, date_select, time_zone
+            name_company, date_select, time_zone, compact=response_format == "compact"
         )
         return available_hours
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/grid", response_model=Dict[str, Union[List[Dict], List[str]]])
+def get_available_grid(
+    name_company: str = Query(..., description="Nombre de la empresa"),
+    start_date: Optional[str] = Query(
+        None, description="Primer día YYYY-MM-DD (por defecto, mañana)"
+    ),
+    days: int = Query(14, ge=1, le=62, description="Cantidad de días del rango"),
+    time_zone: str = Query(
+        "America/Guayaquil", description="Zona horaria ,ejemplo America/Bogota"
+    ),
+    response_format: str = Query(
+        "full",
+        alias="format",
+        pattern="^(full|compact)$",
+        description="'compact' devuelve solo las horas ['08:00:00', ...]",
+    ),
+    service: AvailabilityService = Depends(get_availability_service),
+):
+    try:
+        return service.get_available_grid(
+            name_company,
+            start_date=start_date,
+            num_days=days,
+            time_zone=time_zone,
+            compact=response_format == "compact",
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/next", response_model=List[Dict])
+def get_next_available_slots(
+    name_company: str = Query(..., description="Nombre de la empresa"),
+    count: int = Query(3, ge=1, le=50, description="Cantidad de sesiones libres"),
+    time_zone: str = Query(
+        "America/Guayaquil", description="Zona horaria ,ejemplo America/Bogota"
+    ),
+    horizon_days: int = Query(
+        30, ge=1, le=365, description="Máximo de días hacia adelante a revisar"
+    ),
+    service: AvailabilityService = Depends(get_availability_service),
+):
+    try:
+        return service.get_next_available_slots(
+            name_company, count=count, time_zone=time_zone, horizon_days=horizon_days
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/common", response_model=Dict[str, Union[List[Dict], List[str]]])
+def get_common_availability(
+    name_company: List[str] = Query(
+        ..., description="Empresas que deben estar libres a la vez (se repite)"
+    ),
+    start_date: Optional[str] = Query(
+        None, description="Primer día YYYY-MM-DD (por defecto, mañana)"
+    ),
+    days: int = Query(7, ge=1, le=62, description="Cantidad de días del rango"),
+    time_zone: str = Query(
+        "America/Guayaquil", description="Zona horaria ,ejemplo America/Bogota"
+    ),
+    duration: Optional[int] = Query(
+        None, ge=5, le=1440, description="Duración de la sesión común en minutos"
+    ),
+    response_format: str = Query(
+        "full",
+        alias="format",
+        pattern="^(full|compact)$",
+        description="'compact' devuelve solo las horas ['08:00:00', ...]",
+    ),
+    service: AvailabilityService = Depends(get_availability_service),
+):
+    if len(set(name_company)) > MAX_COMMON_COMPANIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se admiten como máximo {MAX_COMMON_COMPANIES} empresas.",
+        )
+    try:
+        return service.get_common_availability(
+            name_company,
+            start_date=start_date,
+            num_days=days,
+            time_zone=time_zone,
+            duration=duration,
+            compact=response_format == "compact",
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk", response_model=Dict[str, Dict])
+def get_available_days_bulk(
+    name_companies: List[str] = Body(
+        ..., embed=True, description="Empresas a consultar"
+    ),
+    time_zone: str = Body(
+        "America/Guayaquil",
+        embed=True,
+        description="Zona horaria ,ejemplo America/Bogota",
+    ),
+    horizon_days: int = Body(
+        60, embed=True, ge=1, le=365, description="Máximo de días a revisar"
+    ),
+    service: AvailabilityService = Depends(get_availability_service),
+):
+    """
+    Días disponibles de muchas empresas. Las empresas con error se devuelven en
+    "errors" con su status_code y detalle; el resto, en "results". Cada día se
+    evalúa igual que en /availability/days, sin pasar de `horizon_days`.
+    """
+    if len(name_companies) > MAX_BULK_COMPANIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se admiten como máximo {MAX_BULK_COMPANIES} empresas.",
+        )
+    try:
+        return service.get_available_days_bulk(
+            name_companies,
+            time_zone=time_zone,
+            horizon_days=horizon_days,
+            batch_size=AVAILABILITY_BULK_BATCH_SIZE,
+            max_workers=AVAILABILITY_BULK_WORKERS,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, HTTPException, Query, Path, Body
 from typing import Optional, Dict
 import requests
+from fastapi.responses import ORJSONResponse
 from services.calendar_service import GoogleCalendarService
+from services.booking_jobs import BookingJobQueue
+from services.watch_service import CalendarWatchService
 from utils.datetime_utils import convert_to_rfc3339
+from utils.field_mask import FieldMaskError, apply_field_mask, parse_field_mask
 
 router = APIRouter()
 
 
 calendar_service: GoogleCalendarService = None
+booking_queue: BookingJobQueue = None
+watch_service: CalendarWatchService = None
 
 
 @router.get("/events")
@@ -16,6 +22,14 @@ def get_events(
     time_min: Optional[str] = Query(
         None, description="Date 'YYYY-MM-DD HH:MM' or 'YYYY-MM-DDTHH:MM'"
     ),
+    fields: Optional[str] = Query(
+        None,
+        description="Partial response mask, e.g. 'items(id,start,end,summary),nextPageToken'",
+    ),
+    synced: bool = Query(
+        False,
+        description="Serve from the local copy kept up to date by push notifications",
+    ),
 ):
     try:
         if time_min:
@@ -26,10 +40,19 @@ def get_events(
         else:
             time_min_rfc3339 = None
 
+        if synced:
+            mask = parse_field_mask(fields) if fields else None
+            events = watch_service.list_events(
+                name_company=name_company, time_min=time_min_rfc3339
+            )
+            return apply_field_mask(events, mask)
+
         events = calendar_service.list_events(
-            name_company=name_company, time_min=time_min_rfc3339
+            name_company=name_company, time_min=time_min_rfc3339, fields=fields
         )
         return events
+    except FieldMaskError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except requests.HTTPError as http_err:
         raise HTTPException(status_code=500, detail=f"HTTP Error: {http_err}")
     except RuntimeError as e:
@@ -40,10 +63,17 @@ def get_events(
 def read_event(
     event_id: str = Path(..., description="Event ID"),
     name_company: str = Query(..., description="Company name"),
+    fields: Optional[str] = Query(
+        None, description="Partial response mask, e.g. 'id,start,end,summary'"
+    ),
 ):
     try:
-        event = calendar_service.get_event(name_company=name_company, event_id=event_id)
+        event = calendar_service.get_event(
+            name_company=name_company, event_id=event_id, fields=fields
+        )
         return event
+    except FieldMaskError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except requests.HTTPError as http_err:
         raise HTTPException(status_code=500, detail=f"HTTP Error: {http_err}")
     except RuntimeError as e:
@@ -63,10 +93,28 @@ def create_event(
     ),
     usuario: str = Body(..., embed=True, description="Numero de telefono"),
     nombre: str = Body(..., embed=True, description="Nombre del cliente"),
+    mode: str = Query(
+        "sync",
+        pattern="^(sync|async)$",
+        description="'async' encola la reserva y responde 202 con el id del trabajo",
+    ),
 ):
     """
     Crea un evento en Google Calendar.
     """
+    if mode == "async":
+        job = booking_queue.submit(
+            name_company=name_company,
+            start_time=start_time,
+            assistant_email=assistant_email,
+            usuario=usuario,
+            nombre=nombre,
+        )
+        return ORJSONResponse(
+            status_code=202,
+            content=job,
+            headers={"Location": f"/events/jobs/{job['id']}"},
+        )
     try:
         event = calendar_service.create_event(
             name_company=name_company,
@@ -82,6 +130,17 @@ def create_event(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/events/jobs/{job_id}")
+def get_booking_job(job_id: str = Path(..., description="Id del trabajo de reserva")):
+    """
+    Estado de una reserva asíncrona: pending, running, succeeded o failed.
+    """
+    job = booking_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado.")
+    return job
+
+
 @router.put("/events/{event_id}")
 def update_event(
     event_id: str = Path(..., description="Event ID"),
@@ -0,0 +1,55 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from typing import Dict, Optional
+from services import mongo
+
+router = APIRouter(tags=["Health"])
+
+
+# Estado del arranque, actualizado por el lifespan de main.py
+started = False
+warming_up = False
+stopping = False
+warmup_report: Optional[Dict] = None
+
+
+@router.get("/healthz")
+def healthz() -> Dict:
+    """
+    Liveness: el proceso responde. No consulta dependencias.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+def readyz():
+    """
+    Readiness: 200 solo cuando el arranque (y la precarga, si está activa)
+    terminó, Mongo responde y el worker no se está apagando. Mientras tanto
+    503, para que el balanceador no le envíe tráfico.
+    """
+    checks = {
+        "started": started,
+        "warmed_up": started and not warming_up,
+        "stopping": stopping,
+    }
+    checks["mongo"] = False
+    if started:
+        try:
+            checks["mongo"] = mongo.ping()
+        except Exception as e:
+            checks["mongo_error"] = str(e)
+
+    ready = (
+        checks["started"] and checks["warmed_up"] and checks["mongo"] and not stopping
+    )
+    if stopping:
+        status = "stopping"
+    elif not checks["warmed_up"]:
+        status = "starting"
+    else:
+        status = "ready" if ready else "unavailable"
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": status, "checks": checks, "warmup": warmup_report},
+    )
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request, Response
+from services.watch_service import CalendarWatchService
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+
+watch_service: CalendarWatchService = None
+
+
+@router.post("/google/calendar", status_code=204)
+def google_calendar_notification(request: Request):
+    """
+    Receptor de notificaciones push de Google Calendar. El cuerpo viene vacío:
+    todo está en las cabeceras X-Goog-*. Un 2xx confirma la recepción; ante un
+    5xx Google reintenta.
+    """
+    watch_service.handle_notification(request.headers)
+    return Response(status_code=204)
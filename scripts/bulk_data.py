@@ -0,0 +1,96 @@
+"""
+Importa o exporta citas, configuraciones y credenciales en NDJSON o CSV.
+
+    MONGO_URI=mongodb://localhost:27017 python -m scripts.bulk_data export citas --user-id u1 > citas.ndjson
+    python -m scripts.bulk_data import citas --file citas.ndjson --batch-size 5000
+    python -m scripts.bulk_data import configuracion_calendar --format csv --file configs.csv --ordered
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+
+from pymongo import MongoClient
+
+from config import (
+    CACHE_BACKEND,
+    CACHE_INVALIDATION,
+    CACHE_REDIS_URL,
+    MONGO_URI,
+)
+from services.availability_service import CACHE_PREFIXES_BY_COLLECTION
+from services.bulk_service import FORMATS, UPSERT_KEYS, BulkDataError, BulkDataService
+from services.cache import create_cache_service
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Importación/exportación masiva")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("collection", choices=list(UPSERT_KEYS))
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument(
+        "--file", help="Archivo de entrada/salida (por defecto stdin/stdout)"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="bulk_write ordenado: detenerse en el primer error",
+    )
+    parser.add_argument("--user-id", help="Exportar solo este usuario")
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    args = parser.parse_args(argv)
+
+    db = MongoClient(args.mongo_uri)["calendar_app"]
+    service = BulkDataService(db)
+    started = time.perf_counter()
+    try:
+        if args.action == "import":
+            source = (
+                open(args.file, encoding="utf-8-sig", newline="")
+                if args.file
+                else contextlib.nullcontext(sys.stdin)
+            )
+            with source as stream:
+                stats = service.import_file(
+                    args.collection,
+                    stream,
+                    args.format,
+                    args.batch_size,
+                    args.ordered,
+                )
+            stats["seconds"] = round(time.perf_counter() - started, 3)
+            if CACHE_BACKEND != "local" or CACHE_INVALIDATION != "none":
+                # Avisar a la API para que descarte lo que tenía en cache
+                cache = create_cache_service(
+                    CACHE_BACKEND,
+                    db,
+                    redis_url=CACHE_REDIS_URL,
+                    invalidation=CACHE_INVALIDATION,
+                )
+                for prefix in CACHE_PREFIXES_BY_COLLECTION[args.collection]:
+                    cache.invalidate_prefix(prefix)
+            print(json.dumps(stats, ensure_ascii=False, indent=2), file=sys.stderr)
+            return 1 if stats["failed"] else 0
+
+        query = {"user_id": args.user_id} if args.user_id else None
+        target = (
+            open(args.file, "w", encoding="utf-8", newline="")
+            if args.file
+            else contextlib.nullcontext(sys.stdout)
+        )
+        with target as stream:
+            for line in service.export_lines(
+                args.collection, args.format, query, args.batch_size
+            ):
+                stream.write(line)
+    except BulkDataError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
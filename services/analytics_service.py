@@ -0,0 +1,199 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from pymongo import ASCENDING
+from services.availability_service import AvailabilityService
+from services.archive_service import CitasArchiveService
+from utils.datetime_utils import (
+    InvalidTimeZoneError,
+    get_zone,
+    local_minutes_to_utc,
+    utc_to_local_minutes,
+)
+from utils.intervals import free_slot_starts, merge_intervals, parse_hour_ranges
+
+GRANULARITIES = ("day", "week")
+
+
+class AnalyticsService:
+    """
+    Reportes de ocupación por empresa calculados en Mongo.
+
+    Las citas se cuentan con un pipeline de agregación ($match por user_id y
+    rango de fechas, que usa el índice (user_id, fecha), y $group por día o
+    semana local con $dateTrunc, MongoDB 5.0+), de modo que solo las filas
+    resumidas salen de la base. La capacidad (sesiones ofrecidas) se calcula a
+    partir de la ConfiguracionCalendar de cada empresa.
+
+    Si hay archivo de citas, se suman con $unionWith las colecciones
+    mensuales del rango consultado.
+    """
+
+    def __init__(
+        self,
+        availability_service: AvailabilityService,
+        archive_service: Optional[CitasArchiveService] = None,
+    ):
+        self.availability_service = availability_service
+        self.archive_service = archive_service
+        self.db = availability_service.db
+        self.citas_collection = self.db["citas"]
+
+    def ensure_indexes(self):
+        self.citas_collection.create_index(
+            [("user_id", ASCENDING), ("fecha", ASCENDING)], name="user_id_fecha"
+        )
+
+    def get_utilization(
+        self,
+        name_companies: List[str],
+        start_date: date,
+        end_date: date,
+        granularity: str = "day",
+        time_zone: str = "America/Guayaquil",
+    ) -> List[Dict]:
+        """
+        Sesiones reservadas vs. ofrecidas por empresa y período (día o semana
+        que empieza el lunes) entre start_date y end_date, ambos incluidos.
+        """
+        if granularity not in GRANULARITIES:
+            raise HTTPException(
+                status_code=400, detail="granularity debe ser 'day' o 'week'."
+            )
+        if end_date < start_date:
+            raise HTTPException(
+                status_code=400, detail="end_date debe ser posterior a start_date."
+            )
+        try:
+            get_zone(time_zone)
+        except InvalidTimeZoneError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        companies = list(dict.fromkeys(name_companies))
+        user_ids = {
+            doc["name_company"]: doc["user_id"]
+            for doc in self.db["credentials"].find(
+                {"name_company": {"$in": companies}}, {"name_company": 1, "user_id": 1}
+            )
+        }
+        missing = [name for name in companies if name not in user_ids]
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Credentials for company '{missing[0]}' not found.",
+            )
+        configs = {
+            doc["user_id"]: AvailabilityService.config_from_doc(doc)
+            for doc in self.db["configuracion_calendar"].find(
+                {"user_id": {"$in": list(user_ids.values())}}
+            )
+        }
+
+        range_start = local_minutes_to_utc(start_date, 0, time_zone)
+        range_end = local_minutes_to_utc(end_date + timedelta(days=1), 0, time_zone)
+        booked = self._booked_counts(
+            list(user_ids.values()), range_start, range_end, granularity, time_zone
+        )
+
+        rows = []
+        for name_company in companies:
+            user_id = user_ids[name_company]
+            offered = self._offered_counts(
+                configs.get(user_id), start_date, end_date, granularity
+            )
+            periods = sorted(
+                set(offered) | {period for uid, period in booked if uid == user_id}
+            )
+            for period in periods:
+                booked_count = booked.get((user_id, period), 0)
+                offered_count = offered.get(period, 0)
+                rows.append(
+                    {
+                        "name_company": name_company,
+                        "period": period.isoformat(),
+                        "booked": booked_count,
+                        "offered": offered_count,
+                        "utilization": (
+                            round(booked_count / offered_count, 4)
+                            if offered_count
+                            else None
+                        ),
+                    }
+                )
+        return rows
+
+    def _pipeline(
+        self,
+        user_ids: List[str],
+        range_start: datetime,
+        range_end: datetime,
+        granularity: str,
+        time_zone: str,
+    ) -> List[Dict]:
+        trunc = {"date": "$fecha", "unit": granularity, "timezone": time_zone}
+        if granularity == "week":
+            trunc["startOfWeek"] = "monday"
+        match = {
+            "$match": {
+                "user_id": {"$in": user_ids},
+                "fecha": {"$gte": range_start, "$lt": range_end},
+            }
+        }
+        archives = (
+            self.archive_service.collections_between(range_start, range_end)
+            if self.archive_service is not None
+            else []
+        )
+        return [
+            match,
+            *({"$unionWith": {"coll": name, "pipeline": [match]}} for name in archives),
+            {
+                "$group": {
+                    "_id": {"user_id": "$user_id", "period": {"$dateTrunc": trunc}},
+                    "booked": {"$sum": 1},
+                }
+            },
+        ]
+
+    def _booked_counts(
+        self,
+        user_ids: List[str],
+        range_start: datetime,
+        range_end: datetime,
+        granularity: str,
+        time_zone: str,
+    ) -> Dict:
+        counts = {}
+        for row in self.citas_collection.aggregate(
+            self._pipeline(user_ids, range_start, range_end, granularity, time_zone)
+        ):
+            # $dateTrunc devuelve el inicio del período (medianoche local) en UTC
+            period, _ = utc_to_local_minutes(row["_id"]["period"], time_zone)
+            counts[(row["_id"]["user_id"], period)] = row["booked"]
+        return counts
+
+    def _offered_counts(
+        self, config, start_date: date, end_date: date, granularity: str
+    ) -> Dict[date, int]:
+        """
+        Sesiones que ofrece la configuración en cada período: horario laboral
+        menos horas bloqueadas, sin descontar citas.
+        """
+        offered: Dict[date, int] = {}
+        if config is None:
+            return offered
+        blocked = merge_intervals(parse_hour_ranges(config.hora_bloqueada_list or []))
+        day = start_date
+        while day <= end_date:
+            period = (
+                day - timedelta(days=day.weekday()) if granularity == "week" else day
+            )
+            ranges = parse_hour_ranges(
+                self.availability_service.is_workday_with_specific_hours(day, config)
+            )
+            slots = sum(
+                1 for _ in free_slot_starts(ranges, blocked, config.tiempoSesion)
+            )
+            offered[period] = offered.get(period, 0) + slots
+            day += timedelta(days=1)
+        return offered
@@ -0,0 +1,148 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from pymongo import ASCENDING, ReplaceOne
+
+ARCHIVE_PREFIX = "citas_archive_"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class CitasArchiveService:
+    """
+    Archivo frío de citas.
+
+    Las citas con fecha anterior al corte (hoy menos `archive_after_days`) se
+    mueven a colecciones mensuales citas_archive_AAAA_MM, de modo que la
+    colección citas (y su índice) solo guarda la ventana "caliente" que leen
+    los cálculos de disponibilidad. Los reportes leen también los archivos.
+
+    Cada lote se copia primero al archivo (upsert por _id) y después se borra
+    de citas, así que una ejecución interrumpida o dos ejecuciones simultáneas
+    no pierden ni duplican citas.
+    """
+
+    def __init__(
+        self,
+        db,
+        archive_after_days: int = 7,
+        batch_size: int = 1000,
+        interval_seconds: float = 3600.0,
+    ):
+        if archive_after_days < 1:
+            raise ValueError("archive_after_days debe ser al menos 1.")
+        self.db = db
+        self.citas_collection = db["citas"]
+        self.archive_after_days = archive_after_days
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def archive_collection_name(fecha: datetime) -> str:
+        return f"{ARCHIVE_PREFIX}{fecha.year:04d}_{fecha.month:02d}"
+
+    @staticmethod
+    def today_start() -> datetime:
+        return _utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def default_cutoff(self) -> datetime:
+        return self.today_start() - timedelta(days=self.archive_after_days)
+
+    def archive_before(self, cutoff: Optional[datetime] = None) -> Dict:
+        """
+        Mueve a los archivos mensuales las citas con fecha < cutoff. El corte
+        debe ser anterior al inicio de hoy (UTC): archivar citas de hoy o
+        futuras las sacaría de los cálculos de disponibilidad y permitiría
+        reservar otra vez esos horarios.
+        """
+        cutoff = cutoff or self.default_cutoff()
+        if cutoff.tzinfo is not None:
+            cutoff = cutoff.astimezone(timezone.utc).replace(tzinfo=None)
+        if cutoff >= self.today_start():
+            raise ValueError(
+                f"El corte ({cutoff.isoformat()}) debe ser anterior al inicio de "
+                "hoy (UTC)."
+            )
+        moved: Dict[str, int] = {}
+        with self._lock:
+            while True:
+                batch = list(
+                    self.citas_collection.find({"fecha": {"$lt": cutoff}})
+                    .sort("fecha", ASCENDING)
+                    .limit(self.batch_size)
+                )
+                if not batch:
+                    break
+
+                by_collection: Dict[str, List[Dict]] = {}
+                for cita in batch:
+                    by_collection.setdefault(
+                        self.archive_collection_name(cita["fecha"]), []
+                    ).append(cita)
+                for name, citas in by_collection.items():
+                    archive = self.db[name]
+                    if name not in moved:
+                        archive.create_index(
+                            [("user_id", ASCENDING), ("fecha", ASCENDING)],
+                            name="user_id_fecha",
+                        )
+                    archive.bulk_write(
+                        [
+                            ReplaceOne({"_id": cita["_id"]}, cita, upsert=True)
+                            for cita in citas
+                        ],
+                        ordered=False,
+                    )
+                    moved[name] = moved.get(name, 0) + len(citas)
+
+                self.citas_collection.delete_many(
+                    {"_id": {"$in": [cita["_id"] for cita in batch]}}
+                )
+
+        return {
+            "cutoff": cutoff.isoformat(),
+            "moved": sum(moved.values()),
+            "collections": moved,
+        }
+
+    def collections_between(self, start: datetime, end: datetime) -> List[str]:
+        """
+        Colecciones de archivo existentes que pueden tener citas en [start, end).
+        """
+        start = start.astimezone(timezone.utc) if start.tzinfo else start
+        end = end.astimezone(timezone.utc) if end.tzinfo else end
+        first = self.archive_collection_name(start)
+        last = self.archive_collection_name(end)
+        return sorted(
+            name
+            for name in self.db.list_collection_names()
+            if name.startswith(ARCHIVE_PREFIX) and first <= name <= last
+        )
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="citas-archiver", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                result = self.archive_before()
+                if result["moved"]:
+                    print(f"Citas archivadas: {result}")
+            except Exception as e:
+                print(f"Error al archivar citas: {e}")
+            self._stopping.wait(self.interval_seconds)
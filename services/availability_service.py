@@ -1,31 +1,93 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pymongo import MongoClient
-from models.interfaces import IDaysAvailableService, IHoursAvailableService
+from models.interfaces import (
+    IDaysAvailableService,
+    IHoursAvailableService,
+    IAvailabilityGridService,
+    INextSlotsService,
+    ICommonAvailabilityService,
+    IBulkAvailabilityService,
+)
 from models.data_classes import ConfiguracionCalendar, Cita, UserTokenData
-from utils.datetime_utils import convert_to_rfc3339
+from utils.datetime_utils import (
+    InvalidTimeZoneError,
+    convert_to_rfc3339,
+    get_zone,
+    local_minutes_to_utc,
+    minutes_to_hour_str,
+    utc_to_local_minutes,
+)
 from bson.objectid import ObjectId
 from fastapi import HTTPException
 from zoneinfo import ZoneInfo
-
-
-class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
-    def __init__(self, mongo_uri: str):
-        self.client = MongoClient(mongo_uri)
-        self.db = self.client["calendar_app"]
+from utils.profiling import profile_methods
+from services.cache import CacheService, LocalCacheBackend
+from utils.intervals import (
+    Interval,
+    free_slot_starts,
+    intersect_interval_lists,
+    merge_intervals,
+    parse_hour_range,
+    parse_hour_ranges,
+    subtract_intervals,
+)
+
+# Datos en cache que dependen de cada colección, para invalidarlos tras una
+# importación masiva
+CACHE_PREFIXES_BY_COLLECTION = {
+    "citas": ["availability:"],
+    "configuracion_calendar": ["config:", "availability:"],
+    "credentials": ["credentials:", "availability:"],
+}
+
+
+@profile_methods
+class AvailabilityService(
+    IDaysAvailableService,
+    IHoursAvailableService,
+    IAvailabilityGridService,
+    INextSlotsService,
+    ICommonAvailabilityService,
+    IBulkAvailabilityService,
+):
+    def __init__(
+        self,
+        mongo_uri: str = None,
+        client: Optional[MongoClient] = None,
+        db_name: str = "calendar_app",
+        cache: Optional[CacheService] = None,
+        credentials_ttl: Optional[float] = None,
+        config_ttl: Optional[float] = None,
+        availability_ttl: Optional[float] = None,
+    ):
+        # Se puede inyectar un cliente ya creado (p. ej. en los benchmarks)
+        self.client = client if client is not None else MongoClient(mongo_uri)
+        self.db = self.client[db_name]
         self.config_collection = self.db["configuracion_calendar"]
         self.citas_collection = self.db["citas"]
         self.credentials_collection = self.db["credentials"]
-        self.credentials_cache = {}
+        # Sin cache inyectada se usa una LRU local. Un ttl None guarda sin
+        # vencimiento y 0 desactiva la cache de ese tipo; por defecto la
+        # disponibilidad calculada no se guarda
+        self.cache = cache if cache is not None else CacheService(LocalCacheBackend())
+        self.credentials_ttl = credentials_ttl
+        self.config_ttl = config_ttl
+        self.availability_ttl = availability_ttl if availability_ttl is not None else 0
 
     def get_credentials(self, name_company: str) -> UserTokenData:
         """
         Obtiene las credenciales de una empresa basada en name_company.
         Utiliza una cache para evitar múltiples consultas a la base de datos.
         """
-        if name_company in self.credentials_cache:
-            return self.credentials_cache[name_company]
+        return self.cache.get_or_set(
+            f"credentials:{name_company}",
+            lambda: self._load_credentials(name_company),
+            self.credentials_ttl,
+        )
 
+    def _load_credentials(self, name_company: str) -> UserTokenData:
         credential_doc = self.credentials_collection.find_one(
             {"name_company": name_company}
         )
@@ -34,8 +96,11 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
                 status_code=404,
                 detail=f"Credentials for company '{name_company}' not found.",
             )
+        return self.token_from_doc(credential_doc)
 
-        token_data = UserTokenData(
+    @staticmethod
+    def token_from_doc(credential_doc: Dict) -> UserTokenData:
+        return UserTokenData(
             name_company=credential_doc["name_company"],
             user_id=credential_doc["user_id"],
             access_token=credential_doc["access_token"],
@@ -44,13 +109,90 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
             token_type=credential_doc["token_type"],
             expires_in=credential_doc.get("expires_in", 3600),
         )
-        self.credentials_cache[name_company] = token_data
-        return token_data
+
+    def preload_tenants(self, limit: int = 1000) -> Dict[str, int]:
+        """
+        Carga en la cache las credenciales y configuraciones de hasta `limit`
+        empresas con dos consultas, para que las primeras peticiones no vayan
+        a Mongo una por una.
+        """
+        # Un documento incompleto o con tipos inesperados se salta: se
+        # resolverá (o fallará) a pedido, sin cortar la precarga del resto
+        skipped = 0
+        credentials = {}
+        for doc in self.credentials_collection.find().limit(limit):
+            try:
+                credentials[doc["name_company"]] = self.token_from_doc(doc)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Credencial omitida en la precarga ({doc.get('_id')}): {e!r}")
+                skipped += 1
+        configs = {}
+        for doc in self.config_collection.find(
+            {"user_id": {"$in": [token.user_id for token in credentials.values()]}}
+        ):
+            try:
+                configs[doc["user_id"]] = self.config_from_doc(doc)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Configuración omitida en la precarga ({doc.get('_id')}): {e!r}")
+                skipped += 1
+
+        for name_company, token_data in credentials.items():
+            self.cache.set(
+                f"credentials:{name_company}", token_data, self.credentials_ttl
+            )
+        for user_id, config in configs.items():
+            self.cache.set(f"config:{user_id}", config, self.config_ttl)
+        return {
+            "credentials": len(credentials),
+            "configs": len(configs),
+            "skipped": skipped,
+        }
 
     def get_configuracion(self, user_id: str) -> ConfiguracionCalendar:
+        return self.cache.get_or_set(
+            f"config:{user_id}",
+            lambda: self._load_configuracion(user_id),
+            self.config_ttl,
+        )
+
+    def _load_configuracion(self, user_id: str) -> ConfiguracionCalendar:
         config = self.config_collection.find_one({"user_id": user_id})
         if not config:
             raise HTTPException(status_code=404, detail="Configuración no encontrada.")
+        return self.config_from_doc(config)
+
+    def invalidate_credentials(self, name_company: Optional[str] = None):
+        """
+        Descarta las credenciales guardadas de una empresa (o de todas), p. ej.
+        tras refrescar el token o importar credenciales.
+        """
+        if name_company is None:
+            self.cache.invalidate_prefix("credentials:")
+        else:
+            self.cache.invalidate(f"credentials:{name_company}")
+
+    def invalidate_configuracion(self, user_id: Optional[str] = None):
+        if user_id is None:
+            self.cache.invalidate_prefix("config:")
+        else:
+            self.cache.invalidate(f"config:{user_id}")
+
+    def invalidate_availability(self, name_company: Optional[str] = None):
+        """
+        Descarta la disponibilidad calculada de una empresa (o de todas), p. ej.
+        al reservar una cita.
+        """
+        if name_company is None:
+            self.cache.invalidate_prefix("availability:")
+        else:
+            self.cache.invalidate_prefix(f"availability:{name_company}:")
+
+    def invalidate_collection(self, collection: str):
+        for prefix in CACHE_PREFIXES_BY_COLLECTION.get(collection, []):
+            self.cache.invalidate_prefix(prefix)
+
+    @staticmethod
+    def config_from_doc(config: Dict) -> ConfiguracionCalendar:
         return ConfiguracionCalendar(
             user_id=config["user_id"],
             hora_inicio=config["hora_inicio"],
@@ -79,7 +221,6 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
             "domingo",
         ]
         day_name = days_map[day.weekday()]
-        print(day_name, "estoy pot aca")
         # Verifica si el día está en las claves de config.days
         if day_name not in config.days:
             return []
@@ -99,62 +240,43 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
         blocked_times: List[str],
         used_hours: List[str],
         time_zone: str,
-    ) -> List[Dict]:
+        compact: bool = False,
+    ) -> List:
         available_hours = []
         if not specific_hours:
             return available_hours
 
-        tz = ZoneInfo(time_zone)
+        # Valida la zona; los horarios se recorren en minutos de hora local
+        get_zone(time_zone)
+        blocked = parse_hour_ranges(blocked_times)
+        used = set(used_hours)
 
         for hour_range in specific_hours:
             try:
-                start_str, end_str = hour_range.split("-")
-                start_h, start_m = map(int, start_str.split(":"))
-                end_h, end_m = map(int, end_str.split(":"))
+                start, end = parse_hour_range(hour_range)
             except ValueError:
                 print(f"Formato de hora inválido en {hour_range}")
                 continue  # Saltar rangos de horas mal formateados
 
-            # Creamos datetime para el día actual con tz
-            start_time = datetime(
-                day.year, day.month, day.day, start_h, start_m, tzinfo=tz
-            )
-            end_time = datetime(day.year, day.month, day.day, end_h, end_m, tzinfo=tz)
-
-            current_time = start_time
-            while current_time + timedelta(minutes=interval_minutes) <= end_time:
-                hour_str = current_time.strftime("%H:%M:%S")
-
-                # Verificar si la hora está bloqueada
-                is_blocked = False
-                for block in blocked_times:
-                    try:
-                        block_start, block_end = block.split("-")
-                        bs_h, bs_m = map(int, block_start.strip().split(":"))
-                        be_h, be_m = map(int, block_end.strip().split(":"))
-                        block_start_dt = datetime(
-                            day.year, day.month, day.day, bs_h, bs_m, tzinfo=tz
-                        )
-                        block_end_dt = datetime(
-                            day.year, day.month, day.day, be_h, be_m, tzinfo=tz
+            current = start
+            while current + interval_minutes <= end:
+                hour_str = minutes_to_hour_str(current)
+                is_blocked = any(
+                    block_start <= current < block_end
+                    for block_start, block_end in blocked
+                )
+                if not is_blocked and hour_str not in used:
+                    if compact:
+                        available_hours.append(hour_str)
+                    else:
+                        available_hours.append(
+                            {
+                                "id": len(available_hours) + 1,
+                                "hora": hour_str,
+                                "horaFormat": self.convert_to_12_hour_format(hour_str),
+                            }
                         )
-                        if block_start_dt <= current_time < block_end_dt:
-                            is_blocked = True
-                            break
-                    except ValueError:
-                        print(f"Formato de hora bloqueada inválido en {block}")
-                        continue  # Saltar bloques de horas mal formateados
-
-                if not is_blocked and hour_str not in used_hours:
-                    available_hours.append(
-                        {
-                            "id": len(available_hours) + 1,
-                            "hora": hour_str,
-                            "horaFormat": self.convert_to_12_hour_format(hour_str),
-                        }
-                    )
-
-                current_time += timedelta(minutes=interval_minutes)
+                current += interval_minutes
 
         return available_hours
 
@@ -173,12 +295,20 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
                 detail="Formato de date_select inválido. Use YYYY-MM-DD.",
             )
 
+        return self.get_citas_range(user_id, fecha_inicio, fecha_fin)
+
+    def get_citas_range(
+        self, user_id: str, fecha_inicio: datetime, fecha_fin: datetime
+    ) -> List[Cita]:
+        """
+        Obtiene las citas de un usuario con fecha en [fecha_inicio, fecha_fin)
+        con una sola consulta.
+        """
         citas_cursor = self.citas_collection.find(
             {"user_id": user_id, "fecha": {"$gte": fecha_inicio, "$lt": fecha_fin}}
         )
         citas = []
         for cita in citas_cursor:
-            print(cita, "esta es la cita")
             # Asegúrate de que el documento tenga el campo 'fecha'
             if "fecha" not in cita:
                 print("Cita sin fecha encontrada y será ignorada.")
@@ -195,17 +325,46 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
             )
         return citas
 
+    def _used_hours(self, user_id: str, day, time_zone: str) -> List[str]:
+        """
+        Horas de inicio ("HH:MM:SS", hora local) de las citas del día local
+        `day`. Los límites del día se convierten a UTC, como en la grilla: una
+        cita a las 19:30 en UTC-5 ya es el día siguiente en UTC.
+        """
+        citas = self.get_citas_range(
+            user_id,
+            local_minutes_to_utc(day, 0, time_zone),
+            local_minutes_to_utc(day + timedelta(days=1), 0, time_zone),
+        )
+        used_hours = []
+        for cita in citas:
+            if cita.fecha is None:
+                print("Cita con fecha None encontrada y será ignorada.")
+                continue
+            _, minute = utc_to_local_minutes(cita.fecha, time_zone)
+            used_hours.append(minutes_to_hour_str(minute))
+        return used_hours
+
     def get_available_days(
         self, name_company: str, time_zone: str = "America/Guayaquil"
     ) -> List[Dict]:
         """
         Obtiene los días disponibles para una empresa en base a la configuración y las citas existentes.
         """
+        today = datetime.now(timezone.utc).astimezone(self._zone(time_zone)).date()
+        return self.cache.get_or_set(
+            f"availability:{name_company}:days:{time_zone}:{today.isoformat()}",
+            lambda: self._compute_available_days(name_company, time_zone, today),
+            self.availability_ttl,
+        )
+
+    def _compute_available_days(
+        self, name_company: str, time_zone: str, today
+    ) -> List[str]:
         credentials = self.get_credentials(name_company)
         user_id = credentials.user_id
         config = self.get_configuracion(user_id)
         dias_disponibles = config.dia_disponibles
-        today = datetime.now(timezone.utc).astimezone(ZoneInfo(time_zone)).date()
         available_days = []
 
         interval_minutes = config.tiempoSesion
@@ -224,28 +383,8 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
                 # Pasar al siguiente día sin procesar más
                 continue
 
-            # Solo llamamos a get_citas si el día es válido
-            citas = self.get_citas(user_id, day_str)
-
-            # Manejo de casos donde citas podrían no tener la estructura esperada
-            # Si get_citas retorna objetos Cita, asegurarnos de que c.fecha existe
-            used_hours = []
-            for c in citas:
-                print(c, "esta es la cita")
-                # Verificar que c.fecha no sea None
-                if c.fecha is None:
-                    # Si hay un documento sin fecha, lo ignoramos o provocamos un error controlado
-                    print("Cita con fecha None encontrada y será ignorada.")
-                    continue
-                # Convertir la fecha de UTC a la zona horaria especificada
-                if c.fecha.tzinfo is None:
-                    # Asignar UTC si no tiene tzinfo
-                    cita_utc = c.fecha.replace(tzinfo=timezone.utc)
-                else:
-                    cita_utc = c.fecha
-
-                fecha_local = cita_utc.astimezone(ZoneInfo(time_zone))
-                used_hours.append(fecha_local.strftime("%H:%M:%S"))
+            # Solo consultamos las citas si el día es válido
+            used_hours = self._used_hours(user_id, day, time_zone)
 
             # Calcular horas disponibles
             available_hours = self.get_available_hours_day(
@@ -257,8 +396,6 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
                 time_zone,
             )
 
-            print(specific_hours, available_hours, day_str, used_hours)
-
             if len(available_hours) > 0:
                 date_format = day.strftime("%d/%m/%Y")
                 available_days.append(day_str)
@@ -266,23 +403,29 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
         return available_days
 
     def get_available_hours(
-        self, name_company: str, date_select: str, time_zone: str
-    ) -> List[Dict]:
+        self, name_company: str, date_select: str, time_zone: str, compact: bool = False
+    ) -> List:
         """
         Obtiene las horas disponibles para una fecha específica y una empresa, considerando la zona horaria.
+        Con compact=True devuelve solo las horas ("HH:MM:SS"), sin id ni horaFormat.
         """
+        return self.cache.get_or_set(
+            f"availability:{name_company}:hours:{date_select}:{time_zone}:{int(compact)}",
+            lambda: self._compute_available_hours(
+                name_company, date_select, time_zone, compact
+            ),
+            self.availability_ttl,
+        )
+
+    def _compute_available_hours(
+        self, name_company: str, date_select: str, time_zone: str, compact: bool
+    ) -> List:
         credentials = self.get_credentials(name_company)
         user_id = credentials.user_id
         config = self.get_configuracion(user_id)
-        citas = self.get_citas(user_id, date_select)
 
         # Parsear la zona horaria especificada
-        try:
-            tz = ZoneInfo(time_zone)
-        except Exception as e:
-            raise HTTPException(
-                status_code=400, detail=f"Zona horaria inválida: {time_zone}"
-            )
+        self._zone(time_zone)
 
         # Obtener el día seleccionado sin hora, se asume sin zona horaria
         try:
@@ -319,80 +462,474 @@ class AvailabilityService(IDaysAvailableService, IHoursAvailableService):
         # Intervalo de la sesión en minutos
         interval_minutes = config.tiempoSesion
 
-        # Convertir las citas de UTC a la zona horaria especificada
-        used_hours = []
+        # Horas (locales) de las citas del día
+        used_hours = self._used_hours(user_id, day, time_zone)
+
+        return self.get_available_hours_day(
+            day,
+            working_hours,
+            interval_minutes,
+            blocked_times,
+            used_hours,
+            time_zone,
+            compact=compact,
+        )
+
+    def get_available_grid(
+        self,
+        name_company: str,
+        start_date: Optional[str] = None,
+        num_days: int = 14,
+        time_zone: str = "America/Guayaquil",
+        compact: bool = False,
+    ) -> Dict[str, List]:
+        """
+        Obtiene las horas disponibles de varios días consecutivos en una sola
+        llamada: una consulta de credenciales, una de configuración y una sola
+        consulta por rango para las citas de todo el período.
+        Devuelve {"YYYY-MM-DD": [horas disponibles], ...} para cada día del rango.
+        """
+        tz = self._zone(time_zone)
+
+        if start_date:
+            try:
+                first_day = datetime.strptime(start_date, "%Y-%m-%d").date()
+            except ValueError:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Formato de start_date inválido. Use YYYY-MM-DD.",
+                )
+        else:
+            # Igual que get_available_days: a partir de mañana
+            first_day = datetime.now(timezone.utc).astimezone(tz).date() + timedelta(
+                days=1
+            )
+
+        credentials = self.get_credentials(name_company)
+        user_id = credentials.user_id
+        config = self.get_configuracion(user_id)
+
+        # Límites del período en hora local, convertidos a UTC para la consulta
+        range_start = local_minutes_to_utc(first_day, 0, time_zone)
+        last_day = first_day + timedelta(days=num_days)
+        range_end = local_minutes_to_utc(last_day, 0, time_zone)
+        citas = self.get_citas_range(user_id, range_start, range_end)
+
+        used_hours_by_day: Dict = {}
         for cita in citas:
-            # Verificar si cita.fecha tiene información de zona horaria
             if cita.fecha is None:
-                print("Cita con fecha None encontrada y será ignorada.")
                 continue
+            local_day, minute = utc_to_local_minutes(cita.fecha, time_zone)
+            used_hours_by_day.setdefault(local_day, []).append(
+                minutes_to_hour_str(minute)
+            )
 
-            if cita.fecha.tzinfo is None:
-                # Asignar UTC si no tiene tzinfo
-                cita_utc = cita.fecha.replace(tzinfo=timezone.utc)
-            else:
-                cita_utc = cita.fecha
+        grid = {}
+        for offset in range(num_days):
+            day = first_day + timedelta(days=offset)
+            specific_hours = self.is_workday_with_specific_hours(day, config)
+            grid[day.isoformat()] = self.get_available_hours_day(
+                day,
+                specific_hours,
+                config.tiempoSesion,
+                config.hora_bloqueada_list or [],
+                used_hours_by_day.get(day, []),
+                time_zone,
+                compact=compact,
+            )
+        return grid
 
-            # Convertir de UTC a la zona horaria especificada
-            try:
-                fecha_local = cita_utc.astimezone(tz)
-                used_hours.append(fecha_local.strftime("%H:%M:%S"))
-            except Exception as e:
-                print(f"Error al convertir la fecha de la cita: {cita.fecha} - {e}")
+    def iter_available_slots(
+        self,
+        name_company: str,
+        time_zone: str = "America/Guayaquil",
+        desde: Optional[datetime] = None,
+        horizon_days: int = 30,
+        citas_chunk_days: int = 7,
+    ) -> Iterator[datetime]:
+        """
+        Genera perezosamente, en orden cronológico, el inicio (datetime con la
+        zona horaria `time_zone`) de cada sesión libre posterior a `desde`
+        (ahora, por defecto), sin pasar de `horizon_days` días.
+
+        Por cada día laboral se fusionan las horas bloqueadas y las citas
+        (cada una ocupa [inicio, inicio + tiempoSesion)) en intervalos
+        ocupados; una sesión está libre si su inicio no cae dentro de ninguno.
+        Con citas alineadas a la grilla de sesiones coincide con
+        /availability/hours, pero esta compara la hora exacta de la cita: una
+        cita desalineada (p. ej. 08:15 con sesiones de 30 minutos) aquí ocupa
+        también la sesión de las 08:30, y en /hours no. Las citas se leen en
+        bloques de `citas_chunk_days` días, a medida que se avanza, para que
+        quien deje de consumir el generador no pague días que no necesita.
+        """
+        tz = self._zone(time_zone)
+
+        credentials = self.get_credentials(name_company)
+        user_id = credentials.user_id
+        config = self.get_configuracion(user_id)
+        session = config.tiempoSesion
+
+        blocked = parse_hour_ranges(config.hora_bloqueada_list or [])
+
+        now_local = (desde or datetime.now(timezone.utc)).astimezone(tz)
+        first_day = now_local.date()
+        last_day = first_day + timedelta(days=horizon_days)
+        now_minutes = now_local.hour * 60 + now_local.minute
+
+        citas_by_day: Dict = {}
+        loaded_until = first_day
+        for offset in range(horizon_days):
+            day = first_day + timedelta(days=offset)
+            working_hours = self.is_workday_with_specific_hours(day, config)
+            if not working_hours:
                 continue
 
-        print(f"Used hours: {used_hours}")
-        available_hours = []
+            ranges = parse_hour_ranges(working_hours)
+            if not ranges:
+                continue
 
-        for hour_range in working_hours:
-            try:
-                start_str, end_str = hour_range.split("-")
-                start_time = datetime.strptime(start_str, "%H:%M").replace(
-                    year=day.year, month=day.month, day=day.day, tzinfo=tz
+            if day >= loaded_until:
+                chunk_start = day
+                loaded_until = min(day + timedelta(days=citas_chunk_days), last_day)
+                citas = self.get_citas_range(
+                    user_id,
+                    local_minutes_to_utc(chunk_start, 0, time_zone),
+                    local_minutes_to_utc(loaded_until, 0, time_zone),
                 )
-                end_time = datetime.strptime(end_str, "%H:%M").replace(
-                    year=day.year, month=day.month, day=day.day, tzinfo=tz
+                for day_key, intervals in self._citas_intervals_by_day(
+                    (cita.fecha for cita in citas), time_zone, session
+                ).items():
+                    citas_by_day.setdefault(day_key, []).extend(intervals)
+
+            busy = merge_intervals(blocked + citas_by_day.pop(day, []))
+            for start in free_slot_starts(ranges, busy, session):
+                if day == first_day and start <= now_minutes:
+                    continue
+                yield datetime(
+                    day.year, day.month, day.day, start // 60, start % 60, tzinfo=tz
                 )
+
+    def get_next_available_slots(
+        self,
+        name_company: str,
+        count: int = 3,
+        time_zone: str = "America/Guayaquil",
+        horizon_days: int = 30,
+    ) -> List[Dict]:
+        """
+        Devuelve las próximas `count` sesiones libres a partir de ahora. Deja de
+        recorrer días en cuanto las encuentra.
+        """
+        slots = []
+        for slot in self.iter_available_slots(
+            name_company, time_zone=time_zone, horizon_days=horizon_days
+        ):
+            hour_str = slot.strftime("%H:%M:%S")
+            slots.append(
+                {
+                    "fecha": slot.date().isoformat(),
+                    "hora": hour_str,
+                    "horaFormat": self.convert_to_12_hour_format(hour_str),
+                    "inicio": slot.isoformat(),
+                }
+            )
+            if len(slots) >= count:
+                break
+        return slots
+
+    def _load_schedule(
+        self,
+        name_company: str,
+        range_start: datetime,
+        range_end: datetime,
+        time_zone: str,
+    ) -> Tuple[ConfiguracionCalendar, Dict]:
+        """
+        Lee la configuración de una empresa y sus citas del período (una sola
+        consulta), agrupadas por día local como intervalos ocupados.
+        """
+        credentials = self.get_credentials(name_company)
+        config = self.get_configuracion(credentials.user_id)
+        citas = self.get_citas_range(credentials.user_id, range_start, range_end)
+        return config, self._citas_intervals_by_day(
+            (cita.fecha for cita in citas), time_zone, config.tiempoSesion
+        )
+
+    def _free_intervals(
+        self, day, config: ConfiguracionCalendar, citas_by_day: Dict
+    ) -> List[Interval]:
+        """
+        Intervalos libres de un día: horario laboral menos horas bloqueadas y
+        citas.
+        """
+        working = merge_intervals(
+            parse_hour_ranges(self.is_workday_with_specific_hours(day, config))
+        )
+        if not working:
+            return []
+        busy = merge_intervals(
+            parse_hour_ranges(config.hora_bloqueada_list or [])
+            + citas_by_day.get(day, [])
+        )
+        return subtract_intervals(working, busy)
+
+    def get_common_availability(
+        self,
+        name_companies: List[str],
+        start_date: Optional[str] = None,
+        num_days: int = 7,
+        time_zone: str = "America/Guayaquil",
+        duration: Optional[int] = None,
+        compact: bool = False,
+        max_workers: int = 8,
+    ) -> Dict[str, List]:
+        """
+        Sesiones libres a la vez para todas las empresas de `name_companies`
+        en un rango de días.
+
+        Las configuraciones y citas de cada empresa se cargan en paralelo; por
+        cada día se calculan los intervalos libres de cada una y se intersecan
+        con un barrido. Los intervalos comunes se dividen en sesiones de
+        `duration` minutos (por defecto, la sesión más larga entre las
+        empresas).
+        """
+        tz = self._zone(time_zone)
+
+        if start_date:
+            try:
+                first_day = datetime.strptime(start_date, "%Y-%m-%d").date()
             except ValueError:
-                print(f"Formato de hora inválido en {hour_range}")
-                continue  # Saltar rangos de horas mal formateados
+                raise HTTPException(
+                    status_code=400,
+                    detail="Formato de start_date inválido. Use YYYY-MM-DD.",
+                )
+        else:
+            first_day = datetime.now(timezone.utc).astimezone(tz).date() + timedelta(
+                days=1
+            )
+        last_day = first_day + timedelta(days=num_days)
+        range_start = local_minutes_to_utc(first_day, 0, time_zone)
+        range_end = local_minutes_to_utc(last_day, 0, time_zone)
+
+        companies = list(dict.fromkeys(name_companies))
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(companies)))
+        ) as executor:
+            schedules = list(
+                executor.map(
+                    lambda name: self._load_schedule(
+                        name, range_start, range_end, time_zone
+                    ),
+                    companies,
+                )
+            )
 
-            current_time = start_time
-            while current_time + timedelta(minutes=interval_minutes) <= end_time:
-                hour_str = current_time.strftime("%H:%M:%S")
+        step = duration or max(config.tiempoSesion for config, _ in schedules)
+        grid = {}
+        for offset in range(num_days):
+            day = first_day + timedelta(days=offset)
+            shared = intersect_interval_lists(
+                [
+                    self._free_intervals(day, config, citas_by_day)
+                    for config, citas_by_day in schedules
+                ]
+            )
+            slots = []
+            for start, end in shared:
+                current = start
+                while current + step <= end:
+                    hour_str = f"{current // 60:02d}:{current % 60:02d}:00"
+                    if compact:
+                        slots.append(hour_str)
+                    else:
+                        slots.append(
+                            {
+                                "id": len(slots) + 1,
+                                "hora": hour_str,
+                                "horaFormat": self.convert_to_12_hour_format(hour_str),
+                            }
+                        )
+                    current += step
+            grid[day.isoformat()] = slots
+        return grid
 
-                # Verificar si la hora está bloqueada
-                is_blocked = False
-                for block in blocked_times:
+    def get_available_days_bulk(
+        self,
+        name_companies: List[str],
+        time_zone: str = "America/Guayaquil",
+        horizon_days: int = 60,
+        batch_size: int = 100,
+        max_workers: int = 8,
+    ) -> Dict[str, Dict]:
+        """
+        Días disponibles de muchas empresas en una sola llamada.
+
+        Las lecturas se agrupan en lotes de `batch_size` empresas con consultas
+        `$in` (credenciales, configuraciones y citas del período), y el cálculo
+        por empresa se reparte en un pool de `max_workers` hilos. Cada empresa
+        recibe a lo sumo `dia_disponibles` días dentro de los próximos
+        `horizon_days`. Las empresas que fallan se informan en "errors" sin
+        afectar al resto.
+
+        Un día cuenta como disponible con el mismo criterio que
+        /availability/days: alguna sesión cuyo inicio no está bloqueado ni
+        coincide exactamente con la hora de una cita del día local. La única
+        diferencia es el límite de `horizon_days`, que /days no tiene.
+        """
+        tz = self._zone(time_zone)
+
+        # Igual que get_available_days: a partir de mañana
+        first_day = datetime.now(timezone.utc).astimezone(tz).date() + timedelta(days=1)
+        last_day = first_day + timedelta(days=horizon_days)
+        range_start = local_minutes_to_utc(first_day, 0, time_zone)
+        range_end = local_minutes_to_utc(last_day, 0, time_zone)
+
+        companies = list(dict.fromkeys(name_companies))
+        results: Dict[str, Dict] = {}
+        errors: Dict[str, Dict] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for batch_start in range(0, len(companies), batch_size):
+                batch = companies[batch_start : batch_start + batch_size]
+
+                user_ids = {
+                    doc["name_company"]: doc["user_id"]
+                    for doc in self.credentials_collection.find(
+                        {"name_company": {"$in": batch}},
+                        {"name_company": 1, "user_id": 1},
+                    )
+                }
+                configs = {}
+                config_errors = {}
+                for doc in self.config_collection.find(
+                    {"user_id": {"$in": list(user_ids.values())}}
+                ):
+                    # Un documento mal formado solo afecta a su empresa
                     try:
-                        block_start, block_end = block.split("-")
-                        block_start_dt = datetime.strptime(
-                            block_start, "%H:%M"
-                        ).replace(
-                            year=day.year, month=day.month, day=day.day, tzinfo=tz
-                        )
-                        block_end_dt = datetime.strptime(block_end, "%H:%M").replace(
-                            year=day.year, month=day.month, day=day.day, tzinfo=tz
-                        )
-                        if block_start_dt <= current_time < block_end_dt:
-                            is_blocked = True
-                            break
-                    except ValueError:
-                        print(f"Formato de hora bloqueada inválido en {block}")
-                        continue  # Saltar bloques de horas mal formateados
-
-                if not is_blocked and hour_str not in used_hours:
-                    available_hours.append(
-                        {
-                            "id": len(available_hours) + 1,
-                            "hora": hour_str,
-                            "horaFormat": self.convert_to_12_hour_format(hour_str),
+                        configs[doc["user_id"]] = self.config_from_doc(doc)
+                    except (KeyError, TypeError, ValueError) as e:
+                        config_errors[doc["user_id"]] = {
+                            "status_code": 500,
+                            "detail": f"Configuración inválida: {e!r}",
+                        }
+                citas_by_user: Dict[str, List[datetime]] = {}
+                for doc in self.citas_collection.find(
+                    {
+                        "user_id": {"$in": list(configs)},
+                        "fecha": {"$gte": range_start, "$lt": range_end},
+                    },
+                    {"user_id": 1, "fecha": 1},
+                ):
+                    citas_by_user.setdefault(doc["user_id"], []).append(doc["fecha"])
+
+                futures = {}
+                for name_company in batch:
+                    user_id = user_ids.get(name_company)
+                    if user_id is None:
+                        errors[name_company] = {
+                            "status_code": 404,
+                            "detail": f"Credentials for company '{name_company}' not found.",
                         }
+                        continue
+                    if user_id in config_errors:
+                        errors[name_company] = config_errors[user_id]
+                        continue
+                    config = configs.get(user_id)
+                    if config is None:
+                        errors[name_company] = {
+                            "status_code": 404,
+                            "detail": "Configuración no encontrada.",
+                        }
+                        continue
+                    futures[name_company] = executor.submit(
+                        self._available_days_from,
+                        config,
+                        citas_by_user.get(user_id, []),
+                        first_day,
+                        horizon_days,
+                        time_zone,
                     )
 
-                current_time += timedelta(minutes=interval_minutes)
+                for name_company, future in futures.items():
+                    try:
+                        days = future.result()
+                    except Exception as e:
+                        errors[name_company] = {"status_code": 500, "detail": str(e)}
+                        continue
+                    results[name_company] = {
+                        "next_available_day": days[0] if days else None,
+                        "available_days": days,
+                    }
+
+        return {"results": results, "errors": errors}
+
+    def _available_days_from(
+        self,
+        config: ConfiguracionCalendar,
+        fechas: List[datetime],
+        first_day,
+        horizon_days: int,
+        time_zone: str,
+    ) -> List[str]:
+        """
+        Días con al menos una sesión libre, calculados con datos ya leídos y
+        con get_available_hours_day, igual que _compute_available_days.
+        """
+        session = config.tiempoSesion
+        if not isinstance(session, int) or session <= 0:
+            raise ValueError(f"tiempoSesion inválido: {session!r}")
+        blocked_times = config.hora_bloqueada_list or []
+        used_hours_by_day: Dict = {}
+        for fecha in fechas:
+            if fecha is None:
+                continue
+            local_day, minute = utc_to_local_minutes(fecha, time_zone)
+            used_hours_by_day.setdefault(local_day, []).append(
+                minutes_to_hour_str(minute)
+            )
+
+        available_days = []
+        for offset in range(horizon_days):
+            if len(available_days) >= config.dia_disponibles:
+                break
+            day = first_day + timedelta(days=offset)
+            specific_hours = self.is_workday_with_specific_hours(day, config)
+            if not specific_hours:
+                continue
+            if self.get_available_hours_day(
+                day,
+                specific_hours,
+                session,
+                blocked_times,
+                used_hours_by_day.get(day, []),
+                time_zone,
+                compact=True,
+            ):
+                available_days.append(day.isoformat())
+        return available_days
 
-        return available_hours
+    @staticmethod
+    def _zone(time_zone: str) -> ZoneInfo:
+        try:
+            return get_zone(time_zone)
+        except InvalidTimeZoneError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @staticmethod
+    def _citas_intervals_by_day(
+        fechas: Iterable[Optional[datetime]], time_zone: str, session: int
+    ) -> Dict:
+        """
+        Agrupa las fechas (UTC) de las citas por día local como intervalos
+        [inicio, inicio + sesión) en minutos.
+        """
+        by_day: Dict = {}
+        for fecha in fechas:
+            if fecha is None:
+                continue
+            local_day, minute = utc_to_local_minutes(fecha, time_zone)
+            by_day.setdefault(local_day, []).append((minute, minute + session))
+        return by_day
 
     @staticmethod
     def convert_to_12_hour_format(hour: str) -> str:
@@ -0,0 +1,340 @@
+import threading
+import uuid
+import requests
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from services.calendar_service import GoogleCalendarService
+from services.reservations import SlotReservations
+
+
+def _utcnow() -> datetime:
+    # Mongo guarda las fechas como UTC sin zona horaria
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BookingJobQueue:
+    """
+    Cola de reservas asíncronas respaldada en Mongo.
+
+    `submit` valida la petición, reserva el horario y guarda un trabajo
+    "pending" en la colección booking_jobs; un pool de hilos reclama los
+    trabajos con find_one_and_update (con un lease, para recuperar los de un
+    worker caído) y ejecuta GoogleCalendarService.create_event. Los errores
+    transitorios (429 del limitador, 503 del circuit breaker) se reintentan con
+    espera creciente hasta `max_attempts`; el resto marca el trabajo "failed".
+
+    El horario se bloquea con SlotReservations (el mismo bloqueo que usa
+    POST /events síncrono) y además se guarda una cita provisoria
+    (status "pending", event_id = id del trabajo) para que /availability deje
+    de ofrecerlo mientras el trabajo espera. Al terminar bien, create_event
+    confirma esa cita; si falla, se borra. El bloqueo se libera en ambos casos.
+    La reserva vence `lease_seconds` después de que vence el lease (o de que
+    termina la espera del próximo reintento) y se extiende en cada reclamo:
+    si todo el servicio cae, el horario no queda bloqueado para siempre.
+
+    Cada reclamo guarda un `lease_owner` propio: un worker cuyo lease venció
+    (y otro reclamó el trabajo) no puede cerrarlo ni liberar la reserva.
+
+    Un trabajo que falla puede haber dejado el evento creado en Google (p. ej.
+    si falló al guardar la cita, o si se agotaron los reintentos tras caerse
+    un worker): al marcarlo "failed" se borra el evento con el id del trabajo.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    RETRYABLE_STATUS = (429, 503)
+
+    def __init__(
+        self,
+        calendar_service: GoogleCalendarService,
+        db,
+        workers: int = 4,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 2.0,
+    ):
+        self.calendar_service = calendar_service
+        self.availability_service = calendar_service.availability_service
+        self.jobs_collection = db["booking_jobs"]
+        self.reservations = calendar_service.reservations
+        self.citas_collection = db["citas"]
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def submit(
+        self,
+        name_company: str,
+        start_time: str,
+        assistant_email: str,
+        usuario: str,
+        nombre: str,
+    ) -> Dict:
+        """
+        Reserva el horario y encola la creación del evento. Lanza 404 si la
+        empresa no existe, 400 si start_time es inválido y 409 si el horario ya
+        está tomado o reservado.
+        """
+        credentials = self.availability_service.get_credentials(name_company)
+        configuracion = self.availability_service.get_configuracion(credentials.user_id)
+        try:
+            start_dt = datetime.fromisoformat(start_time)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="Formato de start_time inválido. Use RFC3339.",
+            )
+        fecha = SlotReservations.to_utc(start_dt)
+
+        job_id = uuid.uuid4().hex
+        now = _utcnow()
+        reservation_id = self.reservations.acquire(
+            credentials.user_id, fecha, job_id, ttl_seconds=2 * self.lease_seconds
+        )
+
+        job = {
+            "_id": job_id,
+            "status": self.PENDING,
+            "name_company": name_company,
+            "reservation_id": reservation_id,
+            "request": {
+                "name_company": name_company,
+                "start_time": start_time,
+                "assistant_email": assistant_email,
+                "usuario": usuario,
+                "nombre": nombre,
+            },
+            "attempts": 0,
+            "available_at": now,
+            "lease_until": None,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None,
+        }
+        try:
+            self.citas_collection.insert_one(
+                {
+                    "usuario": usuario,
+                    "email": assistant_email,
+                    "nombre": nombre,
+                    "tipo_cita": configuracion.titulo_evento,
+                    "fecha": fecha,
+                    "user_id": credentials.user_id,
+                    "event_id": job_id,
+                    "status": self.PENDING,
+                }
+            )
+            self.jobs_collection.insert_one(job)
+        except Exception:
+            self._discard_provisional_cita(job_id)
+            self.reservations.release(reservation_id, job_id)
+            raise
+        self.availability_service.invalidate_availability(name_company)
+        with self._wakeup:
+            self._wakeup.notify()
+        return self._public(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self.jobs_collection.find_one({"_id": job_id})
+        return self._public(job) if job else None
+
+    def start(self):
+        self._stopping.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"booking-worker-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Error al reclamar trabajos de reserva: {e}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self._process(job)
+
+    def _claim(self) -> Optional[Dict]:
+        now = _utcnow()
+        return self.jobs_collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": self.PENDING, "available_at": {"$lte": now}},
+                    # Lease vencido: el worker que lo tenía se cayó
+                    {"status": self.RUNNING, "lease_until": {"$lt": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": self.RUNNING,
+                    "lease_owner": uuid.uuid4().hex,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _process(self, job: Dict):
+        if job["attempts"] > self.max_attempts:
+            self._finish(
+                job,
+                self.FAILED,
+                error={"status_code": 500, "detail": "Se agotaron los reintentos."},
+            )
+            return
+        if not self._hold_reservation(job, job["lease_until"]):
+            self._finish(
+                job,
+                self.FAILED,
+                error={
+                    "status_code": 409,
+                    "detail": "El horario ya está reservado.",
+                },
+            )
+            return
+        try:
+            # El id del trabajo es también el id del evento en Google: si un
+            # intento anterior llegó a crearlo, el reintento no crea otro
+            event = self.calendar_service.create_event(
+                **job["request"], event_id=job["_id"], slot_reserved=True
+            )
+        except HTTPException as e:
+            error = {"status_code": e.status_code, "detail": e.detail}
+            if (
+                e.status_code in self.RETRYABLE_STATUS
+                and job["attempts"] < self.max_attempts
+            ):
+                self._retry(job, error)
+            else:
+                self._finish(job, self.FAILED, error=error)
+            return
+        except Exception as e:
+            self._finish(job, self.FAILED, error={"status_code": 500, "detail": str(e)})
+            return
+        self._finish(job, self.SUCCEEDED, result=event)
+
+    def _retry(self, job: Dict, error: Dict):
+        now = _utcnow()
+        delay = self.retry_backoff * (2 ** (job["attempts"] - 1))
+        available_at = now + timedelta(seconds=delay)
+        self._hold_reservation(job, available_at)
+        self.jobs_collection.update_one(
+            self._owned(job),
+            {
+                "$set": {
+                    "status": self.PENDING,
+                    "available_at": available_at,
+                    "lease_until": None,
+                    "updated_at": now,
+                    "error": error,
+                }
+            },
+        )
+
+    def _finish(
+        self,
+        job: Dict,
+        status: str,
+        result: Optional[Dict] = None,
+        error: Optional[Dict] = None,
+    ):
+        updated = self.jobs_collection.update_one(
+            self._owned(job),
+            {
+                "$set": {
+                    "status": status,
+                    "lease_until": None,
+                    "updated_at": _utcnow(),
+                    "result": result,
+                    "error": error,
+                }
+            },
+        )
+        if updated.matched_count == 0:
+            # El lease venció y otro worker reclamó el trabajo: él lo cierra
+            return
+        if status == self.FAILED:
+            self._discard_google_event(job)
+            self._discard_provisional_cita(job["_id"])
+            self.availability_service.invalidate_availability(job["name_company"])
+        self.reservations.release(job["reservation_id"], job["_id"])
+
+    def _hold_reservation(self, job: Dict, until: datetime) -> bool:
+        """
+        Extiende la reserva del trabajo hasta un lease después de `until`.
+        """
+        ttl_seconds = (until - _utcnow()).total_seconds() + self.lease_seconds
+        return self.reservations.refresh(job["reservation_id"], job["_id"], ttl_seconds)
+
+    def _discard_google_event(self, job: Dict):
+        """
+        Borra el evento que algún intento pudo crear en Google con el id del
+        trabajo. 404 y 410 indican que no llegó a crearse (o ya se borró).
+        """
+        try:
+            self.calendar_service.delete_event(job["name_company"], job["_id"])
+        except Exception as e:
+            if isinstance(e, HTTPException):
+                status_code = e.status_code
+            elif isinstance(e, requests.HTTPError) and e.response is not None:
+                status_code = e.response.status_code
+            else:
+                status_code = None
+            if status_code not in (404, 410):
+                print(f"No se pudo borrar el evento {job['_id']} en Google: {e}")
+
+    def _owned(self, job: Dict) -> Dict:
+        """
+        Filtro que solo coincide si este worker sigue teniendo el lease.
+        """
+        return {
+            "_id": job["_id"],
+            "status": self.RUNNING,
+            "lease_owner": job["lease_owner"],
+        }
+
+    def _discard_provisional_cita(self, job_id: str):
+        self.citas_collection.delete_one({"event_id": job_id, "status": self.PENDING})
+
+    @staticmethod
+    def _public(job: Dict) -> Dict:
+        return {
+            "id": job["_id"],
+            "status": job["status"],
+            "name_company": job["name_company"],
+            "start_time": job["request"]["start_time"],
+            "attempts": job["attempts"],
+            "created_at": job["created_at"].isoformat(),
+            "updated_at": job["updated_at"].isoformat(),
+            "result": job["result"],
+            "error": job["error"],
+        }
@@ -0,0 +1,340 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional
+from bson import json_util
+from bson.objectid import ObjectId
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+# Columnas de cada colección en CSV y cómo convertir cada celda al importar.
+# Los campos anidados (listas y diccionarios) se guardan como JSON en la celda.
+_STR = str
+_INT = int
+_JSON = json.loads
+
+
+def _bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "si", "sí", "yes")
+
+
+_DATETIME = datetime.fromisoformat
+
+CSV_SCHEMAS: Dict[str, Dict[str, Callable[[str], object]]] = {
+    "citas": {
+        "_id": _STR,
+        "usuario": _STR,
+        "email": _STR,
+        "nombre": _STR,
+        "tipo_cita": _STR,
+        "fecha": _DATETIME,
+        "user_id": _STR,
+    },
+    "configuracion_calendar": {
+        "user_id": _STR,
+        "hora_inicio": _STR,
+        "hora_fin": _STR,
+        "tiempoSesion": _INT,
+        "dia_disponibles": _INT,
+        "hora_bloqueada_list": _JSON,
+        "all_day": _bool,
+        "days": _JSON,
+        "time_global": _bool,
+        "titulo_evento": _STR,
+        "calendar_id": _STR,
+        "description_event": _STR,
+    },
+    "credentials": {
+        "name_company": _STR,
+        "user_id": _STR,
+        "access_token": _STR,
+        "refresh_token": _STR,
+        "scope": _STR,
+        "token_type": _STR,
+        "expiry_time": _DATETIME,
+    },
+}
+
+# Campo por el que se reemplaza (upsert) cada documento al importar; las citas
+# se insertan, salvo que traigan _id (p. ej. al reimportar una exportación).
+UPSERT_KEYS: Dict[str, Optional[str]] = {
+    "citas": None,
+    "configuracion_calendar": "user_id",
+    "credentials": "name_company",
+}
+
+FORMATS = ("ndjson", "csv")
+MAX_REPORTED_ERRORS = 100
+
+
+class BulkDataError(ValueError):
+    pass
+
+
+class ImportStats:
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.upserted = 0
+        self.matched = 0
+        self.modified = 0
+        self.batches = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+        self.stopped = False
+
+    def error(self, index: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"index": index, "message": message})
+
+    def as_dict(self) -> Dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "upserted": self.upserted,
+            "matched": self.matched,
+            "modified": self.modified,
+            "failed": self.failed,
+            "batches": self.batches,
+            "stopped": self.stopped,
+            "errors": self.errors,
+        }
+
+
+class BulkDataService:
+    """
+    Importación y exportación masiva de citas, configuraciones y credenciales
+    en NDJSON o CSV.
+
+    La importación agrupa los documentos en lotes de `batch_size` operaciones
+    de bulk_write (ordenado o no) y la exportación recorre un cursor con el
+    mismo tamaño de lote, de modo que la memoria no crece con el volumen.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def _collection(self, collection: str):
+        if collection not in UPSERT_KEYS:
+            raise BulkDataError(
+                f"Colección no soportada: '{collection}'. "
+                f"Use una de: {', '.join(UPSERT_KEYS)}."
+            )
+        return self.db[collection]
+
+    @staticmethod
+    def _check_format(fmt: str):
+        if fmt not in FORMATS:
+            raise BulkDataError(f"Formato no soportado: '{fmt}'. Use ndjson o csv.")
+
+    def import_file(
+        self,
+        collection: str,
+        source: IO[str],
+        fmt: str = "ndjson",
+        batch_size: int = 1000,
+        ordered: bool = False,
+    ) -> Dict:
+        """
+        Importa los documentos de `source` (texto NDJSON o CSV) a `collection`.
+        """
+        self._check_format(fmt)
+        documents = (
+            parse_ndjson(source) if fmt == "ndjson" else parse_csv(source, collection)
+        )
+        return self.import_documents(collection, documents, batch_size, ordered)
+
+    def import_documents(
+        self,
+        collection: str,
+        documents: Iterable,
+        batch_size: int = 1000,
+        ordered: bool = False,
+    ) -> Dict:
+        """
+        Escribe `documents` con bulk_write en lotes de `batch_size`. Con
+        ordered=True la importación se detiene en el primer error; si no, los
+        documentos con error se informan y el resto se escribe igual. Los
+        elementos de `documents` que son excepciones (líneas mal formadas) se
+        cuentan como errores.
+        """
+        target = self._collection(collection)
+        key = UPSERT_KEYS[collection]
+        stats = ImportStats()
+        operations = []
+        indexes = []
+
+        for index, document in enumerate(documents):
+            stats.received += 1
+            error = None
+            if isinstance(document, Exception):
+                error = str(document)
+            else:
+                try:
+                    operations.append(self._operation(document, key))
+                    indexes.append(index)
+                except BulkDataError as e:
+                    error = str(e)
+            if error is not None:
+                if not ordered:
+                    stats.error(index, error)
+                    continue
+                # Como en bulk_write ordenado, lo anterior al primer error se
+                # escribe antes de detenerse
+                if operations and not self._write(
+                    target, operations, indexes, ordered, stats
+                ):
+                    break
+                operations, indexes = [], []
+                stats.error(index, error)
+                stats.stopped = True
+                break
+            if len(operations) >= batch_size:
+                if not self._write(target, operations, indexes, ordered, stats):
+                    break
+                operations, indexes = [], []
+
+        if operations and not stats.stopped:
+            self._write(target, operations, indexes, ordered, stats)
+        return stats.as_dict()
+
+    @staticmethod
+    def _operation(document: Dict, key: Optional[str]):
+        if not isinstance(document, dict):
+            raise BulkDataError("Cada registro debe ser un objeto JSON.")
+        if key is None:
+            if "_id" in document:
+                return ReplaceOne({"_id": document["_id"]}, document, upsert=True)
+            return InsertOne(document)
+        if not document.get(key):
+            raise BulkDataError(f"Falta el campo '{key}'.")
+        # Se reemplaza por la clave de negocio; el _id del archivo se ignora
+        document = {field: value for field, value in document.items() if field != "_id"}
+        return ReplaceOne({key: document[key]}, document, upsert=True)
+
+    @staticmethod
+    def _write(target, operations, indexes, ordered: bool, stats: ImportStats) -> bool:
+        stats.batches += 1
+        try:
+            result = target.bulk_write(operations, ordered=ordered)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for write_error in details.get("writeErrors", []):
+                stats.error(
+                    indexes[write_error["index"]], write_error.get("errmsg", "")
+                )
+            if ordered:
+                stats.stopped = True
+        stats.inserted += details.get("nInserted", 0)
+        stats.upserted += details.get("nUpserted", 0)
+        stats.matched += details.get("nMatched", 0)
+        stats.modified += details.get("nModified", 0)
+        return not stats.stopped
+
+    def export_documents(
+        self,
+        collection: str,
+        query: Optional[Dict] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        target = self._collection(collection)
+        return iter(target.find(query or {}).batch_size(batch_size))
+
+    def export_lines(
+        self,
+        collection: str,
+        fmt: str = "ndjson",
+        query: Optional[Dict] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[str]:
+        """
+        Genera la exportación línea a línea (incluido el salto de línea).
+        """
+        self._check_format(fmt)
+        documents = self.export_documents(collection, query, batch_size)
+        if fmt == "ndjson":
+            return to_ndjson(documents)
+        return to_csv(documents, collection)
+
+
+def parse_ndjson(source: Iterable[str]) -> Iterator:
+    """
+    Un documento por línea, en JSON extendido de Mongo ({"$date": ...},
+    {"$oid": ...}). Las líneas inválidas se entregan como BulkDataError.
+    """
+    for number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json_util.loads(line)
+        except ValueError as e:
+            yield BulkDataError(f"Línea {number}: JSON inválido ({e}).")
+
+
+def parse_csv(source: Iterable[str], collection: str) -> Iterator:
+    schema = CSV_SCHEMAS.get(collection)
+    if schema is None:
+        raise BulkDataError(f"Colección no soportada: '{collection}'.")
+    reader = csv.DictReader(source)
+    for row in reader:
+        document = {}
+        try:
+            for field, value in row.items():
+                if field not in schema or value is None:
+                    continue
+                convert = schema[field]
+                if value == "":
+                    if convert is _STR and field != "_id":
+                        document[field] = ""
+                    continue
+                if field == "_id" and ObjectId.is_valid(value):
+                    document[field] = ObjectId(value)
+                else:
+                    document[field] = convert(value)
+        except ValueError as e:
+            yield BulkDataError(f"Fila {reader.line_num}: {e}")
+            continue
+        yield document
+
+
+def to_ndjson(documents: Iterable[Dict]) -> Iterator[str]:
+    for document in documents:
+        yield (
+            json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS)
+            + "\n"
+        )
+
+
+def to_csv(documents: Iterable[Dict], collection: str) -> Iterator[str]:
+    fields = list(CSV_SCHEMAS[collection])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(fields)
+    yield flush()
+    for document in documents:
+        row = []
+        for field in fields:
+            value = document.get(field)
+            if value is None:
+                row.append("")
+            elif isinstance(value, (dict, list)):
+                row.append(json.dumps(value, ensure_ascii=False))
+            elif isinstance(value, bool):
+                row.append("true" if value else "false")
+            elif isinstance(value, datetime):
+                row.append(value.isoformat())
+            else:
+                row.append(str(value))
+        writer.writerow(row)
+        yield flush()
@@ -0,0 +1,468 @@
+import json
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from bson.binary import Binary
+from pymongo import ASCENDING, CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+from models.interfaces import ICacheBackend, IInvalidationBus
+from utils.lru import LRUCache
+
+try:
+    import redis
+except ImportError:  # redis es opcional; solo hace falta con CACHE_BACKEND=redis
+    redis = None
+
+BACKENDS = ("local", "redis", "mongo")
+INVALIDATION_BUSES = ("none", "redis", "mongo")
+
+# Centinela para distinguir "no está en la cache" de un valor None guardado
+MISSING = object()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class LocalCacheBackend(ICacheBackend):
+    """
+    LRU en memoria del proceso, con TTL por entrada.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self._data = LRUCache(maxsize)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key)
+            return default
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data.set(key, (expires_at, value))
+
+    def delete(self, keys: Iterable[str]):
+        for key in keys:
+            self._data.pop(key)
+
+    def delete_prefix(self, prefix: str):
+        self._data.pop_matching(lambda key: key.startswith(prefix))
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class MongoCacheBackend(ICacheBackend):
+    """
+    Cache compartida en una colección de Mongo. Los valores se guardan
+    serializados con pickle y un índice TTL sobre `expires_at` borra los
+    vencidos (el monitor TTL corre cada ~60 s, por eso `get` también compara
+    la fecha).
+    """
+
+    def __init__(self, db, collection_name: str = "cache_entries"):
+        self.collection = db[collection_name]
+
+    def ensure_indexes(self):
+        self.collection.create_index(
+            [("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        doc = self.collection.find_one({"_id": key})
+        if doc is None:
+            return default
+        expires_at = doc.get("expires_at")
+        if expires_at is not None and expires_at <= _utcnow():
+            return default
+        return pickle.loads(doc["value"])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        doc = {
+            "_id": key,
+            "value": Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)),
+        }
+        if ttl:
+            doc["expires_at"] = _utcnow() + timedelta(seconds=ttl)
+        self.collection.replace_one({"_id": key}, doc, upsert=True)
+
+    def delete(self, keys: Iterable[str]):
+        self.collection.delete_many({"_id": {"$in": list(keys)}})
+
+    def delete_prefix(self, prefix: str):
+        # Una regex anclada al inicio usa el índice de _id
+        self.collection.delete_many({"_id": {"$regex": f"^{re.escape(prefix)}"}})
+
+
+class RedisCacheBackend(ICacheBackend):
+    """
+    Cache compartida en Redis (o un servidor compatible), con valores
+    serializados con pickle y TTL nativo.
+    """
+
+    DELETE_BATCH = 500
+
+    def __init__(self, url: str = "redis://localhost:6379/0", client=None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError(
+                    "CACHE_BACKEND=redis requiere el paquete 'redis' (pip install redis)."
+                )
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raw = self.client.get(key)
+        if raw is None:
+            return default
+        return pickle.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.client.set(
+            key,
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            px=int(ttl * 1000) if ttl else None,
+        )
+
+    def delete(self, keys: Iterable[str]):
+        keys = list(keys)
+        if keys:
+            self.client.delete(*keys)
+
+    def delete_prefix(self, prefix: str):
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+        batch: List = []
+        for key in self.client.scan_iter(match=pattern, count=self.DELETE_BATCH):
+            batch.append(key)
+            if len(batch) >= self.DELETE_BATCH:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+
+class RedisInvalidationBus(IInvalidationBus):
+    """
+    Invalidaciones por pub/sub de Redis.
+    """
+
+    def __init__(self, client, channel: str = "cache-invalidation"):
+        self.client = client
+        self.channel = channel
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, message: Dict):
+        self.client.publish(self.channel, json.dumps(message))
+
+    def start(self, callback: Callable[[Dict], None]):
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(callback,), name="cache-invalidation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, callback: Callable[[Dict], None]):
+        while not self._stopping.is_set():
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                while not self._stopping.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        callback(json.loads(message["data"]))
+            except Exception as e:
+                print(f"Error en el canal de invalidación de Redis: {e}")
+                self._stopping.wait(1.0)
+            finally:
+                pubsub.close()
+
+
+class MongoInvalidationBus(IInvalidationBus):
+    """
+    Invalidaciones por una colección "capped" de Mongo leída con un cursor
+    tailable (funciona sin replica set, a diferencia de los change streams).
+    Si el cursor se cierra se vuelve a abrir desde el último mensaje visto.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection_name: str = "cache_invalidations",
+        size_bytes: int = 1024 * 1024,
+        poll_interval: float = 1.0,
+    ):
+        self.db = db
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self.poll_interval = poll_interval
+        self.collection = db[collection_name]
+        self._ready = False
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_collection(self):
+        if self.collection_name not in self.db.list_collection_names():
+            try:
+                self.db.create_collection(
+                    self.collection_name, capped=True, size=self.size_bytes
+                )
+            except CollectionInvalid:
+                pass  # Otro worker la creó primero
+        self._ready = True
+
+    def publish(self, message: Dict):
+        if not self._ready:
+            # Sin esto el primer insert crearía una colección normal
+            self.ensure_collection()
+        self.collection.insert_one({**message, "at": _utcnow()})
+
+    def start(self, callback: Callable[[Dict], None]):
+        self.ensure_collection()
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(callback,), name="cache-invalidation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, callback: Callable[[Dict], None]):
+        since = _utcnow()
+        # Ids ya procesados: al reabrir el cursor se relee el último segundo
+        seen: deque = deque(maxlen=1000)
+        while not self._stopping.is_set():
+            try:
+                cursor = self.collection.find(
+                    {"at": {"$gte": since - timedelta(seconds=1)}},
+                    cursor_type=CursorType.TAILABLE_AWAIT,
+                ).max_await_time_ms(int(self.poll_interval * 1000))
+                while cursor.alive and not self._stopping.is_set():
+                    for doc in cursor:
+                        since = max(since, doc["at"])
+                        if doc["_id"] in seen:
+                            continue
+                        seen.append(doc["_id"])
+                        callback(doc)
+                        if self._stopping.is_set():
+                            break
+            except PyMongoError as e:
+                print(f"Error en el canal de invalidación de Mongo: {e}")
+            self._stopping.wait(self.poll_interval)
+
+
+class CacheService:
+    """
+    Cache de la aplicación sobre un backend intercambiable.
+
+    - local: LRU en memoria del proceso. Con varios workers cada uno tiene la
+      suya; las invalidaciones se propagan por `bus`.
+    - redis / mongo: cache compartida por todos los workers. Delante se usa una
+      LRU local con TTL corto (`near_ttl`) para no ir a la red en cada lectura;
+      las invalidaciones borran la entrada compartida y avisan por `bus` a los
+      demás workers para que descarten su copia local.
+
+    Las claves siguen la forma "<tipo>:<id>[:...]" para poder invalidar por
+    prefijo (p. ej. toda la disponibilidad de una empresa).
+    """
+
+    def __init__(
+        self,
+        backend: ICacheBackend,
+        bus: Optional[IInvalidationBus] = None,
+        near_ttl: float = 5.0,
+        near_size: int = 10000,
+    ):
+        self.backend = backend
+        self.bus = bus
+        self.instance_id = uuid.uuid4().hex
+        if isinstance(backend, LocalCacheBackend):
+            self.near = None
+            self.local = backend
+        else:
+            self.near = LocalCacheBackend(near_size) if near_ttl > 0 else None
+            self.local = self.near
+        self.near_ttl = near_ttl
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations_received = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if self.near is not None:
+            value = self.near.get(key, MISSING)
+            if value is not MISSING:
+                self._count(hits=1)
+                return value
+        try:
+            value = self.backend.get(key, MISSING)
+        except Exception as e:
+            # Una cache compartida caída no debe tirar la petición
+            print(f"Error al leer la cache ({key}): {e}")
+            self._count(errors=1, misses=1)
+            return default
+        if value is MISSING:
+            self._count(misses=1)
+            return default
+        if self.near is not None:
+            self.near.set(key, value, self.near_ttl)
+        self._count(hits=1)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        if ttl == 0:
+            return  # Cache desactivada para este tipo de dato
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            print(f"Error al escribir la cache ({key}): {e}")
+            self._count(errors=1)
+            return
+        if self.near is not None:
+            near_ttl = min(ttl, self.near_ttl) if ttl else self.near_ttl
+            self.near.set(key, value, near_ttl)
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: Optional[float]):
+        """
+        Devuelve el valor guardado o lo calcula con `loader` y lo guarda. Con
+        ttl None el valor no vence; con ttl 0 la cache se omite. Si `loader`
+        lanza una excepción no se guarda nada.
+        """
+        if ttl == 0:
+            return loader()
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, *keys: str):
+        self._invalidate(list(keys), [])
+
+    def invalidate_prefix(self, prefix: str):
+        self._invalidate([], [prefix])
+
+    def _invalidate(self, keys: List[str], prefixes: List[str]):
+        try:
+            if keys:
+                self.backend.delete(keys)
+            for prefix in prefixes:
+                self.backend.delete_prefix(prefix)
+        except Exception as e:
+            print(f"Error al invalidar la cache: {e}")
+            self._count(errors=1)
+        if self.near is not None:
+            self._evict_local(keys, prefixes)
+        if self.bus is not None:
+            try:
+                self.bus.publish(
+                    {"origin": self.instance_id, "keys": keys, "prefixes": prefixes}
+                )
+            except Exception as e:
+                print(f"Error al publicar la invalidación: {e}")
+                self._count(errors=1)
+
+    def _evict_local(self, keys: List[str], prefixes: List[str]):
+        if self.local is None:
+            return
+        self.local.delete(keys)
+        for prefix in prefixes:
+            self.local.delete_prefix(prefix)
+
+    def _on_message(self, message: Dict):
+        if message.get("origin") == self.instance_id:
+            return
+        self._count(invalidations_received=1)
+        self._evict_local(message.get("keys", []), message.get("prefixes", []))
+
+    def _count(self, **counters: int):
+        with self._stats_lock:
+            for name, amount in counters.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    def ensure_indexes(self):
+        if isinstance(self.backend, MongoCacheBackend):
+            self.backend.ensure_indexes()
+
+    def start(self):
+        if self.bus is not None:
+            self.bus.start(self._on_message)
+
+    def stop(self):
+        if self.bus is not None:
+            self.bus.stop()
+
+    def snapshot(self) -> Dict:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "bus": type(self.bus).__name__ if self.bus is not None else None,
+                "local_entries": len(self.local) if self.local is not None else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "errors": self.errors,
+                "invalidations_received": self.invalidations_received,
+            }
+
+
+def create_cache_service(
+    backend: str,
+    db,
+    redis_url: str = "redis://localhost:6379/0",
+    invalidation: str = "none",
+    local_size: int = 10000,
+    near_ttl: float = 5.0,
+) -> CacheService:
+    """
+    Arma la cache según la configuración (CACHE_BACKEND, CACHE_INVALIDATION).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"CACHE_BACKEND inválido: '{backend}'. Use {BACKENDS}.")
+    if invalidation not in INVALIDATION_BUSES:
+        raise ValueError(
+            f"CACHE_INVALIDATION inválido: '{invalidation}'. Use {INVALIDATION_BUSES}."
+        )
+
+    redis_backend = None
+    if backend == "redis" or invalidation == "redis":
+        redis_backend = RedisCacheBackend(redis_url)
+
+    if backend == "redis":
+        cache_backend = redis_backend
+    elif backend == "mongo":
+        cache_backend = MongoCacheBackend(db)
+    else:
+        cache_backend = LocalCacheBackend(local_size)
+
+    bus = None
+    if invalidation == "redis":
+        bus = RedisInvalidationBus(redis_backend.client)
+    elif invalidation == "mongo":
+        bus = MongoInvalidationBus(db)
+    return CacheService(cache_backend, bus=bus, near_ttl=near_ttl, near_size=local_size)
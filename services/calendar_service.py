@@ -1,25 +1,163 @@
+import math
+import time
+import uuid
 import requests
 from typing import Optional, Dict
 from fastapi import HTTPException
 from models.interfaces import ICalendarService, IOAuthService, ITokenStorage
 from models.data_classes import UserTokenData
 from services.availability_service import AvailabilityService
+from services.rate_limiter import FairRateLimiter, RateLimitExceeded
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.reservations import SlotReservations
 from datetime import datetime, timedelta
 import pytz  # Para manejo de zonas horarias
+from utils.profiling import profile_methods
+from utils.lru import LRUCache
+from utils.field_mask import parse_field_mask, apply_field_mask
+from config import GOOGLE_CALENDAR_BASE_URL
 
 
+@profile_methods
 class GoogleCalendarService(ICalendarService):
-    BASE_URL = "https://www.googleapis.com/calendar/v3"
+    BASE_URL = GOOGLE_CALENDAR_BASE_URL
+    # Pausa de la empresa tras un 429 de Google sin Retry-After
+    RATE_LIMIT_BACKOFF_SECONDS = 1.0
 
     def __init__(
         self,
         oauth_service: IOAuthService,
         token_storage: ITokenStorage,
         availability_service: AvailabilityService,
+        rate_limiter: Optional[FairRateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        timeout: float = 10.0,
+        stale_cache_size: int = 1000,
+        event_cache_size: int = 5000,
+        reservations: Optional[SlotReservations] = None,
     ):
         self.oauth_service = oauth_service
         self.token_storage = token_storage
         self.availability_service = availability_service
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout
+        # Última respuesta válida de list_events, servida como "stale" cuando
+        # Google falla o el circuito está abierto
+        self.stale_cache = LRUCache(stale_cache_size)
+        # Eventos por (name_company, calendar_id, event_id): se revalidan con
+        # su etag (If-None-Match) y también sirven como respaldo "stale"
+        self.event_cache = LRUCache(event_cache_size)
+        # Bloqueo de horarios compartido con la cola de reservas asíncronas
+        self.reservations = (
+            reservations
+            if reservations is not None
+            else SlotReservations(availability_service.db)
+        )
+
+    def _request(
+        self, name_company: str, method: str, url: str, **kwargs
+    ) -> requests.Response:
+        """
+        Punto único de salida hacia Google Calendar: toda llamada pasa por el
+        circuit breaker y por el limitador de la empresa antes de enviarse.
+        """
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before_call()
+
+        if self.rate_limiter is not None:
+            try:
+                self.rate_limiter.acquire(name_company)
+            except RateLimitExceeded as e:
+                if breaker is not None:
+                    breaker.release()
+                raise HTTPException(
+                    status_code=429,
+                    detail=str(e),
+                    headers={"Retry-After": str(math.ceil(e.retry_after))},
+                )
+
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.monotonic()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except requests.RequestException:
+            if breaker is not None:
+                breaker.record(False, time.monotonic() - started)
+            raise
+        if response.status_code == 429:
+            # Cuota de la empresa agotada: Google responde, así que no cuenta
+            # como fallo del circuito (una empresa lo abriría para todas). Se
+            # pausa solo a esa empresa en el limitador.
+            if breaker is not None:
+                breaker.release()
+            if self.rate_limiter is not None:
+                self.rate_limiter.backoff(
+                    name_company, self._retry_after(response.headers)
+                )
+        elif breaker is not None:
+            breaker.record(response.status_code < 500, time.monotonic() - started)
+        return response
+
+    @classmethod
+    def _retry_after(cls, headers: Dict) -> float:
+        try:
+            return max(0.0, float(headers.get("Retry-After")))
+        except (TypeError, ValueError):
+            return cls.RATE_LIMIT_BACKOFF_SECONDS
+
+    @staticmethod
+    def _is_transient_error(status_code: int) -> bool:
+        return status_code == 429 or status_code >= 500
+
+    def _get_json(
+        self,
+        name_company: str,
+        cache: LRUCache,
+        cache_key: tuple,
+        url: str,
+        headers: Dict,
+        conditional: bool = False,
+        **kwargs,
+    ) -> Dict:
+        """
+        GET a Google respaldado por `cache`.
+
+        Con `conditional=True` se envía el etag guardado en If-None-Match y un
+        304 devuelve la copia local. Ante una caída (circuito abierto, timeout,
+        error de conexión, 429 o 5xx) se devuelve la copia guardada marcada con
+        `"stale": true`; si no hay copia se propaga el error.
+        """
+        cached = cache.get(cache_key)
+        if conditional and cached is not None and cached.get("etag"):
+            headers = {**headers, "If-None-Match": cached["etag"]}
+
+        try:
+            response = self._request(
+                name_company, "GET", url, headers=headers, **kwargs
+            )
+            if response.status_code == 304 and cached is not None:
+                return cached
+            response.raise_for_status()
+        except (CircuitOpenError, requests.ConnectionError, requests.Timeout) as e:
+            return self._stale_or_raise(cached, e)
+        except requests.HTTPError as e:
+            if e.response.status_code in (404, 410):
+                cache.pop(cache_key)
+            if not self._is_transient_error(e.response.status_code):
+                raise
+            return self._stale_or_raise(cached, e)
+
+        data = response.json()
+        cache.set(cache_key, data)
+        return data
+
+    @staticmethod
+    def _stale_or_raise(cached: Optional[Dict], error: Exception) -> Dict:
+        if cached is None:
+            raise error
+        return {**cached, "stale": True}
 
     def _get_valid_token(self, name_company: str) -> str:
         token_data = self.token_storage.get_token(name_company)
@@ -43,8 +181,12 @@ class GoogleCalendarService(ICalendarService):
         self,
         name_company: str,
         time_min: Optional[str] = None,
-        calendar_id: str = "primary",
+        calendar_id: Optional[str] = None,
+        fields: Optional[str] = None,
     ) -> Dict:
+        if fields:
+            parse_field_mask(fields)  # Valida antes de llamar a Google
+        calendar_id = self.resolve_calendar_id(name_company, calendar_id)
         access_token = self._get_valid_token(name_company)
         url = f"{self.BASE_URL}/calendars/{calendar_id}/events"
         headers = {"Authorization": f"Bearer {access_token}"}
@@ -53,20 +195,185 @@ class GoogleCalendarService(ICalendarService):
             params["timeMin"] = time_min
             params["singleEvents"] = "true"
             params["orderBy"] = "startTime"
+        if fields:
+            # Respuesta parcial: Google solo envía los campos pedidos
+            params["fields"] = fields
+
+        cache_key = (name_company, calendar_id, time_min, fields)
+        return self._get_json(
+            name_company, self.stale_cache, cache_key, url, headers, params=params
+        )
+
+    def sync_events(
+        self,
+        name_company: str,
+        calendar_id: Optional[str] = None,
+        sync_token: Optional[str] = None,
+        page_token: Optional[str] = None,
+        max_results: int = 2500,
+    ) -> Dict:
+        """
+        Una página de sincronización de eventos. Sin `sync_token` es una
+        sincronización completa; con él Google devuelve solo los cambios
+        (incluidos los eventos borrados, con status "cancelled"). La última
+        página trae `nextSyncToken`. Un 410 significa que el token venció y
+        hay que volver a sincronizar desde cero.
+
+        Como list_events, pide singleEvents=true (compatible con syncToken):
+        cada ocurrencia de un evento recurrente llega como una instancia.
+        """
+        calendar_id = self.resolve_calendar_id(name_company, calendar_id)
+        access_token = self._get_valid_token(name_company)
+        url = f"{self.BASE_URL}/calendars/{calendar_id}/events"
+        headers = {"Authorization": f"Bearer {access_token}"}
+        params = {"maxResults": max_results, "singleEvents": "true"}
+        if sync_token:
+            params["syncToken"] = sync_token
+        if page_token:
+            params["pageToken"] = page_token
+        response = self._request(
+            name_company, "GET", url, headers=headers, params=params
+        )
+        response.raise_for_status()
+        return response.json()
 
-        response = requests.get(url, headers=headers, params=params)
+    def watch_events(
+        self,
+        name_company: str,
+        channel_id: str,
+        address: str,
+        token: str,
+        ttl_seconds: int,
+        calendar_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        Registra un canal de notificaciones (web_hook) para los eventos del
+        calendario. Google responde con el resourceId y la expiración (ms).
+        """
+        calendar_id = self.resolve_calendar_id(name_company, calendar_id)
+        access_token = self._get_valid_token(name_company)
+        url = f"{self.BASE_URL}/calendars/{calendar_id}/events/watch"
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        }
+        body = {
+            "id": channel_id,
+            "type": "web_hook",
+            "address": address,
+            "token": token,
+            "params": {"ttl": str(ttl_seconds)},
+        }
+        response = self._request(name_company, "POST", url, headers=headers, json=body)
         response.raise_for_status()
         return response.json()
 
+    def stop_channel(self, name_company: str, channel_id: str, resource_id: str):
+        access_token = self._get_valid_token(name_company)
+        url = f"{self.BASE_URL}/channels/stop"
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        }
+        response = self._request(
+            name_company,
+            "POST",
+            url,
+            headers=headers,
+            json={"id": channel_id, "resourceId": resource_id},
+        )
+        # Un canal que ya venció o no existe no necesita detenerse
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def invalidate_calendar(self, name_company: str, calendar_id: str) -> int:
+        """
+        Descarta las copias locales (listados y eventos) de un calendario que
+        cambió en Google.
+        """
+
+        def belongs(key: tuple) -> bool:
+            return key[0] == name_company and key[1] == calendar_id
+
+        return self.stale_cache.pop_matching(belongs) + self.event_cache.pop_matching(
+            belongs
+        )
+
+    def _forget_event(self, name_company: str, calendar_id: str, event_id: str):
+        """
+        Descarta la copia completa de un evento y sus respuestas parciales.
+        """
+        cache_key = (name_company, calendar_id, event_id)
+        self.event_cache.pop_matching(lambda key: key[:3] == cache_key)
+
+    def cache_synced_event(self, name_company: str, calendar_id: str, event: Dict):
+        """
+        Actualiza la cache de eventos con un cambio recibido por
+        sincronización incremental.
+        """
+        self._forget_event(name_company, calendar_id, event["id"])
+        if event.get("status") != "cancelled":
+            self.event_cache.set((name_company, calendar_id, event["id"]), event)
+
+    def resolve_calendar_id(
+        self, name_company: str, calendar_id: Optional[str] = None
+    ) -> str:
+        """
+        Calendario en el que se crean los eventos de la empresa (el de su
+        ConfiguracionCalendar, o "primary" si no tiene), salvo que se indique
+        otro. Listados, sincronización, canales y get/update/delete lo usan
+        para apuntar al mismo calendario, y a la misma clave de cache, que
+        create_event.
+        """
+        if calendar_id:
+            return calendar_id
+        try:
+            credentials = self.availability_service.get_credentials(name_company)
+            configuracion = self.availability_service.get_configuracion(
+                credentials.user_id
+            )
+        except HTTPException:
+            return "primary"
+        return configuracion.calendar_id or "primary"
+
     def get_event(
-        self, name_company: str, event_id: str, calendar_id: str = "primary"
+        self,
+        name_company: str,
+        event_id: str,
+        calendar_id: Optional[str] = None,
+        fields: Optional[str] = None,
     ) -> Dict:
+        mask = parse_field_mask(fields) if fields else None
+        calendar_id = self.resolve_calendar_id(name_company, calendar_id)
         access_token = self._get_valid_token(name_company)
         url = f"{self.BASE_URL}/calendars/{calendar_id}/events/{event_id}"
         headers = {"Authorization": f"Bearer {access_token}"}
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        cache_key = (name_company, calendar_id, event_id)
+
+        if mask is not None and self.event_cache.get(cache_key) is None:
+            # Sin copia local se pide a Google solo la respuesta parcial. Se
+            # guarda con su propia clave (no es el evento completo) y solo sirve
+            # como respaldo "stale"
+            return self._get_json(
+                name_company,
+                self.event_cache,
+                cache_key + (fields,),
+                url,
+                headers,
+                params={"fields": fields},
+            )
+
+        event = self._get_json(
+            name_company, self.event_cache, cache_key, url, headers, conditional=True
+        )
+        if mask is None:
+            return event
+        # Con copia local la revalidación suele ser un 304 y la máscara se
+        # aplica aquí
+        masked = apply_field_mask(event, mask)
+        if event.get("stale"):
+            masked["stale"] = True
+        return masked
 
     def create_event(
         self,
@@ -75,15 +382,27 @@ class GoogleCalendarService(ICalendarService):
         assistant_email: str,
         usuario: str,
         nombre: str,
+        event_id: Optional[str] = None,
+        slot_reserved: bool = False,
     ) -> Dict:
         """
         Crea un evento en Google Calendar.
 
+        El horario se bloquea en booking_reservations mientras se crea el
+        evento: si ya hay una cita o una reserva para él, lanza 409.
+
         :param name_company: Nombre de la empresa.
         :param start_time: Hora de inicio en formato RFC3339 (e.g., "2024-12-16T08:00:00-05:00").
         :param assistant_email: Correo electrónico del asistente.
+        :param event_id: Id del evento elegido por quien llama (base32hex, p. ej.
+            un uuid4 en hex). Hace la llamada idempotente: si un intento anterior
+            ya creó el evento, Google responde 409, se retoma con el evento
+            existente y la cita se guarda una sola vez.
+        :param slot_reserved: True si quien llama ya reservó el horario (la
+            cola asíncrona lo hace al encolar).
         :return: Diccionario con los detalles del evento creado.
         """
+        reservation_id = reservation_owner = None
         try:
             # Obtener las credenciales y configuraciones de la empresa
             credentials = self.availability_service.get_credentials(name_company)
@@ -93,7 +412,7 @@ class GoogleCalendarService(ICalendarService):
             configuracion = self.availability_service.get_configuracion(user_id)
             tiempo_sesion = configuracion.tiempoSesion  # en minutos
             titulo_evento = configuracion.titulo_evento
-            calendar_id = configuracion.calendar_id
+            calendar_id = configuracion.calendar_id or "primary"
             description_event = configuracion.description_event
             tipo_cita = titulo_evento
             # Convertir start_time a datetime
@@ -105,6 +424,12 @@ class GoogleCalendarService(ICalendarService):
                     detail="Formato de start_time inválido. Use RFC3339.",
                 )
 
+            if not slot_reserved:
+                reservation_owner = uuid.uuid4().hex
+                reservation_id = self.reservations.acquire(
+                    user_id, SlotReservations.to_utc(start_dt), reservation_owner
+                )
+
             # Calcular end_time sumando tiempoSesion
             end_dt = start_dt + timedelta(minutes=tiempo_sesion)
 
@@ -128,12 +453,15 @@ class GoogleCalendarService(ICalendarService):
                 "reminders": {"useDefault": True},
                 "conferenceData": {
                     "createRequest": {
-                        "requestId": "unique-request-id",
+                        "requestId": event_id or "unique-request-id",
                         "conferenceSolutionKey": {"type": "hangoutsMeet"},
                     }
                 },
             }
 
+            if event_id:
+                event_payload["id"] = event_id
+
             # Hacer la solicitud a la API de Google Calendar
             headers = {
                 "Authorization": f"Bearer {credentials.access_token}",
@@ -141,7 +469,9 @@ class GoogleCalendarService(ICalendarService):
             }
             url_create = f"{self.BASE_URL}/calendars/{calendar_id}/events?conferenceDataVersion=1"
 
-            response = requests.post(
+            response = self._request(
+                name_company,
+                "POST",
                 url_create,
                 headers=headers,
                 json=event_payload,
@@ -149,12 +479,24 @@ class GoogleCalendarService(ICalendarService):
             if response.status_code == 401:
                 # Token expirado, intentar refrescar
                 credentials = self.oauth_service.refresh_access_token(name_company)
+                self.availability_service.invalidate_credentials(name_company)
                 headers["Authorization"] = f"Bearer {credentials.access_token}"
-                response = requests.post(
-                    f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events",
+                response = self._request(
+                    name_company,
+                    "POST",
+                    url_create,
                     headers=headers,
                     json=event_payload,
                 )
+            if response.status_code == 409 and event_id:
+                # Un intento anterior ya creó el evento con este id: se retoma
+                # desde ahí en lugar de crear otro
+                response = self._request(
+                    name_company,
+                    "GET",
+                    f"{self.BASE_URL}/calendars/{calendar_id}/events/{event_id}",
+                    headers=headers,
+                )
             if response.status_code not in [200, 201]:
                 raise HTTPException(
                     status_code=response.status_code, detail=response.text
@@ -185,7 +527,9 @@ class GoogleCalendarService(ICalendarService):
 
                 update_payload = {"description": updated_description}
 
-                update_response = requests.patch(
+                update_response = self._request(
+                    name_company,
+                    "PATCH",
                     f"{self.BASE_URL}/calendars/{calendar_id}/events/{event['id']}",
                     headers=headers,
                     json=update_payload,
@@ -199,6 +543,8 @@ class GoogleCalendarService(ICalendarService):
 
                 event = update_response.json()
 
+            self.event_cache.set((name_company, calendar_id, event["id"]), event)
+
             # Guardar el documento en la colección 'citas'
             # La fecha se debe guardar en UTC. start_dt ya está en ISO.
             # Asegúrate que start_dt sea UTC o ajusta la hora a UTC si es necesario.
@@ -211,7 +557,20 @@ class GoogleCalendarService(ICalendarService):
                 "fecha": start_dt,  # datetime en UTC, si es necesario ajusta start_dt a UTC
                 "user_id": user_id,
             }
-            citas_collection.insert_one(cita_doc)
+            if event_id:
+                # Un reintento actualiza la misma cita en lugar de duplicarla
+                citas_collection.update_one(
+                    {"user_id": user_id, "event_id": event_id},
+                    # Confirma la cita provisoria de la cola asíncrona, si existe
+                    {
+                        "$set": {**cita_doc, "event_id": event_id},
+                        "$unset": {"status": ""},
+                    },
+                    upsert=True,
+                )
+            else:
+                citas_collection.insert_one(cita_doc)
+            self.availability_service.invalidate_availability(name_company)
             if response.status_code != 200 and response.status_code != 201:
                 raise HTTPException(
                     status_code=response.status_code, detail=response.text
@@ -223,30 +582,40 @@ class GoogleCalendarService(ICalendarService):
             raise he
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            if reservation_id is not None:
+                self.reservations.release(reservation_id, reservation_owner)
 
     def update_event(
         self,
         name_company: str,
         event_id: str,
         event: Dict,
-        calendar_id: str = "primary",
+        calendar_id: Optional[str] = None,
     ) -> Dict:
+        calendar_id = self.resolve_calendar_id(name_company, calendar_id)
         access_token = self._get_valid_token(name_company)
         url = f"{self.BASE_URL}/calendars/{calendar_id}/events/{event_id}"
         headers = {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json",
         }
-        response = requests.put(url, headers=headers, json=event)
+        cache_key = (name_company, calendar_id, event_id)
+        self._forget_event(name_company, calendar_id, event_id)
+        response = self._request(name_company, "PUT", url, headers=headers, json=event)
         response.raise_for_status()
-        return response.json()
+        updated = response.json()
+        self.event_cache.set(cache_key, updated)
+        return updated
 
     def delete_event(
-        self, name_company: str, event_id: str, calendar_id: str = "primary"
+        self, name_company: str, event_id: str, calendar_id: Optional[str] = None
     ) -> Dict:
+        calendar_id = self.resolve_calendar_id(name_company, calendar_id)
         access_token = self._get_valid_token(name_company)
         url = f"{self.BASE_URL}/calendars/{calendar_id}/events/{event_id}"
         headers = {"Authorization": f"Bearer {access_token}"}
-        response = requests.delete(url, headers=headers)
+        self._forget_event(name_company, calendar_id, event_id)
+        response = self._request(name_company, "DELETE", url, headers=headers)
         response.raise_for_status()
         return {"status": "deleted"}
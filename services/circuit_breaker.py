@@ -0,0 +1,146 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Tuple
+from fastapi import HTTPException
+
+
+class CircuitOpenError(HTTPException):
+    """
+    El circuito está abierto: se responde 503 sin llamar a Google.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail="Google Calendar no disponible temporalmente.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con ventana deslizante de las últimas `window_size` llamadas.
+
+    - closed: las llamadas pasan; si con al menos `min_calls` en la ventana la
+      tasa de errores o de llamadas lentas supera su umbral, se abre.
+    - open: toda llamada falla de inmediato con CircuitOpenError durante
+      `open_seconds`.
+    - half_open: se dejan pasar hasta `half_open_max_calls` llamadas de prueba;
+      si todas salen bien se cierra, al primer fallo vuelve a abrirse.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._rejected = 0
+        self._times_opened = 0
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._times_opened += 1
+        self._window.clear()
+
+    def before_call(self):
+        """
+        Reserva un lugar para una llamada o lanza CircuitOpenError.
+        """
+        with self._lock:
+            now = self._clock()
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self._rejected += 1
+                    raise CircuitOpenError(remaining)
+                self.state = self.HALF_OPEN
+                self._half_open_in_flight = 0
+                self._half_open_successes = 0
+
+            if self.state == self.HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    self._rejected += 1
+                    raise CircuitOpenError(1)
+                self._half_open_in_flight += 1
+
+    def release(self):
+        """
+        Libera el lugar reservado por before_call cuando la llamada no se hizo.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+
+    def record(self, success: bool, duration: float):
+        with self._lock:
+            now = self._clock()
+            slow = duration >= self.slow_call_seconds
+
+            if self.state == self.HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if not success or slow:
+                    self._open(now)
+                    return
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self.state = self.CLOSED
+                    self._window.clear()
+                return
+
+            if self.state == self.OPEN:
+                return  # Respuesta tardía de una llamada previa a la apertura
+
+            self._window.append((success, slow))
+            calls = len(self._window)
+            if calls < self.min_calls:
+                return
+            failure_rate = sum(1 for ok, _ in self._window if not ok) / calls
+            slow_rate = sum(1 for _, is_slow in self._window if is_slow) / calls
+            if (
+                failure_rate >= self.failure_rate_threshold
+                or slow_rate >= self.slow_call_rate_threshold
+            ):
+                self._open(now)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            calls = len(self._window)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "failure_rate": (
+                    sum(1 for ok, _ in self._window if not ok) / calls if calls else 0.0
+                ),
+                "slow_call_rate": (
+                    sum(1 for _, slow in self._window if slow) / calls if calls else 0.0
+                ),
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected,
+            }
@@ -0,0 +1,48 @@
+import threading
+from typing import Optional
+import pymongo
+from pymongo import MongoClient
+from config import MONGO_URI, MONGO_MIN_POOL_SIZE, MONGO_PING_TIMEOUT_SECONDS
+
+DB_NAME = "calendar_app"
+
+_client: Optional[MongoClient] = None
+_lock = threading.Lock()
+
+
+def get_client() -> MongoClient:
+    """
+    Cliente de Mongo compartido por todo el proceso. Se crea en el primer uso
+    (no al importar), así importar main no abre conexiones ni hilos.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(MONGO_URI, minPoolSize=MONGO_MIN_POOL_SIZE)
+    return _client
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def ping(timeout: Optional[float] = None) -> bool:
+    """
+    Con Mongo caído la selección de servidor espera serverSelectionTimeoutMS
+    (30 s por defecto); `timeout` (MONGO_PING_TIMEOUT_SECONDS si no se indica)
+    acota el ping entero para que /readyz responda 503 a tiempo.
+    """
+    if timeout is None:
+        timeout = MONGO_PING_TIMEOUT_SECONDS
+    with pymongo.timeout(timeout):
+        get_client().admin.command("ping")
+    return True
+
+
+def close_client():
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
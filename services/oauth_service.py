@@ -1,10 +1,11 @@
 import requests
 from models.data_classes import UserTokenData, OAuthCredentials
 from models.interfaces import IOAuthService, ITokenStorage
+from config import GOOGLE_TOKEN_URL
 
 
 class GoogleOAuthService(IOAuthService):
-    TOKEN_URL = "https://oauth2.googleapis.com/token"
+    TOKEN_URL = GOOGLE_TOKEN_URL
 
     def __init__(self, credentials: OAuthCredentials, token_storage: ITokenStorage):
         self.credentials = credentials
@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket clásico. No es thread-safe: lo protege el lock del limitador.
+    """
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+    def available(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= 1
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class WaitStats:
+    def __init__(self):
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self) -> Dict:
+        return {
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "avg_wait_ms": (
+                self.total_wait / self.acquired * 1000 if self.acquired else 0.0
+            ),
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+class FairRateLimiter:
+    """
+    Limitador de llamadas salientes a Google con un bucket global y uno por
+    empresa.
+
+    Cuando hay que esperar, las peticiones se encolan por empresa y se atienden
+    en round-robin entre las empresas con cola cuyo bucket tiene tokens, de modo
+    que una empresa con ráfagas grandes no deja sin turno a las demás. Si la cola
+    (global o de la empresa) está llena o la espera supera `max_wait`, se lanza
+    RateLimitExceeded inmediatamente.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: float,
+        company_rate: float,
+        company_burst: float,
+        max_queue: int,
+        max_queue_per_company: int,
+        max_wait: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.company_rate = company_rate
+        self.company_burst = company_burst
+        self.max_queue = max_queue
+        self.max_queue_per_company = max_queue_per_company
+        self.max_wait = max_wait
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queues: Dict[str, Deque[object]] = {}
+        # Empresas con peticiones en espera, en orden de turno
+        self._rotation: Deque[str] = deque()
+        self._queued = 0
+        self._stats: Dict[str, WaitStats] = {}
+        self._global_stats = WaitStats()
+
+    def _bucket(self, name_company: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(name_company)
+        if bucket is None:
+            bucket = TokenBucket(self.company_rate, self.company_burst, now)
+            self._buckets[name_company] = bucket
+            self._stats[name_company] = WaitStats()
+        return bucket
+
+    def _is_turn(self, name_company: str, ticket: object, now: float) -> bool:
+        if self._queues[name_company][0] is not ticket:
+            return False
+        if not self._global.available(now):
+            return False
+        for company in self._rotation:
+            if self._buckets[company].available(now):
+                return company == name_company
+        return False
+
+    def _take(self, name_company: str, now: float, started: float) -> float:
+        self._global.consume(now)
+        self._buckets[name_company].consume(now)
+        wait = now - started
+        self._stats[name_company].record(wait)
+        self._global_stats.record(wait)
+        return wait
+
+    def _reject(self, name_company: str, message: str):
+        self._stats[name_company].rejected += 1
+        self._global_stats.rejected += 1
+        retry_after = max(1.0, self._queued / max(self._global.rate, 1e-9))
+        raise RateLimitExceeded(message, retry_after)
+
+    def acquire(self, name_company: str) -> float:
+        """
+        Bloquea hasta que la empresa tenga turno y devuelve los segundos esperados.
+        """
+        with self._cond:
+            started = now = self._clock()
+            bucket = self._bucket(name_company, now)
+
+            # Camino rápido: nadie esperando y hay tokens en ambos buckets
+            if (
+                not self._rotation
+                and self._global.available(now)
+                and bucket.available(now)
+            ):
+                return self._take(name_company, now, started)
+
+            queue = self._queues.setdefault(name_company, deque())
+            if self._queued >= self.max_queue:
+                self._reject(name_company, "Cola global de llamadas a Google llena.")
+            if len(queue) >= self.max_queue_per_company:
+                self._reject(
+                    name_company,
+                    f"Demasiadas llamadas a Google en cola para '{name_company}'.",
+                )
+
+            ticket = object()
+            queue.append(ticket)
+            if name_company not in self._rotation:
+                self._rotation.append(name_company)
+            self._queued += 1
+            deadline = started + self.max_wait
+            try:
+                while True:
+                    now = self._clock()
+                    if self._is_turn(name_company, ticket, now):
+                        queue.popleft()
+                        # La empresa pasa al final del turno (round-robin)
+                        self._rotation.remove(name_company)
+                        if queue:
+                            self._rotation.append(name_company)
+                        self._cond.notify_all()
+                        return self._take(name_company, now, started)
+
+                    if now >= deadline:
+                        self._reject(
+                            name_company,
+                            f"Tiempo de espera agotado para llamar a Google ({self.max_wait}s).",
+                        )
+
+                    next_check = max(
+                        self._global.wait_time(now), bucket.wait_time(now), 0.001
+                    )
+                    self._cond.wait(min(deadline - now, next_check, 0.1))
+            except RateLimitExceeded:
+                queue.remove(ticket)
+                if not queue:
+                    self._rotation.remove(name_company)
+                self._cond.notify_all()
+                raise
+            finally:
+                self._queued -= 1
+
+    def backoff(self, name_company: str, seconds: float):
+        """
+        Vacía el bucket de la empresa para que su próxima llamada espere al
+        menos `seconds` (p. ej. tras un 429 de Google). Las demás empresas
+        siguen con su turno.
+        """
+        with self._cond:
+            bucket = self._bucket(name_company, self._clock())
+            bucket.tokens = min(bucket.tokens, 1 - seconds * bucket.rate)
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            now = self._clock()
+            companies = {}
+            for company, stats in self._stats.items():
+                bucket = self._buckets[company]
+                bucket.available(now)  # Recarga antes de leer los tokens
+                companies[company] = {
+                    **stats.as_dict(),
+                    "queued": len(self._queues.get(company, ())),
+                    "tokens": round(bucket.tokens, 2),
+                }
+            self._global.available(now)
+            return {
+                "queued": self._queued,
+                "global": {
+                    **self._global_stats.as_dict(),
+                    "tokens": round(self._global.tokens, 2),
+                },
+                "companies": companies,
+            }
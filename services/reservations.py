@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+
+def _utcnow() -> datetime:
+    # Mongo guarda las fechas como UTC sin zona horaria
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SlotReservations:
+    """
+    Bloqueo de horarios mientras se crea una cita.
+
+    Cada horario reservado es un documento de booking_reservations con _id
+    "<user_id>|<fecha UTC>", de modo que dos reservas del mismo horario
+    (síncronas o asíncronas, en cualquier worker) no pueden coexistir. Con el
+    bloqueo tomado se comprueba que no haya ya una cita en ese horario.
+
+    Todas las reservas vencen (expires_at, con índice TTL) por si el proceso
+    cae antes de liberarlas. Las de POST /events síncrono duran `ttl_seconds`;
+    la cola asíncrona las extiende con `refresh` mientras el trabajo sigue vivo.
+    """
+
+    def __init__(self, db, ttl_seconds: float = 300.0):
+        self.collection = db["booking_reservations"]
+        self.citas_collection = db["citas"]
+        self.ttl_seconds = ttl_seconds
+
+    def ensure_indexes(self):
+        self.collection.create_index(
+            "expires_at", expireAfterSeconds=0, name="expires_at_ttl"
+        )
+
+    @staticmethod
+    def to_utc(start_dt: datetime) -> datetime:
+        if start_dt.tzinfo is None:
+            return start_dt
+        return start_dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+    @staticmethod
+    def reservation_id(user_id: str, fecha: datetime) -> str:
+        return f"{user_id}|{fecha.isoformat()}"
+
+    def acquire(
+        self,
+        user_id: str,
+        fecha: datetime,
+        owner: str,
+        ttl_seconds: Optional[float] = None,
+    ) -> str:
+        """
+        Reserva el horario `fecha` (UTC) para `owner` durante `ttl_seconds`
+        (por defecto, el de la instancia) y devuelve el id de la reserva. Lanza
+        409 si otra reserva lo tiene o si ya hay una cita.
+        """
+        now = _utcnow()
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        reservation_id = self.reservation_id(user_id, fecha)
+        reservation = {
+            "_id": reservation_id,
+            "owner": owner,
+            "user_id": user_id,
+            "fecha": fecha,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+        }
+
+        # El índice TTL borra con retraso: una reserva vencida se libera aquí
+        self.collection.delete_one({"_id": reservation_id, "expires_at": {"$lt": now}})
+        try:
+            self.collection.insert_one(reservation)
+        except DuplicateKeyError:
+            raise HTTPException(status_code=409, detail="El horario ya está reservado.")
+
+        if self.citas_collection.find_one(
+            {"user_id": user_id, "fecha": fecha}, {"_id": 1}
+        ):
+            self.release(reservation_id, owner)
+            raise HTTPException(status_code=409, detail="El horario ya está reservado.")
+        return reservation_id
+
+    def release(self, reservation_id: str, owner: str):
+        self.collection.delete_one({"_id": reservation_id, "owner": owner})
+
+    def refresh(self, reservation_id: str, owner: str, ttl_seconds: float) -> bool:
+        """
+        Extiende la reserva de `owner` hasta dentro de `ttl_seconds`. Si ya
+        venció (o el índice TTL la borró) y nadie más la tomó, la recupera.
+        Devuelve False si otra reserva tiene el horario.
+        """
+        now = _utcnow()
+        try:
+            self.collection.update_one(
+                {
+                    "_id": reservation_id,
+                    "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}],
+                },
+                {
+                    "$set": {
+                        "owner": owner,
+                        "expires_at": now + timedelta(seconds=ttl_seconds),
+                    },
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
@@ -8,11 +8,13 @@ from models.data_classes import UserTokenData
 class MongoTokenStorage(ITokenStorage):
     def __init__(
         self,
-        mongo_uri: str,
+        mongo_uri: str = None,
         db_name: str = "calendar_app",
         collection_name: str = "credentials",
+        client: Optional[MongoClient] = None,
     ):
-        self.client = MongoClient(mongo_uri)
+        # Se puede compartir el cliente de la aplicación (services.mongo)
+        self.client = client if client is not None else MongoClient(mongo_uri)
         self.db = self.client[db_name]
         self.collection = self.db[collection_name]
 
@@ -0,0 +1,63 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+from services.availability_service import AvailabilityService
+from utils.datetime_utils import InvalidTimeZoneError, get_zone, utc_day_offsets
+
+
+class WarmUpService:
+    """
+    Precarga lo que las primeras peticiones pagarían en frío: abre el pool de
+    Mongo (ping), carga credenciales y configuraciones de las empresas en la
+    cache y arma las tablas de offsets de las zonas horarias más usadas.
+    """
+
+    def __init__(
+        self,
+        availability_service: AvailabilityService,
+        time_zones: List[str],
+        max_tenants: int = 1000,
+        days: int = 62,
+    ):
+        self.availability_service = availability_service
+        self.time_zones = time_zones
+        self.max_tenants = max_tenants
+        self.days = days
+
+    def run(self) -> Dict:
+        report = {}
+        started = time.perf_counter()
+
+        step = time.perf_counter()
+        self.availability_service.client.admin.command("ping")
+        report["mongo_ms"] = self._elapsed_ms(step)
+
+        step = time.perf_counter()
+        report.update(self.availability_service.preload_tenants(self.max_tenants))
+        report["tenants_ms"] = self._elapsed_ms(step)
+
+        step = time.perf_counter()
+        report["time_zones"] = self.prime_time_zones()
+        report["time_zones_ms"] = self._elapsed_ms(step)
+
+        report["total_ms"] = self._elapsed_ms(started)
+        return report
+
+    def prime_time_zones(self) -> int:
+        # Hoy en UTC menos un día cubre a las zonas que todavía están en "ayer"
+        first = datetime.now(timezone.utc).date().toordinal() - 1
+        primed = 0
+        for time_zone in self.time_zones:
+            try:
+                get_zone(time_zone)
+            except InvalidTimeZoneError as e:
+                print(f"Zona horaria inválida en WARMUP_TIME_ZONES: {e}")
+                continue
+            for day_ordinal in range(first, first + self.days + 2):
+                utc_day_offsets(time_zone, day_ordinal)
+            primed += 1
+        return primed
+
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
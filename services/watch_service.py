@@ -0,0 +1,536 @@
+import hmac
+import secrets
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Mapping, Optional, Tuple
+import requests
+from fastapi import HTTPException
+from pymongo import ASCENDING, DeleteOne, ReplaceOne
+from services.calendar_service import GoogleCalendarService
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _event_time_utc(event: Dict, key: str = "start") -> Optional[datetime]:
+    moment = event.get(key) or {}
+    value = moment.get("dateTime") or moment.get("date")
+    if not value:
+        return None
+    try:
+        start_dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if start_dt.tzinfo is not None:
+        start_dt = start_dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return start_dt
+
+
+class CalendarWatchService:
+    """
+    Copia local de los calendarios de Google mantenida por notificaciones.
+
+    Por cada calendario se registra un canal de notificaciones (events.watch)
+    que Google llama en `webhook_url` cuando algo cambia. La notificación no
+    trae los cambios: se valida (canal conocido, token secreto y resourceId),
+    se marca el calendario como "dirty", se descartan sus copias en las caches
+    de GoogleCalendarService y se agenda una sincronización incremental con el
+    syncToken guardado, que solo trae los eventos modificados o borrados.
+
+    Los canales vencen (`channel_ttl_seconds`); un hilo los renueva antes de
+    `renew_before_seconds` creando un canal nuevo y deteniendo el anterior.
+
+    Colecciones:
+    - calendar_watch_channels: un documento por canal (_id = id del canal).
+    - calendar_sync: estado por "<name_company>|<calendar_id>": syncToken,
+      dirty y `version`, que cada notificación incrementa para no perder
+      cambios que llegan durante una sincronización.
+    - calendar_events: los eventos sincronizados, con `start_utc` y `end_utc`
+      para filtrar por fecha. Se sincroniza con singleEvents=true, así los
+      eventos recurrentes se guardan como una instancia por ocurrencia, igual
+      que los devuelve GET /events en vivo.
+    """
+
+    CHANGE_STATES = ("exists", "not_exists")
+
+    def __init__(
+        self,
+        calendar_service: GoogleCalendarService,
+        db,
+        webhook_url: Optional[str] = None,
+        channel_ttl_seconds: int = 7 * 24 * 3600,
+        renew_before_seconds: int = 24 * 3600,
+        renew_interval_seconds: float = 3600.0,
+        sync_workers: int = 4,
+    ):
+        self.calendar_service = calendar_service
+        self.channels_collection = db["calendar_watch_channels"]
+        self.sync_collection = db["calendar_sync"]
+        self.events_collection = db["calendar_events"]
+        self.webhook_url = webhook_url
+        self.channel_ttl_seconds = channel_ttl_seconds
+        self.renew_before_seconds = renew_before_seconds
+        self.renew_interval_seconds = renew_interval_seconds
+        self._executor = ThreadPoolExecutor(
+            max_workers=sync_workers, thread_name_prefix="calendar-sync"
+        )
+        # (name_company, calendar_id) -> hay que repetir la sincronización
+        self._scheduled: Dict[Tuple[str, str], bool] = {}
+        self._scheduled_lock = threading.Lock()
+        self._sync_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_indexes(self):
+        self.channels_collection.create_index(
+            [("name_company", ASCENDING), ("calendar_id", ASCENDING)],
+            name="name_company_calendar_id",
+        )
+        self.events_collection.create_index(
+            [
+                ("name_company", ASCENDING),
+                ("calendar_id", ASCENDING),
+                ("start_utc", ASCENDING),
+            ],
+            name="name_company_calendar_id_start_utc",
+        )
+
+    @staticmethod
+    def _sync_id(name_company: str, calendar_id: str) -> str:
+        return f"{name_company}|{calendar_id}"
+
+    # Canales
+
+    def watch(self, name_company: str, calendar_id: Optional[str] = None) -> Dict:
+        """
+        Registra un canal nuevo para el calendario y detiene los anteriores.
+        Sin `calendar_id` se usa el calendario de la empresa (el mismo en el
+        que POST /events crea las citas).
+        """
+        if not self.webhook_url:
+            raise HTTPException(
+                status_code=503, detail="GOOGLE_WEBHOOK_URL no está configurada."
+            )
+        calendar_id = self.calendar_service.resolve_calendar_id(
+            name_company, calendar_id
+        )
+        channel_id = uuid.uuid4().hex
+        token = secrets.token_urlsafe(32)
+        previous = list(
+            self.channels_collection.find(
+                {"name_company": name_company, "calendar_id": calendar_id}
+            )
+        )
+        # El canal se guarda antes de pedirlo: Google puede enviar el aviso
+        # inicial ("sync") antes de responder, y si el proceso cae a mitad de
+        # camino el canal queda registrado y vence solo
+        doc = {
+            "_id": channel_id,
+            "name_company": name_company,
+            "calendar_id": calendar_id,
+            "resource_id": None,
+            "token": token,
+            "expiration": _utcnow() + timedelta(seconds=self.channel_ttl_seconds),
+            "created_at": _utcnow(),
+        }
+        self.channels_collection.insert_one(doc)
+        try:
+            channel = self.calendar_service.watch_events(
+                name_company,
+                channel_id,
+                self.webhook_url,
+                token,
+                self.channel_ttl_seconds,
+                calendar_id=calendar_id,
+            )
+        except requests.HTTPError as e:
+            self.channels_collection.delete_one({"_id": channel_id})
+            raise HTTPException(
+                status_code=502,
+                detail=f"Google rechazó el canal: {e.response.text}",
+            )
+        except Exception:
+            self.channels_collection.delete_one({"_id": channel_id})
+            raise
+
+        if channel.get("expiration"):
+            doc["expiration"] = datetime.fromtimestamp(
+                int(channel["expiration"]) / 1000, timezone.utc
+            ).replace(tzinfo=None)
+        doc["resource_id"] = channel["resourceId"]
+        self.channels_collection.update_one(
+            {"_id": channel_id},
+            {
+                "$set": {
+                    "resource_id": doc["resource_id"],
+                    "expiration": doc["expiration"],
+                }
+            },
+        )
+        for old in previous:
+            self._stop(old)
+
+        # Los cambios anteriores al canal no se notificaron
+        self.mark_dirty(name_company, calendar_id)
+        return self._public(doc)
+
+    def unwatch(self, name_company: str, calendar_id: Optional[str] = None) -> int:
+        calendar_id = self.calendar_service.resolve_calendar_id(
+            name_company, calendar_id
+        )
+        channels = list(
+            self.channels_collection.find(
+                {"name_company": name_company, "calendar_id": calendar_id}
+            )
+        )
+        for channel in channels:
+            self._stop(channel)
+        return len(channels)
+
+    def _stop(self, channel: Dict):
+        if not channel.get("resource_id"):
+            # Canal que nunca se confirmó: sin resourceId Google no permite
+            # detenerlo; vence solo
+            self.channels_collection.delete_one({"_id": channel["_id"]})
+            return
+        try:
+            self.calendar_service.stop_channel(
+                channel["name_company"], channel["_id"], channel["resource_id"]
+            )
+        except Exception as e:
+            # Si no se puede detener, vence solo; sus avisos se siguen aceptando
+            # hasta entonces
+            print(f"No se pudo detener el canal {channel['_id']}: {e}")
+            return
+        self.channels_collection.delete_one({"_id": channel["_id"]})
+
+    def list_channels(self) -> List[Dict]:
+        return [
+            self._public(doc)
+            for doc in self.channels_collection.find().sort("expiration", ASCENDING)
+        ]
+
+    def renew_expiring(self) -> Dict:
+        """
+        Renueva los canales que vencen dentro de `renew_before_seconds` y
+        borra los ya vencidos.
+        """
+        now = _utcnow()
+        limit = now + timedelta(seconds=self.renew_before_seconds)
+        renewed, failed = 0, 0
+        calendars = {
+            (doc["name_company"], doc["calendar_id"])
+            for doc in self.channels_collection.find({"expiration": {"$lt": limit}})
+        }
+        for name_company, calendar_id in sorted(calendars):
+            if self.channels_collection.find_one(
+                {
+                    "name_company": name_company,
+                    "calendar_id": calendar_id,
+                    "resource_id": {"$ne": None},
+                    "expiration": {"$gte": limit},
+                }
+            ):
+                continue  # Otro worker ya lo renovó
+            try:
+                self.watch(name_company, calendar_id)
+                renewed += 1
+            except Exception as e:
+                failed += 1
+                print(f"Error al renovar el canal de {name_company}: {e}")
+        expired = self.channels_collection.delete_many(
+            {"expiration": {"$lt": now}}
+        ).deleted_count
+        return {"renewed": renewed, "failed": failed, "expired": expired}
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="calendar-watch-renewer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._executor.shutdown(wait=False)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                result = self.renew_expiring()
+                if result["renewed"] or result["failed"]:
+                    print(f"Canales de Google renovados: {result}")
+            except Exception as e:
+                print(f"Error al renovar canales de Google: {e}")
+            self._stopping.wait(self.renew_interval_seconds)
+
+    # Notificaciones
+
+    def handle_notification(self, headers: Mapping[str, str]) -> str:
+        """
+        Valida una notificación de Google (cabeceras X-Goog-*) y, si indica un
+        cambio, marca el calendario como dirty y agenda su sincronización.
+        Devuelve el X-Goog-Resource-State recibido.
+        """
+        channel_id = headers.get("x-goog-channel-id")
+        state = headers.get("x-goog-resource-state")
+        if not channel_id or not state:
+            raise HTTPException(
+                status_code=400, detail="Faltan cabeceras X-Goog-Channel-ID/State."
+            )
+        channel = self.channels_collection.find_one({"_id": channel_id})
+        if channel is None or channel["expiration"] < _utcnow():
+            # Google deja de reintentar ante un 404
+            raise HTTPException(status_code=404, detail="Canal desconocido.")
+        token = headers.get("x-goog-channel-token") or ""
+        if not hmac.compare_digest(token.encode(), channel["token"].encode()):
+            raise HTTPException(status_code=403, detail="Token de canal inválido.")
+        # Un canal recién pedido aún no tiene resourceId (el aviso "sync" puede
+        # llegar antes de la respuesta de Google): basta con el token
+        if channel["resource_id"] is not None and (
+            headers.get("x-goog-resource-id") != channel["resource_id"]
+        ):
+            raise HTTPException(status_code=403, detail="Recurso inválido.")
+
+        # "sync" es el aviso inicial al crear el canal: no hay cambios
+        if state in self.CHANGE_STATES:
+            self.mark_dirty(channel["name_company"], channel["calendar_id"])
+        return state
+
+    def mark_dirty(self, name_company: str, calendar_id: str):
+        self.sync_collection.update_one(
+            {"_id": self._sync_id(name_company, calendar_id)},
+            {
+                "$set": {
+                    "name_company": name_company,
+                    "calendar_id": calendar_id,
+                    "dirty": True,
+                    "dirty_at": _utcnow(),
+                },
+                "$inc": {"version": 1},
+            },
+            upsert=True,
+        )
+        self.calendar_service.invalidate_calendar(name_company, calendar_id)
+        self.schedule_sync(name_company, calendar_id)
+
+    def schedule_sync(self, name_company: str, calendar_id: str):
+        """
+        Agenda una sincronización en segundo plano. Las notificaciones que
+        llegan mientras corre se agrupan en una sola pasada adicional.
+        """
+        key = (name_company, calendar_id)
+        with self._scheduled_lock:
+            if key in self._scheduled:
+                self._scheduled[key] = True
+                return
+            self._scheduled[key] = False
+        try:
+            self._executor.submit(self._sync_in_background, key)
+        except RuntimeError:
+            # Executor detenido (apagado de la aplicación)
+            with self._scheduled_lock:
+                self._scheduled.pop(key, None)
+
+    def _sync_in_background(self, key: Tuple[str, str]):
+        while True:
+            try:
+                self.sync(*key)
+            except Exception as e:
+                print(f"Error al sincronizar el calendario {key}: {e}")
+            with self._scheduled_lock:
+                if not self._scheduled.get(key):
+                    self._scheduled.pop(key, None)
+                    return
+                self._scheduled[key] = False
+
+    # Sincronización
+
+    def sync(self, name_company: str, calendar_id: Optional[str] = None) -> Dict:
+        """
+        Trae de Google los cambios desde el último syncToken (o todo el
+        calendario si no hay token o venció) y los aplica a calendar_events.
+        """
+        calendar_id = self.calendar_service.resolve_calendar_id(
+            name_company, calendar_id
+        )
+        key = (name_company, calendar_id)
+        with self._scheduled_lock:
+            lock = self._sync_locks.setdefault(key, threading.Lock())
+        with lock:
+            sync_id = self._sync_id(name_company, calendar_id)
+            state = self.sync_collection.find_one({"_id": sync_id}) or {}
+            version = state.get("version", 0)
+            # Un token obtenido sin singleEvents no sirve: copia completa
+            sync_token = state.get("sync_token") if state.get("single_events") else None
+            try:
+                result = self._pull(name_company, calendar_id, sync_token)
+            except requests.HTTPError as e:
+                if sync_token is None or e.response.status_code != 410:
+                    raise
+                # syncToken vencido: sincronización completa
+                result = self._pull(name_company, calendar_id, None)
+
+            now = _utcnow()
+            self.sync_collection.update_one(
+                {"_id": sync_id},
+                {
+                    "$set": {
+                        "name_company": name_company,
+                        "calendar_id": calendar_id,
+                        "sync_token": result["sync_token"],
+                        "single_events": True,
+                        "synced_at": now,
+                    },
+                    "$setOnInsert": {"version": 0},
+                },
+                upsert=True,
+            )
+            # Solo queda limpio si no llegó otra notificación mientras tanto
+            self.sync_collection.update_one(
+                {"_id": sync_id, "version": version}, {"$set": {"dirty": False}}
+            )
+            return {
+                "name_company": name_company,
+                "calendar_id": calendar_id,
+                "full": result["full"],
+                "changed": result["changed"],
+                "deleted": result["deleted"],
+                "synced_at": now.isoformat(),
+            }
+
+    def _pull(
+        self, name_company: str, calendar_id: str, sync_token: Optional[str]
+    ) -> Dict:
+        full = sync_token is None
+        changed, deleted = 0, 0
+        seen: List[str] = []
+        page_token = None
+        while True:
+            page = self.calendar_service.sync_events(
+                name_company, calendar_id, sync_token=sync_token, page_token=page_token
+            )
+            operations = []
+            for event in page.get("items", []):
+                self.calendar_service.cache_synced_event(
+                    name_company, calendar_id, event
+                )
+                _id = f"{name_company}|{calendar_id}|{event['id']}"
+                if event.get("status") == "cancelled":
+                    operations.append(DeleteOne({"_id": _id}))
+                    deleted += 1
+                    continue
+                seen.append(_id)
+                operations.append(
+                    ReplaceOne(
+                        {"_id": _id},
+                        {
+                            "_id": _id,
+                            "name_company": name_company,
+                            "calendar_id": calendar_id,
+                            "start_utc": _event_time_utc(event, "start"),
+                            "end_utc": _event_time_utc(event, "end"),
+                            "event": event,
+                        },
+                        upsert=True,
+                    )
+                )
+                changed += 1
+            if operations:
+                self.events_collection.bulk_write(operations, ordered=False)
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
+
+        if full:
+            # Lo que no vino en la sincronización completa ya no existe
+            deleted += self.events_collection.delete_many(
+                {
+                    "name_company": name_company,
+                    "calendar_id": calendar_id,
+                    "_id": {"$nin": seen},
+                }
+            ).deleted_count
+        return {
+            "sync_token": page.get("nextSyncToken"),
+            "full": full,
+            "changed": changed,
+            "deleted": deleted,
+        }
+
+    def list_events(
+        self,
+        name_company: str,
+        time_min: Optional[str] = None,
+        calendar_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        Eventos del calendario desde la copia local. Solo se consulta a Google
+        si el calendario está dirty, nunca se sincronizó o no tiene un canal
+        vigente; si esa sincronización falla se devuelve la copia marcada con
+        `"stale": true`.
+        """
+        calendar_id = self.calendar_service.resolve_calendar_id(
+            name_company, calendar_id
+        )
+        state = self.sync_collection.find_one(
+            {"_id": self._sync_id(name_company, calendar_id)}
+        )
+        watched = self.channels_collection.find_one(
+            {
+                "name_company": name_company,
+                "calendar_id": calendar_id,
+                "resource_id": {"$ne": None},
+                "expiration": {"$gt": _utcnow()},
+            }
+        )
+        stale = False
+        if state is None or state.get("dirty") or watched is None:
+            try:
+                self.sync(name_company, calendar_id)
+            except (requests.RequestException, HTTPException):
+                if state is None:
+                    raise
+                stale = True
+            state = self.sync_collection.find_one(
+                {"_id": self._sync_id(name_company, calendar_id)}
+            )
+
+        query = {"name_company": name_company, "calendar_id": calendar_id}
+        if time_min:
+            # Como timeMin en Google: eventos que terminan después de time_min
+            time_min_utc = _event_time_utc({"start": {"dateTime": time_min}})
+            if time_min_utc is not None:
+                query["end_utc"] = {"$gt": time_min_utc}
+        items = [
+            doc["event"]
+            for doc in self.events_collection.find(query).sort("start_utc", ASCENDING)
+        ]
+        body = {
+            "kind": "calendar#events",
+            "summary": calendar_id,
+            "items": items,
+            "synced_at": (
+                state["synced_at"].isoformat() if state.get("synced_at") else None
+            ),
+        }
+        if stale:
+            body["stale"] = True
+        return body
+
+    @staticmethod
+    def _public(doc: Dict) -> Dict:
+        # El token del canal es secreto: no se expone
+        return {
+            "id": doc["_id"],
+            "name_company": doc["name_company"],
+            "calendar_id": doc["calendar_id"],
+            "resource_id": doc["resource_id"],
+            "expiration": doc["expiration"].isoformat(),
+        }
@@ -0,0 +1,12 @@
+import mongomock
+import pytest
+
+
+@pytest.fixture
+def client():
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def db(client):
+    return client["calendar_app"]
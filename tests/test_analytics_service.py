@@ -0,0 +1,90 @@
+import os
+import uuid
+from datetime import date, datetime
+import pytest
+from pymongo import MongoClient
+from services.analytics_service import AnalyticsService
+from services.archive_service import CitasArchiveService
+from services.availability_service import AvailabilityService
+
+# El pipeline usa $dateTrunc y $unionWith (MongoDB 5.0+), que mongomock no
+# implementa: esta prueba corre contra un servidor real
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+
+pytestmark = pytest.mark.skipif(
+    not MONGO_TEST_URI, reason="Requiere MONGO_TEST_URI (MongoDB 5.0+)"
+)
+
+
+@pytest.fixture
+def availability():
+    client = MongoClient(MONGO_TEST_URI)
+    db_name = f"test_analytics_{uuid.uuid4().hex[:8]}"
+    yield AvailabilityService(client=client, db_name=db_name)
+    client.drop_database(db_name)
+    client.close()
+
+
+def _seed(db):
+    db["credentials"].insert_one({"name_company": "acme", "user_id": "u1"})
+    db["configuracion_calendar"].insert_one(
+        {
+            "user_id": "u1",
+            "hora_inicio": "08:00",
+            "hora_fin": "12:00",
+            "tiempoSesion": 60,
+            "dia_disponibles": 5,
+            "all_day": False,
+            "days": {
+                day: ["08:00-12:00"]
+                for day in ["lunes", "martes", "miercoles", "jueves", "viernes"]
+            },
+            "time_global": False,
+        }
+    )
+    # 2020-01-06 es lunes; Guayaquil está en UTC-5
+    db["citas"].insert_many(
+        [
+            {"user_id": "u1", "fecha": datetime(2020, 1, 6, 13, 0)},
+            # 22:00 del lunes en hora local
+            {"user_id": "u1", "fecha": datetime(2020, 1, 7, 3, 0)},
+            {"user_id": "u1", "fecha": datetime(2020, 1, 7, 14, 0)},
+            {"user_id": "otro", "fecha": datetime(2020, 1, 7, 14, 0)},
+        ]
+    )
+
+
+def test_daily_utilization_groups_by_local_day(availability):
+    _seed(availability.db)
+
+    rows = AnalyticsService(availability).get_utilization(
+        ["acme"], date(2020, 1, 6), date(2020, 1, 12), "day", "America/Guayaquil"
+    )
+
+    by_period = {row["period"]: row for row in rows}
+    assert by_period["2020-01-06"]["booked"] == 2
+    assert by_period["2020-01-06"]["offered"] == 4
+    assert by_period["2020-01-06"]["utilization"] == 0.5
+    assert by_period["2020-01-07"]["booked"] == 1
+    assert by_period["2020-01-11"]["offered"] == 0
+    assert by_period["2020-01-11"]["utilization"] is None
+
+
+def test_weekly_utilization_includes_archived_citas(availability):
+    _seed(availability.db)
+    archive = CitasArchiveService(availability.db)
+    archive.archive_before(datetime(2020, 1, 7, 12, 0))
+
+    rows = AnalyticsService(availability, archive).get_utilization(
+        ["acme"], date(2020, 1, 6), date(2020, 1, 12), "week", "America/Guayaquil"
+    )
+
+    assert rows == [
+        {
+            "name_company": "acme",
+            "period": "2020-01-06",
+            "booked": 3,
+            "offered": 20,
+            "utilization": 0.15,
+        }
+    ]
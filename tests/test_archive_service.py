@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from services.archive_service import CitasArchiveService
+
+
+def _today() -> datetime:
+    return datetime.now(timezone.utc).replace(
+        tzinfo=None, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def _cita(fecha: datetime, user_id: str = "u1"):
+    return {"user_id": user_id, "fecha": fecha, "usuario": "1", "nombre": "N"}
+
+
+def test_archive_moves_past_citas_into_monthly_collections(db):
+    db["citas"].insert_many(
+        [
+            _cita(datetime(2024, 1, 10, 15)),
+            _cita(datetime(2024, 2, 3, 9)),
+            _cita(datetime(2024, 2, 20, 9)),
+        ]
+    )
+    upcoming = _today() + timedelta(days=1, hours=10)
+    db["citas"].insert_one(_cita(upcoming))
+
+    result = CitasArchiveService(db, batch_size=2).archive_before()
+
+    assert result["moved"] == 3
+    assert result["collections"] == {
+        "citas_archive_2024_01": 1,
+        "citas_archive_2024_02": 2,
+    }
+    assert [cita["fecha"] for cita in db["citas"].find()] == [upcoming]
+    assert db["citas_archive_2024_02"].count_documents({"user_id": "u1"}) == 2
+
+
+def test_archive_is_idempotent_when_rerun(db):
+    db["citas"].insert_one(_cita(datetime(2024, 1, 10, 15)))
+    archive = CitasArchiveService(db)
+
+    archive.archive_before()
+    # Un lote copiado pero no borrado (ejecución interrumpida) no se duplica
+    db["citas"].insert_one(db["citas_archive_2024_01"].find_one())
+    result = archive.archive_before()
+
+    assert result["moved"] == 1
+    assert db["citas_archive_2024_01"].count_documents({}) == 1
+    assert db["citas"].count_documents({}) == 0
+
+
+@pytest.mark.parametrize("days", [0, 1])
+def test_archive_rejects_cutoff_today_or_later(db, days):
+    upcoming = _today() + timedelta(hours=20)
+    db["citas"].insert_one(_cita(upcoming))
+
+    with pytest.raises(ValueError):
+        CitasArchiveService(db).archive_before(_today() + timedelta(days=days))
+
+    assert db["citas"].count_documents({}) == 1
+
+
+def test_archive_after_days_must_be_positive(db):
+    with pytest.raises(ValueError):
+        CitasArchiveService(db, archive_after_days=0)
@@ -0,0 +1,273 @@
+from datetime import datetime, timedelta
+from itertools import islice
+from zoneinfo import ZoneInfo
+import pytest
+from fastapi import HTTPException
+from services.availability_service import AvailabilityService
+
+TIME_ZONE = "America/Guayaquil"  # UTC-5, sin horario de verano
+
+
+@pytest.fixture
+def service(client, db):
+    db["credentials"].insert_one(
+        {
+            "name_company": "acme",
+            "user_id": "u1",
+            "access_token": "a",
+            "scope": "s",
+            "token_type": "Bearer",
+        }
+    )
+    db["configuracion_calendar"].insert_one(
+        {
+            "user_id": "u1",
+            "hora_inicio": "08:00",
+            "hora_fin": "10:00",
+            "tiempoSesion": 60,
+            "dia_disponibles": 5,
+            "hora_bloqueada_list": [],
+            "all_day": False,
+            "time_global": False,
+            "days": {day: ["08:00-10:00"] for day in ("lunes", "martes", "miercoles")},
+        }
+    )
+    return AvailabilityService(client=client)
+
+
+def add_cita(db, fecha: datetime, user_id: str = "u1"):
+    db["citas"].insert_one(
+        {
+            "usuario": "ana",
+            "email": "ana@example.com",
+            "nombre": "Ana",
+            "tipo_cita": "Consulta",
+            "fecha": fecha,
+            "user_id": user_id,
+        }
+    )
+
+
+def test_availability_does_not_print_per_day_traces(service, db, capsys):
+    add_cita(db, datetime(2030, 1, 7, 13))  # 08:00 en Guayaquil
+
+    service.get_available_days("acme", TIME_ZONE)
+    hours = service.get_available_hours("acme", "2030-01-07", TIME_ZONE, compact=True)
+
+    assert hours == ["09:00:00"]
+    assert capsys.readouterr().out == ""
+
+
+def _local_to_utc(day, hour, minute=0):
+    # Guayaquil está siempre en UTC-5; Mongo guarda UTC sin zona horaria
+    return datetime(day.year, day.month, day.day, hour, minute) + timedelta(hours=5)
+
+
+def test_bulk_days_match_single_tenant_days(service, db):
+    db["configuracion_calendar"].update_one(
+        {"user_id": "u1"},
+        {
+            "$set": {
+                "dia_disponibles": 3,
+                "days": {
+                    day: ["08:00-10:00", "19:00-20:00"]
+                    for day in (
+                        "lunes",
+                        "martes",
+                        "miercoles",
+                        "jueves",
+                        "viernes",
+                        "sabado",
+                        "domingo",
+                    )
+                },
+            }
+        },
+    )
+    tomorrow = datetime.now(ZoneInfo(TIME_ZONE)).date() + timedelta(days=1)
+    # Citas desalineadas: la sesión de las 08:00 y la de las 09:00 siguen
+    # libres porque ninguna cita empieza exactamente a esa hora
+    add_cita(db, _local_to_utc(tomorrow, 7, 30))
+    add_cita(db, _local_to_utc(tomorrow, 8, 30))
+    # Día lleno; la cita de las 19:00 locales ya es el día siguiente en UTC
+    full_day = tomorrow + timedelta(days=1)
+    for hour in (8, 9, 19):
+        add_cita(db, _local_to_utc(full_day, hour))
+
+    days = service.get_available_days("acme", TIME_ZONE)
+    bulk = service.get_available_days_bulk(["acme"], TIME_ZONE)
+
+    expected = [
+        tomorrow.isoformat(),
+        (tomorrow + timedelta(days=2)).isoformat(),
+        (tomorrow + timedelta(days=3)).isoformat(),
+    ]
+    assert days == expected
+    assert bulk["results"]["acme"] == {
+        "next_available_day": tomorrow.isoformat(),
+        "available_days": expected,
+    }
+    assert bulk["errors"] == {}
+
+
+def test_bulk_days_reports_errors_per_company(service, db):
+    db["credentials"].insert_one(
+        {
+            "name_company": "rota",
+            "user_id": "u2",
+            "access_token": "a",
+            "scope": "s",
+            "token_type": "Bearer",
+        }
+    )
+    db["configuracion_calendar"].insert_one({"user_id": "u2", "tiempoSesion": 30})
+
+    bulk = service.get_available_days_bulk(["acme", "rota", "nadie"], TIME_ZONE)
+
+    assert list(bulk["results"]) == ["acme"]
+    assert bulk["errors"]["rota"]["status_code"] == 500
+    assert bulk["errors"]["nadie"]["status_code"] == 404
+
+
+def test_bulk_days_stop_at_the_horizon(service):
+    bulk = service.get_available_days_bulk(["acme"], TIME_ZONE, horizon_days=7)
+
+    # lunes, martes y miércoles: 3 días por semana
+    assert len(bulk["results"]["acme"]["available_days"]) == 3
+
+
+def add_company(db, name_company, user_id, hours, session, blocked=()):
+    db["credentials"].insert_one(
+        {
+            "name_company": name_company,
+            "user_id": user_id,
+            "access_token": "a",
+            "scope": "s",
+            "token_type": "Bearer",
+        }
+    )
+    db["configuracion_calendar"].insert_one(
+        {
+            "user_id": user_id,
+            "hora_inicio": "00:00",
+            "hora_fin": "00:00",
+            "tiempoSesion": session,
+            "dia_disponibles": 5,
+            "hora_bloqueada_list": list(blocked),
+            "all_day": False,
+            "days": {"lunes": hours},
+        }
+    )
+
+
+def test_common_availability_intersects_free_time(service, db):
+    # acme: lunes 08:00-10:00 con sesiones de 60 minutos
+    add_company(db, "beta", "u2", ["09:00-12:00"], 30, blocked=["11:00-12:00"])
+    monday = datetime(2030, 1, 7)
+    add_cita(db, _local_to_utc(monday, 10), user_id="u2")
+
+    grid = service.get_common_availability(
+        ["acme", "beta", "acme"], start_date="2030-01-07", num_days=2, compact=True
+    )
+
+    # Común: 09:00-10:00 (beta ocupa 10:00-10:30 y bloquea 11:00-12:00)
+    assert grid == {"2030-01-07": ["09:00:00"], "2030-01-08": []}
+    assert service.get_common_availability(
+        ["beta"], start_date="2030-01-07", num_days=1, duration=30, compact=True
+    ) == {"2030-01-07": ["09:00:00", "09:30:00", "10:30:00"]}
+
+
+def test_next_slots_stop_reading_citas_once_found(service, db, monkeypatch):
+    monday = datetime(2030, 1, 7)
+    add_cita(db, _local_to_utc(monday, 9), user_id="u1")
+    reads = []
+    get_citas_range = service.get_citas_range
+
+    def spy(user_id, fecha_inicio, fecha_fin):
+        reads.append(fecha_inicio)
+        return get_citas_range(user_id, fecha_inicio, fecha_fin)
+
+    monkeypatch.setattr(service, "get_citas_range", spy)
+    desde = datetime(2030, 1, 7, 7, 30, tzinfo=ZoneInfo(TIME_ZONE))
+
+    slots = list(
+        islice(
+            service.iter_available_slots(
+                "acme", TIME_ZONE, desde=desde, citas_chunk_days=1
+            ),
+            3,
+        )
+    )
+
+    # Lunes 09:00 está ocupada; martes completa las 3 sesiones
+    assert [slot.isoformat() for slot in slots] == [
+        "2030-01-07T08:00:00-05:00",
+        "2030-01-08T08:00:00-05:00",
+        "2030-01-08T09:00:00-05:00",
+    ]
+    # Solo se leyeron las citas del lunes y del martes, no de los 30 días
+    assert len(reads) == 2
+
+
+def test_next_slots_skip_sessions_already_started(service):
+    desde = datetime(2030, 1, 7, 8, 30, tzinfo=ZoneInfo(TIME_ZONE))
+
+    first = next(service.iter_available_slots("acme", TIME_ZONE, desde=desde))
+
+    assert first.isoformat() == "2030-01-07T09:00:00-05:00"
+
+
+def test_next_slots_end_at_the_horizon(service):
+    # Jueves: con 3 días de horizonte solo quedan jueves, viernes y sábado
+    desde = datetime(2030, 1, 10, 7, 0, tzinfo=ZoneInfo(TIME_ZONE))
+
+    assert (
+        list(
+            service.iter_available_slots("acme", TIME_ZONE, desde=desde, horizon_days=3)
+        )
+        == []
+    )
+
+
+def test_grid_matches_hours_per_day_with_one_citas_query(service, db, monkeypatch):
+    add_cita(db, _local_to_utc(datetime(2030, 1, 7), 8))
+    add_cita(db, _local_to_utc(datetime(2030, 1, 9), 9))
+    reads = []
+    get_citas_range = service.get_citas_range
+
+    def spy(*args):
+        reads.append(args)
+        return get_citas_range(*args)
+
+    monkeypatch.setattr(service, "get_citas_range", spy)
+
+    grid = service.get_available_grid(
+        "acme", start_date="2030-01-07", num_days=4, time_zone=TIME_ZONE, compact=True
+    )
+
+    assert grid == {
+        "2030-01-07": ["09:00:00"],
+        "2030-01-08": ["08:00:00", "09:00:00"],
+        "2030-01-09": ["08:00:00"],
+        "2030-01-10": [],  # Jueves: no laboral
+    }
+    assert len(reads) == 1
+    for day, hours in grid.items():
+        assert service.get_available_hours("acme", day, TIME_ZONE, compact=True) == (
+            hours
+        )
+
+
+def test_grid_full_format_and_invalid_start_date(service):
+    grid = service.get_available_grid(
+        "acme", start_date="2030-01-07", num_days=1, time_zone=TIME_ZONE
+    )
+
+    assert grid["2030-01-07"][0] == {
+        "id": 1,
+        "hora": "08:00:00",
+        "horaFormat": "08:00 AM",
+    }
+    with pytest.raises(HTTPException) as error:
+        service.get_available_grid("acme", start_date="07/01/2030")
+    assert error.value.status_code == 400
@@ -0,0 +1,281 @@
+import pytest
+import requests
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from services.availability_service import AvailabilityService
+from services.booking_jobs import BookingJobQueue
+from services.reservations import SlotReservations
+
+START = "2030-01-07T09:00:00-05:00"
+
+
+class FakeCalendarService:
+    """
+    Sustituye a GoogleCalendarService: `failures` son los errores que lanzan
+    los primeros intentos; después confirma la cita provisoria como lo hace
+    create_event. `delete_error` es lo que lanza delete_event.
+    """
+
+    def __init__(self, availability_service, db, failures=(), delete_error=None):
+        self.availability_service = availability_service
+        self.reservations = SlotReservations(db)
+        self.citas_collection = db["citas"]
+        self.failures = list(failures)
+        self.delete_error = delete_error
+        self.calls = []
+        self.deleted = []
+
+    def create_event(self, name_company, start_time, event_id=None, **kwargs):
+        self.calls.append((start_time, event_id, kwargs["slot_reserved"]))
+        if self.failures:
+            raise self.failures.pop(0)
+        self.citas_collection.update_one(
+            {"event_id": event_id}, {"$unset": {"status": ""}}
+        )
+        return {"id": event_id}
+
+    def delete_event(self, name_company, event_id):
+        self.deleted.append(event_id)
+        if self.delete_error:
+            raise self.delete_error
+        return {"status": "deleted"}
+
+
+@pytest.fixture
+def availability_service(client, db):
+    db["credentials"].insert_one(
+        {
+            "name_company": "acme",
+            "user_id": "u1",
+            "access_token": "a",
+            "scope": "s",
+            "token_type": "Bearer",
+        }
+    )
+    db["configuracion_calendar"].insert_one(
+        {
+            "user_id": "u1",
+            "hora_inicio": "08:00",
+            "hora_fin": "17:00",
+            "tiempoSesion": 30,
+            "dia_disponibles": 30,
+            "all_day": False,
+            "titulo_evento": "Consulta",
+        }
+    )
+    return AvailabilityService(client=client)
+
+
+def _queue(availability_service, db, failures=(), delete_error=None):
+    google = FakeCalendarService(availability_service, db, failures, delete_error)
+    return BookingJobQueue(google, db, retry_backoff=0), google
+
+
+def _submit(queue):
+    return queue.submit("acme", START, "ana@example.com", "ana", "Ana")
+
+
+def _run_next(queue):
+    job = queue._claim()
+    assert job is not None
+    queue._process(job)
+    return job
+
+
+def test_submit_holds_the_slot_until_the_job_succeeds(availability_service, db):
+    queue, google = _queue(availability_service, db)
+
+    job = _submit(queue)
+
+    assert job["status"] == "pending"
+    assert db["citas"].find_one({"event_id": job["id"]})["status"] == "pending"
+    with pytest.raises(HTTPException) as error:
+        _submit(queue)
+    assert error.value.status_code == 409
+
+    _run_next(queue)
+
+    assert queue.get(job["id"])["status"] == "succeeded"
+    assert google.calls == [(START, job["id"], True)]
+    assert google.deleted == []
+    assert "status" not in db["citas"].find_one({"event_id": job["id"]})
+    assert db["booking_reservations"].count_documents({}) == 0
+
+
+def test_transient_errors_are_retried_with_the_same_event_id(availability_service, db):
+    queue, google = _queue(
+        availability_service, db, failures=[HTTPException(status_code=429)]
+    )
+    job = _submit(queue)
+
+    _run_next(queue)
+    assert queue.get(job["id"])["status"] == "pending"
+    _run_next(queue)
+
+    assert queue.get(job["id"])["status"] == "succeeded"
+    assert [call[1] for call in google.calls] == [job["id"], job["id"]]
+
+
+def test_failed_job_frees_the_slot(availability_service, db):
+    queue, _ = _queue(
+        availability_service,
+        db,
+        failures=[HTTPException(status_code=400, detail="Malo")],
+    )
+    job = _submit(queue)
+
+    _run_next(queue)
+
+    assert queue.get(job["id"])["error"] == {"status_code": 400, "detail": "Malo"}
+    assert db["citas"].count_documents({}) == 0
+    assert db["booking_reservations"].count_documents({}) == 0
+    assert _submit(queue)["status"] == "pending"
+
+
+def test_worker_that_lost_its_lease_does_not_finish_the_job(availability_service, db):
+    queue, _ = _queue(availability_service, db)
+    job = _submit(queue)
+    stale = queue._claim()
+    # El lease venció y otro worker reclamó el trabajo
+    db["booking_jobs"].update_one({"_id": job["id"]}, {"$set": {"lease_owner": "otro"}})
+
+    queue._process(stale)
+
+    assert queue.get(job["id"])["status"] == "running"
+    assert db["booking_reservations"].count_documents({}) == 1
+
+
+def test_failed_job_insert_releases_the_reservation(
+    availability_service, db, monkeypatch
+):
+    queue, _ = _queue(availability_service, db)
+
+    def fail(job):
+        raise RuntimeError("Mongo caído")
+
+    monkeypatch.setattr(queue.jobs_collection, "insert_one", fail)
+
+    with pytest.raises(RuntimeError):
+        _submit(queue)
+    assert db["citas"].count_documents({}) == 0
+    assert db["booking_reservations"].count_documents({}) == 0
+
+
+def _reservation(db):
+    return db["booking_reservations"].find_one({})
+
+
+def _expire_reservation(db):
+    past = datetime.utcnow() - timedelta(seconds=1)
+    db["booking_reservations"].update_one({}, {"$set": {"expires_at": past}})
+
+
+def test_reservation_expires_and_is_extended_by_each_claim(availability_service, db):
+    queue, _ = _queue(availability_service, db)
+    queue.lease_seconds = 60
+    job = _submit(queue)
+
+    submitted = _reservation(db)["expires_at"]
+    assert submitted <= datetime.utcnow() + timedelta(seconds=120)
+
+    claimed = queue._claim()
+    # _process extiende la reserva antes de llamar a Google
+    assert queue._hold_reservation(claimed, claimed["lease_until"])
+    assert _reservation(db)["expires_at"] >= claimed["lease_until"] + timedelta(
+        seconds=59
+    )
+    assert _reservation(db)["owner"] == job["id"]
+
+
+def test_retry_keeps_the_reservation_until_after_the_next_attempt(
+    availability_service, db
+):
+    queue, _ = _queue(
+        availability_service, db, failures=[HTTPException(status_code=503)]
+    )
+    queue.retry_backoff = 600
+    job = _submit(queue)
+
+    _run_next(queue)
+
+    available_at = db["booking_jobs"].find_one({"_id": job["id"]})["available_at"]
+    assert _reservation(db)["expires_at"] > available_at
+
+
+def test_expired_reservation_is_taken_back_by_the_next_claim(availability_service, db):
+    queue, _ = _queue(availability_service, db)
+    job = _submit(queue)
+    # El servicio estuvo caído: el índice TTL ya borró la reserva
+    db["booking_reservations"].delete_many({})
+
+    _run_next(queue)
+
+    assert queue.get(job["id"])["status"] == "succeeded"
+    assert db["booking_reservations"].count_documents({}) == 0
+
+
+def test_job_fails_if_another_booking_took_the_expired_slot(availability_service, db):
+    queue, google = _queue(availability_service, db)
+    job = _submit(queue)
+    _expire_reservation(db)
+    reservation_id = _reservation(db)["_id"]
+    assert queue.reservations.refresh(reservation_id, "otro", 300)
+
+    _run_next(queue)
+
+    assert queue.get(job["id"])["error"]["status_code"] == 409
+    assert google.calls == []
+    assert db["citas"].count_documents({}) == 0
+    assert _reservation(db)["owner"] == "otro"
+
+
+def test_failed_job_deletes_the_event_it_may_have_created(availability_service, db):
+    queue, google = _queue(
+        availability_service,
+        db,
+        failures=[HTTPException(status_code=500, detail="Mongo caído")],
+    )
+    job = _submit(queue)
+
+    _run_next(queue)
+
+    assert queue.get(job["id"])["status"] == "failed"
+    assert google.deleted == [job["id"]]
+
+
+def test_exhausted_retries_delete_the_event_too(availability_service, db):
+    queue, google = _queue(availability_service, db)
+    job = _submit(queue)
+    # Los intentos anteriores murieron con el worker, quizás tras crear el evento
+    db["booking_jobs"].update_one(
+        {"_id": job["id"]}, {"$set": {"attempts": queue.max_attempts}}
+    )
+
+    _run_next(queue)
+
+    assert queue.get(job["id"])["status"] == "failed"
+    assert google.calls == []
+    assert google.deleted == [job["id"]]
+    assert db["booking_reservations"].count_documents({}) == 0
+
+
+@pytest.mark.parametrize("status_code", [404, 410])
+def test_missing_event_is_not_an_error_when_failing(
+    availability_service, db, capsys, status_code
+):
+    response = requests.Response()
+    response.status_code = status_code
+    queue, google = _queue(
+        availability_service,
+        db,
+        failures=[HTTPException(status_code=400, detail="Malo")],
+        delete_error=requests.HTTPError(response=response),
+    )
+    job = _submit(queue)
+
+    _run_next(queue)
+
+    assert queue.get(job["id"])["error"] == {"status_code": 400, "detail": "Malo"}
+    assert google.deleted == [job["id"]]
+    assert capsys.readouterr().out == ""
+    assert db["booking_reservations"].count_documents({}) == 0
@@ -0,0 +1,63 @@
+import io
+from services.bulk_service import BulkDataService
+
+
+def _configs(*user_ids):
+    return [
+        {
+            "user_id": user_id,
+            "hora_inicio": "08:00",
+            "hora_fin": "18:00",
+            "tiempoSesion": 30,
+            "dia_disponibles": 5,
+            "all_day": False,
+        }
+        for user_id in user_ids
+    ]
+
+
+def test_ordered_import_writes_records_before_first_invalid_one(db):
+    documents = _configs("u1", "u2") + [{"hora_inicio": "09:00"}] + _configs("u3")
+
+    stats = BulkDataService(db).import_documents(
+        "configuracion_calendar", documents, batch_size=100, ordered=True
+    )
+
+    assert stats["stopped"] is True
+    assert stats["upserted"] == 2
+    assert stats["failed"] == 1
+    assert stats["errors"][0]["index"] == 2
+    assert sorted(
+        doc["user_id"] for doc in db["configuracion_calendar"].find()
+    ) == ["u1", "u2"]
+
+
+def test_ordered_import_stops_on_malformed_line(db):
+    source = io.StringIO(
+        '{"user_id": "u1", "name_company": "a", "access_token": "t"}\n'
+        "no es json\n"
+        '{"user_id": "u2", "name_company": "b", "access_token": "t"}\n'
+    )
+
+    stats = BulkDataService(db).import_file(
+        "credentials", source, "ndjson", batch_size=100, ordered=True
+    )
+
+    assert stats["received"] == 2
+    assert stats["upserted"] == 1
+    assert stats["failed"] == 1
+    assert db["credentials"].count_documents({}) == 1
+
+
+def test_unordered_import_reports_errors_and_writes_the_rest(db):
+    documents = _configs("u1") + [{"hora_inicio": "09:00"}] + _configs("u2", "u3")
+
+    stats = BulkDataService(db).import_documents(
+        "configuracion_calendar", documents, batch_size=2, ordered=False
+    )
+
+    assert stats["stopped"] is False
+    assert stats["upserted"] == 3
+    assert stats["failed"] == 1
+    assert stats["batches"] == 2
+    assert db["configuracion_calendar"].count_documents({}) == 3
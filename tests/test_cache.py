@@ -0,0 +1,98 @@
+import importlib
+import config
+from models.interfaces import IInvalidationBus
+from services.availability_service import AvailabilityService
+from services.cache import CacheService, LocalCacheBackend, MongoCacheBackend
+
+
+class MemoryInvalidationBus(IInvalidationBus):
+    """
+    Canal de invalidación en memoria: entrega cada mensaje a todos los
+    suscriptores en el mismo hilo (como harían Redis o la colección capped,
+    que mongomock no soporta).
+    """
+
+    def __init__(self):
+        self.callbacks = []
+
+    def publish(self, message):
+        for callback in list(self.callbacks):
+            callback(message)
+
+    def start(self, callback):
+        self.callbacks.append(callback)
+
+    def stop(self):
+        self.callbacks.clear()
+
+
+def _workers(make_backend, count=2):
+    bus = MemoryInvalidationBus()
+    workers = [CacheService(make_backend(), bus=bus) for _ in range(count)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def test_invalidation_reaches_the_local_copy_of_other_workers():
+    first, second = _workers(LocalCacheBackend)
+    first.set("availability:acme:days", ["2030-01-07"], 30)
+    second.set("availability:acme:days", ["2030-01-07"], 30)
+    second.set("availability:otra:days", ["2030-01-08"], 30)
+
+    first.invalidate_prefix("availability:acme:")
+
+    assert first.get("availability:acme:days") is None
+    assert second.get("availability:acme:days") is None
+    assert second.get("availability:otra:days") == ["2030-01-08"]
+    assert second.snapshot()["invalidations_received"] == 1
+
+
+def test_shared_mongo_backend_drops_near_copies_on_invalidation(db):
+    first, second = _workers(lambda: MongoCacheBackend(db))
+    first.set("config:u1", {"dias": 5}, 300)
+    # El segundo worker la lee de Mongo y la guarda en su copia cercana
+    assert second.get("config:u1") == {"dias": 5}
+
+    first.invalidate("config:u1")
+
+    assert db["cache_entries"].count_documents({}) == 0
+    assert second.get("config:u1") is None
+
+
+def test_booking_invalidation_recomputes_availability(client, monkeypatch):
+    service = AvailabilityService(
+        client=client,
+        cache=CacheService(LocalCacheBackend()),
+        availability_ttl=30,
+    )
+    computed = []
+
+    def compute(name_company, time_zone, today):
+        computed.append(name_company)
+        return [f"libre-{len(computed)}"]
+
+    monkeypatch.setattr(service, "_compute_available_days", compute)
+
+    assert service.get_available_days("acme") == ["libre-1"]
+    assert service.get_available_days("acme") == ["libre-1"]
+    service.invalidate_availability("acme")
+    assert service.get_available_days("acme") == ["libre-2"]
+
+
+def test_availability_is_not_cached_per_worker_without_invalidation(monkeypatch):
+    monkeypatch.delenv("CACHE_AVAILABILITY_TTL_SECONDS", raising=False)
+    try:
+        monkeypatch.setenv("CACHE_BACKEND", "local")
+        monkeypatch.setenv("CACHE_INVALIDATION", "none")
+        assert importlib.reload(config).CACHE_AVAILABILITY_TTL_SECONDS == 0
+
+        monkeypatch.setenv("CACHE_INVALIDATION", "mongo")
+        assert importlib.reload(config).CACHE_AVAILABILITY_TTL_SECONDS == 30
+
+        monkeypatch.setenv("CACHE_INVALIDATION", "none")
+        monkeypatch.setenv("CACHE_AVAILABILITY_TTL_SECONDS", "10")
+        assert importlib.reload(config).CACHE_AVAILABILITY_TTL_SECONDS == 10
+    finally:
+        monkeypatch.undo()
+        importlib.reload(config)
@@ -0,0 +1,167 @@
+import json
+import pytest
+import requests
+from models.data_classes import UserTokenData
+from services.availability_service import AvailabilityService
+from services.calendar_service import GoogleCalendarService
+from services.circuit_breaker import CircuitBreaker
+from services.rate_limiter import FairRateLimiter
+
+
+class FakeTokenStorage:
+    def get_token(self, name_company):
+        return UserTokenData(name_company, "token", "refresh", 3600, "s", "Bearer")
+
+
+class FakeGoogle:
+    """
+    Sustituye a requests.request: guarda cada llamada y responde con
+    `status_code` y un cuerpo vacío de eventos.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.status_code = 200
+        self.headers = {}
+
+    def __call__(self, method, url, params=None, **kwargs):
+        self.calls.append((method, url, dict(params or {})))
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers.update(self.headers)
+        response._content = json.dumps({"items": [], "nextSyncToken": "t"}).encode()
+        return response
+
+
+@pytest.fixture
+def google(monkeypatch):
+    fake = FakeGoogle()
+    monkeypatch.setattr(requests, "request", fake)
+    return fake
+
+
+@pytest.fixture
+def tenants(client, db):
+    db["credentials"].insert_one(
+        {
+            "name_company": "acme",
+            "user_id": "u1",
+            "access_token": "a",
+            "scope": "s",
+            "token_type": "Bearer",
+        }
+    )
+    db["configuracion_calendar"].insert_one(
+        {
+            "user_id": "u1",
+            "hora_inicio": "08:00",
+            "hora_fin": "17:00",
+            "tiempoSesion": 30,
+            "dia_disponibles": 30,
+            "all_day": False,
+            "calendar_id": "cal1",
+        }
+    )
+    return AvailabilityService(client=client)
+
+
+@pytest.fixture
+def calendar_service(tenants):
+    return GoogleCalendarService(None, FakeTokenStorage(), tenants)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def guarded_service(tenants, clock):
+    limiter = FairRateLimiter(
+        global_rate=100,
+        global_burst=100,
+        company_rate=2,
+        company_burst=2,
+        max_queue=10,
+        max_queue_per_company=10,
+        max_wait=1,
+        clock=clock,
+    )
+    breaker = CircuitBreaker(window_size=4, min_calls=4, clock=clock)
+    return GoogleCalendarService(
+        None,
+        FakeTokenStorage(),
+        tenants,
+        rate_limiter=limiter,
+        circuit_breaker=breaker,
+    )
+
+
+def test_listing_and_sync_use_the_company_calendar(calendar_service, google):
+    calendar_service.list_events("acme", time_min="2030-01-07T00:00:00Z")
+    calendar_service.sync_events("acme")
+    calendar_service.get_event("acme", "e1")
+
+    urls = [url for _, url, _ in google.calls]
+    assert all("/calendars/cal1/events" in url for url in urls)
+
+
+def test_explicit_calendar_id_wins(calendar_service, google):
+    calendar_service.list_events("acme", calendar_id="otro")
+
+    assert "/calendars/otro/events" in google.calls[0][1]
+
+
+def test_unknown_company_falls_back_to_primary(calendar_service, google):
+    calendar_service.list_events("sin-config")
+
+    assert "/calendars/primary/events" in google.calls[0][1]
+
+
+def _fail_listing(service, times):
+    for _ in range(times):
+        with pytest.raises(requests.HTTPError):
+            service.list_events("acme", calendar_id="cal1")
+
+
+def test_google_429_backs_off_the_company_without_opening_the_circuit(
+    guarded_service, google
+):
+    google.status_code = 429
+    google.headers = {"Retry-After": "3"}
+
+    _fail_listing(guarded_service, 1)
+
+    assert guarded_service.circuit_breaker.snapshot()["window_calls"] == 0
+    # Con 2 llamadas/s, 3 s de pausa dejan el bucket en 1 - 6 tokens
+    companies = guarded_service.rate_limiter.snapshot()["companies"]
+    assert companies["acme"]["tokens"] == -5
+
+
+def test_repeated_429_does_not_open_the_circuit(guarded_service, google, clock):
+    google.status_code = 429
+    for _ in range(4):
+        _fail_listing(guarded_service, 1)
+        clock.now += 1  # Pasa la pausa de 1 s tras cada 429
+
+    assert len(google.calls) == 4
+
+    assert guarded_service.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_server_errors_open_the_circuit(guarded_service, google, clock):
+    google.status_code = 503
+
+    for _ in range(4):
+        _fail_listing(guarded_service, 1)
+        clock.now += 1
+
+    assert guarded_service.circuit_breaker.state == CircuitBreaker.OPEN
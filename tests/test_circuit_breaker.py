@@ -0,0 +1,121 @@
+import pytest
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(
+        failure_rate_threshold=0.5,
+        slow_call_rate_threshold=0.5,
+        slow_call_seconds=2.0,
+        window_size=4,
+        min_calls=4,
+        open_seconds=30.0,
+        half_open_max_calls=2,
+        clock=clock,
+    )
+
+
+def _call(breaker, success=True, duration=0.1):
+    breaker.before_call()
+    breaker.record(success, duration)
+
+
+def _trip(breaker):
+    for success in (True, True, False, False):
+        _call(breaker, success)
+
+
+def test_stays_closed_below_min_calls(breaker):
+    for _ in range(3):
+        _call(breaker, success=False)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_opens_at_failure_rate_threshold(breaker):
+    _trip(breaker)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "30"
+    assert breaker.snapshot()["rejected_calls"] == 1
+
+
+def test_window_only_keeps_the_last_calls(breaker):
+    _call(breaker, success=False)
+    for _ in range(4):
+        _call(breaker)
+
+    # Ventana de 4: la falla ya salió
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["window_calls"] == 4
+    assert breaker.snapshot()["failure_rate"] == 0.0
+
+
+def test_opens_on_slow_calls(breaker):
+    for duration in (0.1, 0.1, 2.0, 3.0):
+        _call(breaker, duration=duration)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probes_close_the_circuit_on_success(breaker, clock):
+    _trip(breaker)
+    clock.advance(30)
+
+    breaker.before_call()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Solo `half_open_max_calls` pruebas a la vez
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["window_calls"] == 0
+
+
+def test_failed_probe_reopens_the_circuit(breaker, clock):
+    _trip(breaker)
+    clock.advance(30)
+
+    _call(breaker, success=False)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.snapshot()["times_opened"] == 2
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_release_frees_a_half_open_slot(breaker, clock):
+    _trip(breaker)
+    clock.advance(30)
+    breaker.before_call()
+    breaker.before_call()
+
+    breaker.release()
+
+    breaker.before_call()  # No lanza: la llamada liberada no cuenta
+    assert breaker.state == CircuitBreaker.HALF_OPEN
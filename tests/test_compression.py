@@ -0,0 +1,112 @@
+import gzip
+import brotli
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from utils import compression
+from utils.compression import CompressionMiddleware, negotiate_encoding
+
+BIG = b"x" * 2048
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("*;q=0, gzip", "gzip"),
+        ("identity", None),
+        ("GZIP;q=0.5", "gzip"),
+        ("gzip;q=nada", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, encoding):
+    assert negotiate_encoding(accept_encoding) == encoding
+
+
+def test_without_brotli_only_gzip_is_offered(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    assert negotiate_encoding("br, gzip") == "gzip"
+    assert negotiate_encoding("br") is None
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return Response(BIG, media_type="text/plain")
+
+    @app.get("/small")
+    def small():
+        return Response(b"hola", media_type="text/plain")
+
+    @app.get("/vary")
+    def vary():
+        return Response(BIG, media_type="text/plain", headers={"Vary": "Origin"})
+
+    @app.get("/encoded")
+    def encoded():
+        body = gzip.compress(BIG)
+        return Response(body, headers={"Content-Encoding": "gzip"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BIG, BIG]), media_type="text/plain")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def _raw(client, path, accept_encoding):
+    # Sin descomprimir, para ver el cuerpo tal como sale
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+def test_large_response_is_compressed_with_the_negotiated_encoding(client):
+    response, body = _raw(client, "/big", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(len(body))
+    assert gzip.decompress(body) == BIG
+
+    response, body = _raw(client, "/big", "br, gzip")
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(body) == BIG
+
+
+def test_small_or_unaccepted_responses_are_left_alone(client):
+    response, body = _raw(client, "/small", "gzip")
+    assert "content-encoding" not in response.headers
+    assert body == b"hola"
+
+    response, body = _raw(client, "/big", "identity")
+    assert "content-encoding" not in response.headers
+    assert body == BIG
+
+
+def test_vary_is_appended_not_replaced(client):
+    response, _ = _raw(client, "/vary", "gzip")
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
+
+    response, _ = _raw(client, "/big", "gzip")
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_already_encoded_responses_pass_through(client):
+    response, body = _raw(client, "/encoded", "br")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BIG
+
+
+def test_streaming_responses_are_compressed_chunk_by_chunk(client):
+    response, body = _raw(client, "/stream", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body) == BIG + BIG
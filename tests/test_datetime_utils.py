@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import pytest
+from utils.datetime_utils import (
+    InvalidTimeZoneError,
+    get_zone,
+    local_minutes_to_utc,
+    minutes_to_hour_str,
+    utc_day_offsets,
+    utc_to_local_minutes,
+)
+
+# Cambios de horario de 2030: el 10 de marzo a las 07:00 UTC Nueva York pasa
+# de UTC-5 a UTC-4 y el 3 de noviembre a las 06:00 UTC vuelve a UTC-5
+NEW_YORK = "America/New_York"
+ZONES = [NEW_YORK, "Europe/Madrid", "Australia/Lord_Howe", "America/Guayaquil"]
+
+
+def _epoch_minute(moment: datetime) -> int:
+    return int(moment.replace(tzinfo=timezone.utc).timestamp()) // 60
+
+
+def test_day_without_transition_has_one_segment():
+    day = date(2030, 1, 7)
+
+    assert utc_day_offsets(NEW_YORK, day.toordinal()) == (
+        (_epoch_minute(datetime(2030, 1, 7)), -300),
+    )
+
+
+def test_transition_minute_is_found_exactly():
+    spring = utc_day_offsets(NEW_YORK, date(2030, 3, 10).toordinal())
+    fall = utc_day_offsets(NEW_YORK, date(2030, 11, 3).toordinal())
+
+    assert spring[1:] == ((_epoch_minute(datetime(2030, 3, 10, 7)), -240),)
+    assert fall[1:] == ((_epoch_minute(datetime(2030, 11, 3, 6)), -300),)
+
+
+@pytest.mark.parametrize(
+    "utc, local_day, local_time",
+    [
+        (datetime(2030, 3, 10, 6, 59), date(2030, 3, 10), "01:59:00"),
+        (datetime(2030, 3, 10, 7, 0), date(2030, 3, 10), "03:00:00"),
+        (datetime(2030, 11, 3, 5, 59), date(2030, 11, 3), "01:59:00"),
+        (datetime(2030, 11, 3, 6, 0), date(2030, 11, 3), "01:00:00"),
+        # Antes de la medianoche local, ya es el día siguiente en UTC
+        (datetime(2030, 3, 11, 3, 30), date(2030, 3, 10), "23:30:00"),
+    ],
+)
+def test_utc_to_local_on_both_sides_of_a_transition(utc, local_day, local_time):
+    day, minute = utc_to_local_minutes(utc, NEW_YORK)
+
+    assert (day, minutes_to_hour_str(minute)) == (local_day, local_time)
+
+
+def test_aware_datetimes_are_converted_to_utc_first():
+    moment = datetime(2030, 3, 10, 3, 0, tzinfo=ZoneInfo(NEW_YORK))
+
+    assert utc_to_local_minutes(moment, NEW_YORK) == (date(2030, 3, 10), 180)
+
+
+@pytest.mark.parametrize("time_zone", ZONES)
+@pytest.mark.parametrize("around", [datetime(2030, 3, 30), datetime(2030, 10, 27)])
+def test_utc_to_local_matches_zoneinfo_around_transitions(time_zone, around):
+    zone = ZoneInfo(time_zone)
+    moment = around - timedelta(days=28)
+    while moment < around + timedelta(days=28):
+        expected = moment.replace(tzinfo=timezone.utc).astimezone(zone)
+        day, minute = utc_to_local_minutes(moment, time_zone)
+        assert (day, minute) == (
+            expected.date(),
+            expected.hour * 60 + expected.minute,
+        ), moment
+        moment += timedelta(minutes=15)
+
+
+@pytest.mark.parametrize("time_zone", ZONES)
+@pytest.mark.parametrize("day", [date(2030, 3, 10), date(2030, 11, 3)])
+def test_local_to_utc_matches_zoneinfo_fold_zero(time_zone, day):
+    zone = ZoneInfo(time_zone)
+    for minute in range(0, 24 * 60, 15):
+        wall = datetime(day.year, day.month, day.day, minute // 60, minute % 60)
+        expected = wall.replace(tzinfo=zone).astimezone(timezone.utc)
+        assert local_minutes_to_utc(day, minute, time_zone) == expected, wall
+
+
+def test_nonexistent_and_ambiguous_hours_use_the_previous_offset():
+    # 02:30 no existe el 10 de marzo; 01:30 ocurre dos veces el 3 de noviembre
+    assert local_minutes_to_utc(date(2030, 3, 10), 150, NEW_YORK) == datetime(
+        2030, 3, 10, 7, 30, tzinfo=timezone.utc
+    )
+    assert local_minutes_to_utc(date(2030, 11, 3), 90, NEW_YORK) == datetime(
+        2030, 11, 3, 5, 30, tzinfo=timezone.utc
+    )
+
+
+def test_invalid_zone_is_rejected():
+    with pytest.raises(InvalidTimeZoneError):
+        get_zone("Marte/Olympus")
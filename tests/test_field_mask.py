@@ -0,0 +1,67 @@
+import pytest
+from utils.field_mask import FieldMaskError, apply_field_mask, parse_field_mask
+
+EVENTS = {
+    "kind": "calendar#events",
+    "nextPageToken": "p2",
+    "items": [
+        {
+            "id": "e1",
+            "summary": "Consulta",
+            "start": {"dateTime": "2030-01-07T09:00:00-05:00", "timeZone": "UTC"},
+            "attendees": [{"email": "ana@example.com", "responseStatus": "accepted"}],
+        },
+        {"id": "e2", "status": "cancelled"},
+    ],
+}
+
+
+@pytest.mark.parametrize(
+    "mask, tree",
+    [
+        ("id", {"id": None}),
+        (" id , summary ", {"id": None, "summary": None}),
+        ("items(id,start)", {"items": {"id": None, "start": None}}),
+        ("start/dateTime", {"start": {"dateTime": None}}),
+        ("items/start(dateTime)", {"items": {"start": {"dateTime": None}}}),
+        # Pedidos repetidos se combinan; el campo completo gana
+        ("items(id),items(summary)", {"items": {"id": None, "summary": None}}),
+        ("items,items(id)", {"items": None}),
+    ],
+)
+def test_parse_field_mask(mask, tree):
+    assert parse_field_mask(mask) == tree
+
+
+@pytest.mark.parametrize(
+    "mask", ["", "  ", "items(", "items(id", "a,,b", "a)", "a(b))", "a/", "a;b", "()"]
+)
+def test_invalid_masks_are_rejected(mask):
+    with pytest.raises(FieldMaskError):
+        parse_field_mask(mask)
+
+
+def test_nested_items_projection_filters_each_element():
+    mask = parse_field_mask("items(id,start/dateTime,attendees(email)),nextPageToken")
+
+    assert apply_field_mask(EVENTS, mask) == {
+        "nextPageToken": "p2",
+        "items": [
+            {
+                "id": "e1",
+                "start": {"dateTime": "2030-01-07T09:00:00-05:00"},
+                "attendees": [{"email": "ana@example.com"}],
+            },
+            {"id": "e2"},
+        ],
+    }
+
+
+def test_wildcard_and_missing_fields():
+    assert apply_field_mask(EVENTS, parse_field_mask("items(*)"))["items"] == (
+        EVENTS["items"]
+    )
+    assert apply_field_mask(EVENTS, parse_field_mask("etag,kind")) == {
+        "kind": "calendar#events"
+    }
+    assert apply_field_mask(EVENTS, None) is EVENTS
@@ -0,0 +1,56 @@
+import time
+import pytest
+from pymongo import MongoClient
+from routers import health
+from services import mongo
+from services.availability_service import AvailabilityService
+
+
+@pytest.fixture
+def unreachable_mongo(monkeypatch):
+    # Nada escucha en el puerto 1: el cliente esperaría 30 s a un servidor
+    client = MongoClient("mongodb://127.0.0.1:1", connect=False)
+    monkeypatch.setattr(mongo, "_client", client)
+    monkeypatch.setattr(health, "started", True)
+    monkeypatch.setattr(health, "warming_up", False)
+    yield
+    client.close()
+
+
+def test_readyz_answers_quickly_when_mongo_is_down(unreachable_mongo, monkeypatch):
+    monkeypatch.setattr(mongo, "MONGO_PING_TIMEOUT_SECONDS", 0.2)
+
+    started = time.monotonic()
+    response = health.readyz()
+
+    assert time.monotonic() - started < 5
+    assert response.status_code == 503
+    assert b'"mongo":false' in response.body
+
+
+def test_preload_skips_malformed_documents(client, db):
+    token = {"access_token": "a", "scope": "s", "token_type": "Bearer"}
+    db["credentials"].insert_many(
+        [
+            {"name_company": "acme", "user_id": "u1", **token},
+            {"name_company": "rota", "user_id": "u2", **token},
+            {"name_company": "sin-token", "user_id": "u3"},
+            {"name_company": ["lista"], "user_id": "u4", **token},
+        ]
+    )
+    config = {
+        "hora_inicio": "08:00",
+        "hora_fin": "17:00",
+        "tiempoSesion": 30,
+        "dia_disponibles": 30,
+        "all_day": False,
+    }
+    db["configuracion_calendar"].insert_many(
+        [{"user_id": "u1", **config}, {"user_id": "u2", "hora_inicio": "08:00"}]
+    )
+    service = AvailabilityService(client=client)
+
+    report = service.preload_tenants()
+
+    assert report == {"credentials": 2, "configs": 1, "skipped": 3}
+    assert service.get_configuracion("u1").hora_fin == "17:00"
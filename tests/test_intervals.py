@@ -0,0 +1,81 @@
+import pytest
+from utils.intervals import (
+    free_slot_starts,
+    intersect_interval_lists,
+    merge_intervals,
+    parse_hour_range,
+    parse_hour_ranges,
+    subtract_intervals,
+)
+
+
+def test_parse_hour_ranges_skips_malformed_ranges():
+    assert parse_hour_range("08:00-12:30") == (480, 750)
+    assert parse_hour_ranges(["08:00-09:00", "nada", "10:00"]) == [(480, 540)]
+    with pytest.raises(ValueError):
+        parse_hour_range("08:00")
+
+
+@pytest.mark.parametrize(
+    "intervals, merged",
+    [
+        ([], []),
+        ([(10, 20), (0, 5)], [(0, 5), (10, 20)]),
+        # Se tocan: se fusionan
+        ([(0, 10), (10, 20)], [(0, 20)]),
+        ([(0, 30), (5, 10)], [(0, 30)]),
+        # Vacíos o invertidos: se descartan
+        ([(5, 5), (9, 3), (0, 1)], [(0, 1)]),
+    ],
+)
+def test_merge_intervals(intervals, merged):
+    assert merge_intervals(intervals) == merged
+
+
+@pytest.mark.parametrize(
+    "base, removed, result",
+    [
+        ([(0, 60)], [], [(0, 60)]),
+        ([], [(0, 60)], []),
+        ([(0, 60)], [(0, 60)], []),
+        ([(0, 60)], [(-10, 100)], []),
+        # Tocan los bordes: no quitan nada
+        ([(10, 60)], [(0, 10), (60, 70)], [(10, 60)]),
+        ([(0, 60)], [(10, 20), (30, 40)], [(0, 10), (20, 30), (40, 60)]),
+        # Un intervalo quitado que abarca dos de la base
+        ([(0, 30), (40, 90)], [(20, 50)], [(0, 20), (50, 90)]),
+    ],
+)
+def test_subtract_intervals(base, removed, result):
+    assert subtract_intervals(base, removed) == result
+
+
+@pytest.mark.parametrize(
+    "lists, result",
+    [
+        ([], []),
+        ([[(0, 60)]], [(0, 60)]),
+        ([[(0, 60)], []], []),
+        # Solo se tocan: no hay tramo común
+        ([[(0, 10)], [(10, 20)]], []),
+        ([[(0, 60)], [(30, 90)]], [(30, 60)]),
+        (
+            [[(0, 30), (40, 100)], [(10, 50)], [(0, 20), (45, 100)]],
+            [(10, 20), (45, 50)],
+        ),
+    ],
+)
+def test_intersect_interval_lists(lists, result):
+    assert intersect_interval_lists(lists) == result
+
+
+def test_free_slot_starts_skip_busy_starts_only():
+    ranges = [(480, 600), (540, 660)]  # Se solapan: 08:00-11:00
+    busy = [(510, 540), (600, 601)]
+
+    # 08:30 está ocupada; 09:00 empieza justo cuando termina lo ocupado
+    assert list(free_slot_starts(ranges, busy, 30)) == [480, 540, 570, 630]
+
+
+def test_free_slot_starts_needs_the_whole_session_in_range():
+    assert list(free_slot_starts([(480, 590)], [], 60)) == [480]
@@ -0,0 +1,166 @@
+import threading
+import time
+import pytest
+from services.rate_limiter import FairRateLimiter, RateLimitExceeded, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_token_bucket_refills_at_its_rate_up_to_capacity():
+    bucket = TokenBucket(rate=2, capacity=3, now=0.0)
+    for _ in range(3):
+        bucket.consume(0.0)
+
+    assert not bucket.available(0.0)
+    assert bucket.wait_time(0.0) == 0.5
+    assert bucket.available(0.5)
+    assert bucket.available(100.0)
+    assert bucket.tokens == 3
+
+
+class Waiters:
+    """
+    Lanza cada acquire en un hilo, en orden, y anota en qué orden terminan.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.granted = []
+        self.threads = []
+
+    def add(self, name_company):
+        queued = self.limiter.snapshot()["queued"]
+        thread = threading.Thread(
+            target=self._acquire, args=(name_company,), daemon=True
+        )
+        thread.start()
+        self.threads.append(thread)
+        # El siguiente se encola recién cuando este ya está en la cola
+        assert _wait_for(lambda: self.limiter.snapshot()["queued"] == queued + 1)
+
+    def _acquire(self, name_company):
+        self.limiter.acquire(name_company)
+        self.granted.append(name_company)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(2.0)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _limiter(clock, **overrides):
+    settings = {
+        "global_rate": 1,
+        "global_burst": 1,
+        "company_rate": 100,
+        "company_burst": 100,
+        "max_queue": 100,
+        "max_queue_per_company": 100,
+        "max_wait": 1000,
+    }
+    settings.update(overrides)
+    return FairRateLimiter(clock=clock, **settings)
+
+
+def test_busy_company_cannot_starve_another_and_the_rate_holds(clock):
+    limiter = _limiter(clock)
+    limiter.acquire("grande")  # Gasta el único token global
+    waiters = Waiters(limiter)
+    for _ in range(4):
+        waiters.add("grande")
+    waiters.add("chica")
+
+    for step in range(1, 6):
+        clock.now += 1.0  # Un token global por segundo
+        assert _wait_for(lambda: len(waiters.granted) == step)
+        # Sin más tokens nadie más pasa
+        time.sleep(0.05)
+        assert len(waiters.granted) == step
+    waiters.join()
+
+    # La empresa chica pasa en el segundo turno, no detrás de toda la ráfaga
+    assert waiters.granted == ["grande", "chica", "grande", "grande", "grande"]
+    assert limiter.snapshot()["global"]["acquired"] == 6
+
+
+def test_company_rate_is_enforced_per_company(clock):
+    limiter = _limiter(
+        clock, global_rate=100, global_burst=100, company_rate=1, company_burst=1
+    )
+    limiter.acquire("a")
+    limiter.acquire("b")  # Otra empresa tiene su propio bucket
+    waiters = Waiters(limiter)
+    waiters.add("a")
+
+    time.sleep(0.05)
+    assert waiters.granted == []
+    clock.now += 1.0
+    assert _wait_for(lambda: waiters.granted == ["a"])
+    waiters.join()
+
+
+def test_full_queues_reject_immediately(clock):
+    limiter = _limiter(clock, max_queue=2, max_queue_per_company=1)
+    limiter.acquire("a")
+    waiters = Waiters(limiter)
+    waiters.add("a")
+
+    with pytest.raises(RateLimitExceeded, match="'a'"):
+        limiter.acquire("a")
+    waiters.add("b")
+    with pytest.raises(RateLimitExceeded, match="global"):
+        limiter.acquire("c")
+
+    for step in (1, 2):
+        clock.now += 1.0
+        assert _wait_for(lambda: len(waiters.granted) == step)
+    waiters.join()
+    assert limiter.snapshot()["companies"]["a"]["rejected"] == 1
+
+
+def test_wait_longer_than_max_wait_is_rejected(clock):
+    # La empresa recupera un token cada 100 s, más que el plazo de 5 s
+    limiter = _limiter(
+        clock,
+        global_rate=100,
+        global_burst=100,
+        company_rate=0.01,
+        company_burst=1,
+        max_wait=5,
+    )
+    limiter.acquire("a")
+    errors = []
+
+    def acquire():
+        try:
+            limiter.acquire("a")
+        except RateLimitExceeded as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=acquire, daemon=True)
+    thread.start()
+    assert _wait_for(lambda: limiter.snapshot()["queued"] == 1)
+    clock.now += 5.0
+    thread.join(2.0)
+
+    assert len(errors) == 1
+    assert limiter.snapshot()["queued"] == 0
@@ -0,0 +1,268 @@
+import json
+import time
+import pytest
+import requests
+from fastapi import FastAPI, HTTPException
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from models.data_classes import UserTokenData
+from routers import webhooks
+from services.availability_service import AvailabilityService
+from services.calendar_service import GoogleCalendarService
+from services.watch_service import CalendarWatchService
+
+
+class FakeCalendarService:
+    """
+    Lo mínimo de GoogleCalendarService que usa CalendarWatchService. Los
+    eventos de cada calendario se devuelven todos en cada sincronización.
+    """
+
+    def __init__(self):
+        self.events = {}
+        self.stopped = []
+        self.invalidated = []
+        self.on_watch = None
+        self.fail_watch = False
+
+    def resolve_calendar_id(self, name_company, calendar_id=None):
+        return calendar_id or "primary"
+
+    def watch_events(
+        self, name_company, channel_id, address, token, ttl_seconds, calendar_id
+    ):
+        if self.fail_watch:
+            response = requests.Response()
+            response.status_code = 400
+            raise requests.HTTPError(response=response)
+        if self.on_watch is not None:
+            # Google envía el aviso "sync" antes de responder
+            self.on_watch(channel_id, token)
+        return {"resourceId": f"res-{calendar_id}", "expiration": "4102444800000"}
+
+    def stop_channel(self, name_company, channel_id, resource_id):
+        self.stopped.append(channel_id)
+
+    def invalidate_calendar(self, name_company, calendar_id):
+        self.invalidated.append((name_company, calendar_id))
+        return 0
+
+    def sync_events(self, name_company, calendar_id, sync_token=None, page_token=None):
+        return {
+            "items": list(self.events.get(calendar_id, {}).values()),
+            "nextSyncToken": f"token-{len(self.events.get(calendar_id, {}))}",
+        }
+
+    def cache_synced_event(self, name_company, calendar_id, event):
+        pass
+
+
+@pytest.fixture
+def google():
+    return FakeCalendarService()
+
+
+@pytest.fixture
+def watch_service(google, db):
+    service = CalendarWatchService(google, db, webhook_url="https://example.com/hook")
+    yield service
+    service.stop()
+
+
+def _headers(channel, state="exists", token=None):
+    return {
+        "x-goog-channel-id": channel["id"],
+        "x-goog-channel-token": token or channel["token"],
+        "x-goog-resource-id": channel["resource_id"],
+        "x-goog-resource-state": state,
+    }
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_initial_sync_notification_before_google_responds_is_accepted(
+    google, watch_service
+):
+    answered = []
+
+    def notify(channel_id, token):
+        answered.append(
+            watch_service.handle_notification(
+                {
+                    "x-goog-channel-id": channel_id,
+                    "x-goog-channel-token": token,
+                    "x-goog-resource-id": "res-primary",
+                    "x-goog-resource-state": "sync",
+                }
+            )
+        )
+
+    google.on_watch = notify
+    channel = watch_service.watch("acme")
+
+    assert answered == ["sync"]
+    assert channel["resource_id"] == "res-primary"
+
+
+def test_failed_watch_leaves_no_channel(google, watch_service, db):
+    google.fail_watch = True
+
+    with pytest.raises(HTTPException) as error:
+        watch_service.watch("acme")
+
+    assert error.value.status_code == 502
+    assert db["calendar_watch_channels"].count_documents({}) == 0
+
+
+def test_rewatch_stops_previous_channel(google, watch_service, db):
+    first = watch_service.watch("acme")
+    second = watch_service.watch("acme")
+
+    assert google.stopped == [first["id"]]
+    assert [doc["_id"] for doc in db["calendar_watch_channels"].find()] == [
+        second["id"]
+    ]
+
+
+def test_change_notification_syncs_the_local_copy(google, watch_service, db):
+    watch_service.watch("acme")
+    channel = db["calendar_watch_channels"].find_one()
+    channel["id"] = channel["_id"]
+    assert _wait_for(lambda: db["calendar_sync"].find_one({"dirty": False}))
+
+    google.events["primary"] = {
+        "e1": {
+            "id": "e1",
+            "status": "confirmed",
+            "start": {"dateTime": "2030-01-07T09:00:00-05:00"},
+        }
+    }
+    assert watch_service.handle_notification(_headers(channel)) == "exists"
+
+    assert _wait_for(lambda: db["calendar_events"].count_documents({}) == 1)
+    assert _wait_for(lambda: db["calendar_sync"].find_one({"dirty": False}))
+    events = watch_service.list_events("acme")
+    assert [event["id"] for event in events["items"]] == ["e1"]
+    assert ("acme", "primary") in google.invalidated
+
+
+def test_notification_with_bad_token_or_unknown_channel_is_rejected(watch_service, db):
+    watch_service.watch("acme")
+    channel = db["calendar_watch_channels"].find_one()
+    channel["id"] = channel["_id"]
+
+    with pytest.raises(HTTPException) as error:
+        watch_service.handle_notification(_headers(channel, token="otro"))
+    assert error.value.status_code == 403
+
+    with pytest.raises(HTTPException) as error:
+        watch_service.handle_notification(_headers(dict(channel, id="nope")))
+    assert error.value.status_code == 404
+
+
+def test_webhook_route_acknowledges_with_204(watch_service, db):
+    watch_service.watch("acme")
+    channel = db["calendar_watch_channels"].find_one()
+    channel["id"] = channel["_id"]
+    webhooks.watch_service = watch_service
+    app = FastAPI()
+    app.include_router(webhooks.router)
+
+    client = TestClient(app)
+    response = client.post("/webhooks/google/calendar", headers=_headers(channel))
+
+    assert response.status_code == 204
+    assert client.post("/webhooks/google/calendar").status_code == 400
+
+
+class FakeTokenStorage:
+    def get_token(self, name_company):
+        return UserTokenData(name_company, "token", "refresh", 3600, "s", "Bearer")
+
+
+class RecurringGoogle:
+    """
+    Responde GET .../events como Google para un evento semanal que empezó
+    antes de time_min: sin singleEvents devuelve solo el evento maestro, con
+    singleEvents una instancia por ocurrencia.
+    """
+
+    def __init__(self):
+        self.requests = []
+        first = datetime(2030, 1, 7, 9)
+        self.master = {
+            "id": "semanal",
+            "status": "confirmed",
+            "recurrence": ["RRULE:FREQ=WEEKLY;COUNT=10"],
+            "start": {"dateTime": first.isoformat() + "Z"},
+            "end": {"dateTime": (first + timedelta(hours=1)).isoformat() + "Z"},
+        }
+        self.instances = [
+            {
+                "id": f"semanal_{start:%Y%m%dT%H%M%SZ}",
+                "status": "confirmed",
+                "recurringEventId": "semanal",
+                "start": {"dateTime": start.isoformat() + "Z"},
+                "end": {"dateTime": (start + timedelta(hours=1)).isoformat() + "Z"},
+            }
+            for start in (first + timedelta(weeks=week) for week in range(10))
+        ]
+        # Empieza antes de time_min y termina después: Google lo incluye
+        self.in_progress = {
+            "id": "en-curso",
+            "status": "confirmed",
+            "start": {"dateTime": "2030-01-31T23:30:00Z"},
+            "end": {"dateTime": "2030-02-01T00:30:00Z"},
+        }
+
+    def __call__(self, method, url, params=None, **kwargs):
+        self.requests.append(dict(params or {}))
+        if (params or {}).get("singleEvents") == "true":
+            items = self.instances + [self.in_progress]
+        else:
+            items = [self.master, self.in_progress]
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(
+            {"items": items, "nextSyncToken": "token-1"}
+        ).encode()
+        return response
+
+
+def test_synced_copy_expands_recurring_events_like_the_live_listing(
+    client, db, monkeypatch
+):
+    google = RecurringGoogle()
+    monkeypatch.setattr(requests, "request", google)
+    calendar_service = GoogleCalendarService(
+        None, FakeTokenStorage(), AvailabilityService(client=client)
+    )
+    service = CalendarWatchService(calendar_service, db)
+    # Estado de una versión anterior: token pedido sin singleEvents
+    db["calendar_sync"].insert_one(
+        {"_id": "acme|primary", "sync_token": "viejo", "version": 0}
+    )
+
+    try:
+        events = service.list_events("acme", time_min="2030-02-01T00:00:00Z")
+    finally:
+        service.stop()
+
+    assert google.requests[0]["singleEvents"] == "true"
+    assert "syncToken" not in google.requests[0]
+    assert [event["id"] for event in events["items"]] == [
+        "en-curso",
+        "semanal_20300204T090000Z",
+        "semanal_20300211T090000Z",
+        "semanal_20300218T090000Z",
+        "semanal_20300225T090000Z",
+        "semanal_20300304T090000Z",
+        "semanal_20300311T090000Z",
+    ]
@@ -0,0 +1,185 @@
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se ofrece gzip
+    brotli = None
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige "br" o "gzip" según Accept-Encoding (respetando q=0), o None.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31: formato gzip (cabecera + CRC)
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            chunk = self._brotli.process(data)
+            return chunk + (self._brotli.finish() if final else self._brotli.flush())
+        chunk = self._zlib.compress(data)
+        return chunk + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime con brotli o gzip (negociado por
+    Accept-Encoding) las respuestas de al menos `minimum_size` bytes.
+
+    Las respuestas de un solo cuerpo se comprimen completas. En las respuestas
+    en streaming se comprime cada fragmento a medida que llega, sin acumular
+    el cuerpo en memoria.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for key, value in scope.get("headers", []):
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            send, encoding, self.minimum_size, self.gzip_level, self.brotli_quality
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(
+        self,
+        send,
+        encoding: str,
+        minimum_size: int,
+        gzip_level: int,
+        brotli_quality: int,
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._start_message = None
+        self._compressor: Optional[_Compressor] = None
+        self._passthrough = False
+
+    def _headers(self, length: Optional[int]) -> List[Tuple]:
+        headers = []
+        vary = []
+        for key, value in self._start_message.get("headers", []):
+            if key == b"vary":
+                vary.extend(item.strip() for item in value.split(b",") if item.strip())
+            elif key != b"content-length":
+                headers.append((key, value))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        headers.append((b"content-encoding", self.encoding.encode()))
+        # Se conserva el Vary de la aplicación y se añade Accept-Encoding
+        if not any(item.lower() in (b"accept-encoding", b"*") for item in vary):
+            vary.append(b"Accept-Encoding")
+        headers.append((b"vary", b", ".join(vary)))
+        return headers
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self._start_message = message
+            for key, _ in message.get("headers", []):
+                if key == b"content-encoding":
+                    self._passthrough = True
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self._passthrough:
+            if self._start_message is not None:
+                await self._send(self._start_message)
+                self._start_message = None
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressor is None and self._start_message is not None:
+            if not more_body and len(body) < self.minimum_size:
+                # Respuesta pequeña: se envía sin comprimir
+                await self._send(self._start_message)
+                self._start_message = None
+                await self._send(message)
+                return
+
+            self._compressor = _Compressor(
+                self.encoding, self.gzip_level, self.brotli_quality
+            )
+            if not more_body:
+                compressed = self._compressor.compress(body, final=True)
+                await self._send(
+                    {
+                        **self._start_message,
+                        "headers": self._headers(len(compressed)),
+                    }
+                )
+                self._start_message = None
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming: se desconoce el tamaño final
+            await self._send({**self._start_message, "headers": self._headers(None)})
+            self._start_message = None
+
+        await self._send(
+            {
+                "type": "http.response.body",
+                "body": self._compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            }
+        )
@@ -1,5 +1,14 @@
-from datetime import datetime, timezone
-from typing import Union
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_MINUTES_PER_DAY = 24 * 60
+
+
+class InvalidTimeZoneError(ValueError):
+    pass
 
 
 def convert_to_rfc3339(date_str: str) -> str:
@@ -15,3 +24,113 @@ def convert_to_rfc3339(date_str: str) -> str:
         raise ValueError(
             f"Invalid datetime format: {date_str}. Expected 'YYYY-MM-DD HH:MM' or 'YYYY-MM-DDTHH:MM'"
         )
+
+
+@lru_cache(maxsize=512)
+def get_zone(time_zone: str) -> ZoneInfo:
+    """
+    Devuelve la ZoneInfo de `time_zone`, validada y memoizada. Lanza
+    InvalidTimeZoneError si la zona no existe.
+    """
+    try:
+        return ZoneInfo(time_zone)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        raise InvalidTimeZoneError(f"Zona horaria inválida: {time_zone}")
+
+
+def _offset_at(zone: ZoneInfo, epoch_minute: int) -> int:
+    offset = datetime.fromtimestamp(epoch_minute * 60, tz=zone).utcoffset()
+    return int(offset.total_seconds()) // 60
+
+
+@lru_cache(maxsize=8192)
+def utc_day_offsets(time_zone: str, day_ordinal: int) -> Tuple[Tuple[int, int], ...]:
+    """
+    Tabla de desfases UTC de `time_zone` para el día UTC `day_ordinal`:
+    tuplas (minuto_epoch_desde, desfase_en_minutos) ordenadas. Si en el día hay
+    un cambio de horario (DST) la tabla tiene una entrada por tramo; el minuto
+    exacto del cambio se busca por bisección.
+    """
+    zone = get_zone(time_zone)
+    start = (day_ordinal - _EPOCH_ORDINAL) * _MINUTES_PER_DAY
+    last = start + _MINUTES_PER_DAY - 1
+    offset = _offset_at(zone, start)
+    segments = [(start, offset)]
+    while _offset_at(zone, last) != offset:
+        low, high = segments[-1][0], last
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _offset_at(zone, middle) == offset:
+                low = middle
+            else:
+                high = middle
+        offset = _offset_at(zone, high)
+        segments.append((high, offset))
+    return tuple(segments)
+
+
+def _offset_for(time_zone: str, epoch_minute: int) -> int:
+    segments = utc_day_offsets(
+        time_zone, epoch_minute // _MINUTES_PER_DAY + _EPOCH_ORDINAL
+    )
+    offset = segments[0][1]
+    for segment_start, segment_offset in segments[1:]:
+        if epoch_minute < segment_start:
+            break
+        offset = segment_offset
+    return offset
+
+
+def utc_to_local_minutes(fecha: datetime, time_zone: str) -> Tuple[date, int]:
+    """
+    Convierte un instante (naive = UTC, como se guardan las citas) en el día
+    local y los minutos desde la medianoche local, con aritmética entera.
+    """
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    epoch_minute = (
+        (fecha.toordinal() - _EPOCH_ORDINAL) * _MINUTES_PER_DAY
+        + fecha.hour * 60
+        + fecha.minute
+    )
+    local = epoch_minute + _offset_for(time_zone, epoch_minute)
+    return (
+        date.fromordinal(local // _MINUTES_PER_DAY + _EPOCH_ORDINAL),
+        local % _MINUTES_PER_DAY,
+    )
+
+
+def local_minutes_to_utc(day: date, minute: int, time_zone: str) -> datetime:
+    """
+    Convierte día local + minutos desde la medianoche local en un datetime UTC.
+    Las horas inexistentes o ambiguas por DST se resuelven como ZoneInfo con
+    fold=0 (se usa el desfase anterior al cambio).
+    """
+    wall = (day.toordinal() - _EPOCH_ORDINAL) * _MINUTES_PER_DAY + minute
+    segments = []
+    for ordinal in (day.toordinal() - 1, day.toordinal(), day.toordinal() + 1):
+        segments.extend(utc_day_offsets(time_zone, ordinal))
+
+    epoch_minute = None
+    for index, (segment_start, offset) in enumerate(segments):
+        candidate = wall - offset
+        segment_end = (
+            segments[index + 1][0] if index + 1 < len(segments) else float("inf")
+        )
+        if segment_start <= candidate < segment_end:
+            epoch_minute = candidate
+            break
+        if candidate >= segment_end and wall - segments[index + 1][1] < segment_end:
+            # Hora inexistente (salto hacia adelante): desfase anterior
+            epoch_minute = candidate
+            break
+    if epoch_minute is None:
+        epoch_minute = wall - segments[-1][1]
+    return datetime.fromtimestamp(epoch_minute * 60, tz=timezone.utc)
+
+
+def minutes_to_hour_str(minute: int) -> str:
+    """
+    480 -> "08:00:00"
+    """
+    return f"{minute // 60:02d}:{minute % 60:02d}:00"
@@ -0,0 +1,88 @@
+import re
+from typing import Any, Dict, Optional, Tuple
+
+# Árbol de campos: {"items": {"id": None, "start": None}, "nextPageToken": None}
+# None significa "el campo completo".
+FieldTree = Dict[str, Optional["FieldTree"]]
+
+_NAME = re.compile(r"[A-Za-z0-9_*]+")
+
+
+class FieldMaskError(ValueError):
+    pass
+
+
+def parse_field_mask(mask: str) -> FieldTree:
+    """
+    Interpreta una máscara con la sintaxis de respuestas parciales de Google,
+    p. ej. "items(id,start,end,summary),nextPageToken" o "id,start/dateTime".
+    """
+    mask = mask.replace(" ", "")
+    if not mask:
+        raise FieldMaskError("La máscara de campos está vacía.")
+    tree, pos = _parse(mask, 0)
+    if pos != len(mask):
+        raise FieldMaskError(f"Máscara de campos inválida: '{mask}'.")
+    return tree
+
+
+def _parse(mask: str, pos: int) -> Tuple[FieldTree, int]:
+    tree: FieldTree = {}
+    while True:
+        path = []
+        while True:
+            match = _NAME.match(mask, pos)
+            if not match:
+                raise FieldMaskError(f"Máscara de campos inválida: '{mask}'.")
+            path.append(match.group())
+            pos = match.end()
+            if pos < len(mask) and mask[pos] == "/":
+                pos += 1
+                continue
+            break
+
+        subtree = None
+        if pos < len(mask) and mask[pos] == "(":
+            subtree, pos = _parse(mask, pos + 1)
+            if pos >= len(mask) or mask[pos] != ")":
+                raise FieldMaskError(f"Falta ')' en la máscara de campos: '{mask}'.")
+            pos += 1
+
+        # "a/b(c)" equivale a "a(b(c))"
+        for part in reversed(path[1:]):
+            subtree = {part: subtree}
+        _merge(tree, path[0], subtree)
+
+        if pos == len(mask) or mask[pos] == ")":
+            return tree, pos
+        if mask[pos] != ",":
+            raise FieldMaskError(f"Máscara de campos inválida: '{mask}'.")
+        pos += 1
+
+
+def _merge(tree: FieldTree, name: str, subtree: Optional[FieldTree]):
+    if name in tree and tree[name] is None:
+        return  # Ya se pidió el campo completo
+    if subtree is None or name not in tree:
+        tree[name] = subtree
+        return
+    for child, child_tree in subtree.items():
+        _merge(tree[name], child, child_tree)
+
+
+def apply_field_mask(data: Any, tree: Optional[FieldTree]) -> Any:
+    """
+    Devuelve solo los campos de `data` seleccionados por `tree`. Las listas se
+    filtran elemento a elemento, igual que en la API de Google.
+    """
+    if tree is None:
+        return data
+    if isinstance(data, list):
+        return [apply_field_mask(item, tree) for item in data]
+    if not isinstance(data, dict) or "*" in tree:
+        return data
+    return {
+        key: apply_field_mask(data[key], subtree)
+        for key, subtree in tree.items()
+        if key in data
+    }
@@ -0,0 +1,119 @@
+from typing import Iterable, Iterator, List, Tuple
+
+# Intervalo semiabierto [inicio, fin) en minutos desde la medianoche local
+Interval = Tuple[int, int]
+
+
+def parse_hour_range(hour_range: str) -> Interval:
+    """
+    Convierte "08:00-12:00" en (480, 720). Lanza ValueError si el formato es
+    inválido.
+    """
+    start_str, end_str = hour_range.split("-")
+    start_h, start_m = map(int, start_str.strip().split(":"))
+    end_h, end_m = map(int, end_str.strip().split(":"))
+    return start_h * 60 + start_m, end_h * 60 + end_m
+
+
+def parse_hour_ranges(hour_ranges: Iterable[str]) -> List[Interval]:
+    """
+    Convierte una lista de rangos "HH:MM-HH:MM", omitiendo los mal formateados.
+    """
+    ranges = []
+    for hour_range in hour_ranges:
+        try:
+            ranges.append(parse_hour_range(hour_range))
+        except ValueError:
+            continue
+    return ranges
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """
+    Ordena y fusiona los intervalos que se solapan o se tocan.
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_slot_starts(
+    ranges: Iterable[Interval], busy: List[Interval], step: int
+) -> Iterator[int]:
+    """
+    Genera, en orden, el inicio de cada sesión de `step` minutos que cabe en
+    `ranges` (se fusionan los rangos solapados) y cuyo inicio no cae dentro de
+    un intervalo de `busy` (ya fusionado). Recorre ambas listas una sola vez.
+    """
+    index = 0
+    for range_start, range_end in merge_intervals(ranges):
+        current = range_start
+        while current + step <= range_end:
+            while index < len(busy) and busy[index][1] <= current:
+                index += 1
+            if index < len(busy) and busy[index][0] <= current:
+                current += step
+                continue
+            yield current
+            current += step
+
+
+def subtract_intervals(base: List[Interval], removed: List[Interval]) -> List[Interval]:
+    """
+    Devuelve las partes de `base` que no cubre `removed`. Ambas listas deben
+    estar fusionadas y ordenadas.
+    """
+    result: List[Interval] = []
+    index = 0
+    for start, end in base:
+        current = start
+        while index < len(removed) and removed[index][1] <= current:
+            index += 1
+        probe = index
+        while probe < len(removed) and removed[probe][0] < end:
+            if removed[probe][0] > current:
+                result.append((current, removed[probe][0]))
+            current = max(current, removed[probe][1])
+            probe += 1
+        if current < end:
+            result.append((current, end))
+    return result
+
+
+def intersect_interval_lists(lists: List[List[Interval]]) -> List[Interval]:
+    """
+    Intersección de varias listas de intervalos con un barrido (sweep-line):
+    se ordenan los bordes de todos los intervalos y se conservan los tramos en
+    los que todas las listas están libres a la vez. Cada lista debe estar
+    fusionada.
+    """
+    if not lists:
+        return []
+    events = []
+    for intervals in lists:
+        for start, end in intervals:
+            events.append((start, 1))
+            events.append((end, -1))
+    # En un mismo minuto se procesan los cierres antes que las aperturas
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    result: List[Interval] = []
+    active = 0
+    opened_at = 0
+    for minute, delta in events:
+        if delta == 1:
+            active += 1
+            if active == len(lists):
+                opened_at = minute
+        else:
+            if active == len(lists) and minute > opened_at:
+                result.append((opened_at, minute))
+            active -= 1
+    return result
@@ -0,0 +1,174 @@
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import parse_qs
+from config import ADMIN_TOKEN
+
+
+class RequestProfile:
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.profiler = cProfile.Profile()
+        self.active = False
+        self.started_at = time.perf_counter()
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def profiled(func):
+    """
+    Ejecuta la función bajo el perfilador de la petición actual, si existe.
+    Sin perfilado activo la llamada pasa directamente a la función original.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None or profile.active:
+            return func(*args, **kwargs)
+
+        profile.active = True
+        profile.profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.profiler.disable()
+            profile.active = False
+
+    return wrapper
+
+
+def profile_methods(cls):
+    """
+    Decorador de clase: aplica `profiled` a todos los métodos públicos.
+
+    Sin ADMIN_TOKEN el perfilado no puede activarse, así que la clase se deja
+    intacta y sus métodos no pagan ni la consulta de la ContextVar.
+    """
+    if not ADMIN_TOKEN:
+        return cls
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_"):
+            continue
+        if isinstance(attr, staticmethod):
+            setattr(cls, name, staticmethod(profiled(attr.__func__)))
+        elif callable(attr):
+            setattr(cls, name, profiled(attr))
+    return cls
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila una única petición cuando se envía el token
+    de administración en la cabecera `X-Profile` o en el parámetro `__profile`.
+
+    El perfil se guarda en `<output_dir>/<request_id>.prof` (formato pstats)
+    junto con un resumen en texto, y la respuesta incluye las cabeceras
+    `X-Request-ID`, `X-Profile-Summary` y `Server-Timing`.
+    """
+
+    HEADER = b"x-profile"
+    QUERY_PARAM = "__profile"
+
+    def __init__(self, app, token: Optional[str], output_dir: str, top: int = 20):
+        self.app = app
+        self.token = token
+        self.output_dir = output_dir
+        self.top = top
+
+    async def __call__(self, scope, receive, send):
+        if not self.token or scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self._request_id(scope)
+        profile = RequestProfile(request_id)
+        reset_token = _current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.extend(self._finish(profile))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(reset_token)
+
+    def _requested(self, scope) -> bool:
+        for key, value in scope.get("headers", []):
+            if key == self.HEADER:
+                return self._valid(value.decode("latin-1"))
+
+        query_string = scope.get("query_string", b"")
+        if self.QUERY_PARAM.encode() in query_string:
+            values = parse_qs(query_string.decode("latin-1")).get(self.QUERY_PARAM)
+            return bool(values) and self._valid(values[0])
+        return False
+
+    def _valid(self, value: str) -> bool:
+        return hmac.compare_digest(value.encode(), self.token.encode())
+
+    @staticmethod
+    def _request_id(scope) -> str:
+        for key, value in scope.get("headers", []):
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")
+                # Solo se aceptan ids seguros como nombre de archivo
+                if request_id.replace("-", "").isalnum():
+                    return request_id
+        return uuid.uuid4().hex
+
+    def _finish(self, profile: RequestProfile):
+        elapsed_ms = (time.perf_counter() - profile.started_at) * 1000
+        headers = [
+            (b"x-request-id", profile.request_id.encode()),
+            (b"server-timing", f"app;dur={elapsed_ms:.1f}".encode()),
+        ]
+        try:
+            stats = pstats.Stats(profile.profiler)
+        except TypeError:
+            # La petición no llamó a ningún servicio perfilado
+            return headers
+
+        summary = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats("cumulative").print_stats(self.top)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        base_path = os.path.join(self.output_dir, profile.request_id)
+        stats.dump_stats(f"{base_path}.prof")
+        with open(f"{base_path}.txt", "w") as f:
+            f.write(summary.getvalue())
+
+        summary_header = self._short_summary(stats).encode("latin-1", "replace")
+        headers.append((b"x-profile-summary", summary_header))
+        return headers
+
+    @staticmethod
+    def _short_summary(stats: pstats.Stats, limit: int = 5) -> str:
+        # (archivo, línea, función) -> (cc, nc, tt, ct, callers)
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        parts = []
+        for (filename, _, func_name), (_, ncalls, _, cumtime, _) in entries:
+            if filename == "~" or filename == __file__:
+                continue  # Funciones built-in y los propios wrappers
+            module = os.path.splitext(os.path.basename(filename))[0]
+            parts.append(
+                f"{module}.{func_name};calls={ncalls};cum={cumtime * 1000:.1f}ms"
+            )
+            if len(parts) >= limit:
+                break
+        return ", ".join(parts)